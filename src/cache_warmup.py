@@ -0,0 +1,161 @@
+"""cache_warmup.py
+
+Prepares the financial cache ahead of a scheduled run of the
+Securities Recommendation Service.
+
+The script initializes all strategies as they will be initialized by the
+next run, determines the financial data they will require and downloads
+the data that is not already cached, so that the scheduled run is served
+almost entirely from the cache.
+"""
+import argparse
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from connectors import connector_test
+from strategies import strategy_registry, run_planner
+from support import constants, logging_definition, util
+from support.configuration import Configuration
+
+log = logging.getLogger()
+
+logging.getLogger('boto3').setLevel(logging.WARN)
+logging.getLogger('botocore').setLevel(logging.WARN)
+logging.getLogger('s3transfer').setLevel(logging.WARN)
+logging.getLogger('urllib3').setLevel(logging.WARN)
+
+
+def parse_params():
+    """
+        Parse command line parameters, performs validation
+        and returns a sanitized version of it.
+
+        Returns
+        ----------
+        A tuple containing the application paramter values
+        (app_ns, days_ahead, max_workers, dry_run)
+    """
+
+    description = """
+                  Downloads the financial data required by the next run of the
+                  Securities Recommendation Service that is not already cached.
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument(
+        "-app_namespace", help="Application namespace used to identify AWS resources", type=str, required=True)
+    parser.add_argument(
+        "-days_ahead", help="Number of days until the scheduled run (default 1)", type=int, default=1)
+    parser.add_argument(
+        "-max_workers", help="Maximum number of concurrent downloads (default 4)", type=int, default=4)
+    parser.add_argument(
+        "-dry_run", help="Report missing data without downloading it", action='store_true')
+
+    args = parser.parse_args()
+
+    if args.days_ahead < 0 or args.max_workers < 1:
+        log.error("-days_ahead must not be negative and -max_workers must be at least 1")
+        exit(-1)
+
+    return (args.app_namespace, args.days_ahead, args.max_workers, args.dry_run)
+
+
+def plan_warmup(strategies: list):
+    '''
+        Returns the plan of the (deduplicated) data requests of all
+        the supplied strategies (see run_planner.plan_data_requests)
+    '''
+    data_requests = []
+    for strategy in strategies:
+        data_requests.extend(strategy.get_data_requests())
+
+    run_plan = run_planner.plan_data_requests(data_requests)
+
+    log.info("%d data requests, of which %d are not cached" %
+             (run_plan['data_requests'], run_plan['api_calls']))
+
+    return run_plan
+
+
+def fetch_data_requests(data_requests: list, max_workers: int):
+    '''
+        Executes the supplied data requests using a bounded pool of threads.
+        Individual failures are logged and do not stop the warm up.
+
+        Returns
+        -------
+        The number of failed requests
+    '''
+    def fetch(data_request: tuple):
+        (data_function, args) = data_request
+        data_function(*args)
+
+    failures = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, data_request): data_request
+                   for data_request in data_requests}
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                (data_function, args) = futures[future]
+                log.warning("Could not fetch %s%s, because: %s" %
+                            (data_function.__name__, str(args), str(e)))
+                failures += 1
+
+    return failures
+
+
+def main():
+    """
+        Main function for this script
+    """
+    try:
+        (app_ns, days_ahead, max_workers, dry_run) = parse_params()
+
+        log.info("Parameters:")
+        log.info("Application Namespace: %s" % app_ns)
+        log.info("Days Ahead: %d" % days_ahead)
+        log.info("Max Workers: %d" % max_workers)
+
+        business_date = util.get_business_date(
+            constants.BUSINESS_DATE_DAYS_LOOKBACK + days_ahead, constants.BUSINESS_DATE_CUTOVER_TIME)
+        log.info("Business Date of the scheduled run is: %s" % business_date)
+
+        connector_test.test_aws_connectivity()
+        connector_test.test_intrinio_connectivity()
+
+        log.info('Loading Strategy Configuration "%s" from S3' %
+                 constants.STRATEGY_CONFIG_FILE_NAME)
+        configuration = Configuration.try_from_s3(
+            constants.STRATEGY_CONFIG_FILE_NAME, app_ns)
+
+        log.info("Initalizing Trading Strategies")
+        strategies = strategy_registry.load_strategies(
+            configuration, app_ns, days_ahead)
+
+        run_plan = plan_warmup(strategies)
+        missing_requests = run_plan['missing_requests']
+
+        if dry_run:
+            for (data_function, args) in missing_requests:
+                log.info("Missing: %s%s" % (data_function.__name__, str(args)))
+            run_planner.display_plan("cache warm up", run_plan)
+            return
+
+        failures = fetch_data_requests(missing_requests, max_workers)
+
+        log.info("Cache warm up complete. %d of %d requests failed" %
+                 (failures, len(missing_requests)))
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        log.error("Could run script, because: %s" % (str(e)))
+        log.error(stack_trace)
+        exit(-1)
+
+
+if __name__ == "__main__":
+    main()
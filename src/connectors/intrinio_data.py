@@ -10,15 +10,20 @@ that are easier to consume by the application.
 
 import intrinio_sdk
 import atexit
+import functools
 import requests
 import logging
 import datetime
 import os
+import json
+import threading
 import time
 from intrinio_sdk.rest import ApiException
-from exception.exceptions import DataError, ValidationError
+from exception.exceptions import DataError, ValidationError, FileSystemError
 from connectors import intrinio_util
+from support import constants, util
 from support.financial_cache import cache
+from support.price_store import price_store
 from datetime import timedelta
 
 log = logging.getLogger()
@@ -38,6 +43,191 @@ SECURITY_API = intrinio_sdk.SecurityApi()
 
 INTRINIO_CACHE_PREFIX = 'intrinio'
 
+# number of prices returned by a single price API call
+PRICE_PAGE_SIZE = 100
+# number of values returned by a single technical indicator API call
+TECHNICALS_PAGE_SIZE = 100
+# frequency of the company historical data (e.g. zacks target prices)
+COMPANY_HISTORICAL_DATA_FREQUENCY = 'yearly'
+
+# offline (cache only) modes. When offline, data that is not cached
+# is never requested from the API. Instead, a DataError is raised
+# ('raise'), and in 'report' mode the missing key is also recorded
+OFFLINE_MODE_RAISE = 'raise'
+OFFLINE_MODE_REPORT = 'report'
+OFFLINE_MODES = [OFFLINE_MODE_RAISE, OFFLINE_MODE_REPORT]
+
+OFFLINE_MODE = None
+MISSING_CACHE_KEYS = set()
+
+# Intrinio API endpoints whose latencies are recorded
+ENDPOINT_STOCK_PRICES = 'security_stock_prices'
+ENDPOINT_TECHNICALS_MACD = 'security_price_technicals_macd'
+ENDPOINT_TECHNICALS_SMA = 'security_price_technicals_sma'
+ENDPOINT_STANDARDIZED_FINANCIALS = 'fundamental_standardized_financials'
+ENDPOINT_COMPANY_DATA_POINT = 'company_data_point_number'
+ENDPOINT_COMPANY_HISTORICAL_DATA = 'company_historical_data'
+
+# endpoint -> [number of calls, total seconds] of the API calls of this run
+ENDPOINT_LATENCIES = {}
+ENDPOINT_LATENCIES_LOCK = threading.Lock()
+
+'''
+  Offline mode APIs
+'''
+
+
+def set_offline_mode(offline_mode: str):
+    """
+      Enables or disables the offline (cache only) mode and clears
+      the missing cache keys
+
+      Parameters
+      ----------
+      offline_mode : str
+        One of OFFLINE_MODES, or None to disable the offline mode
+    """
+    global OFFLINE_MODE
+
+    if offline_mode is not None and offline_mode not in OFFLINE_MODES:
+        raise ValidationError("Invalid offline mode: '%s'. Allowed values are %s" %
+                              (offline_mode, str(OFFLINE_MODES)), None)
+
+    OFFLINE_MODE = offline_mode
+    MISSING_CACHE_KEYS.clear()
+
+
+def get_missing_cache_keys():
+    """
+      Returns the sorted list of cache keys that could not be served
+      while in 'report' offline mode
+    """
+    return sorted(MISSING_CACHE_KEYS)
+
+
+def display_missing_cache_keys():
+    """
+      Displays the cache keys that could not be served while in 'report'
+      offline mode, so that they can be prefetched. Does nothing if
+      no keys are missing
+    """
+    missing_cache_keys = get_missing_cache_keys()
+
+    if len(missing_cache_keys) == 0:
+        return
+
+    log.warning("%d cache keys were missing in offline mode:" %
+                len(missing_cache_keys))
+    for cache_key in missing_cache_keys:
+        print(cache_key)
+
+
+def _ensure_online(cache_key: str):
+    """
+      Raises a DataError if the offline mode is enabled. Must be called
+      before every API call, with the key of the missing cache entry,
+      or the range request key of missing date range data
+    """
+    if OFFLINE_MODE is None:
+        return
+
+    if OFFLINE_MODE == OFFLINE_MODE_REPORT:
+        MISSING_CACHE_KEYS.add(cache_key)
+
+    raise DataError("%s is not cached and the offline mode is enabled" %
+                    cache_key, None)
+
+
+set_offline_mode(os.environ.get(
+    constants.INTRINIO_OFFLINE_MODE_ENV_VAR) or None)
+
+'''
+  Endpoint latency APIs
+'''
+
+
+def _timed_api_call(endpoint: str, api_function: object, *args, **kwargs):
+    """
+      Calls an Intrinio API function and records its latency
+      under the supplied endpoint
+    """
+    start_time = time.perf_counter()
+    try:
+        return api_function(*args, **kwargs)
+    finally:
+        elapsed_seconds = time.perf_counter() - start_time
+        with ENDPOINT_LATENCIES_LOCK:
+            latency = ENDPOINT_LATENCIES.setdefault(endpoint, [0, 0.0])
+            latency[0] += 1
+            latency[1] += elapsed_seconds
+
+
+def _read_endpoint_latencies(latencies_path: str):
+    """
+      Reads the recorded latencies of previous runs
+
+      Returns
+      -------
+      A dictionary of endpoint -> [number of calls, total seconds]
+    """
+    if not os.path.isfile(latencies_path):
+        return {}
+
+    try:
+        with open(latencies_path) as latencies_file:
+            return json.load(latencies_file)
+    except Exception as e:
+        log.warning("Could not read endpoint latencies, because: %s" % str(e))
+        return {}
+
+
+def get_endpoint_latencies(latencies_path: str = constants.ENDPOINT_LATENCIES_FILE):
+    """
+      Returns the average latency of each Intrinio API endpoint, combining
+      the latencies recorded by previous runs with the ones of this run
+
+      Returns
+      -------
+      A dictionary of endpoint -> average latency in seconds
+    """
+    latencies = _read_endpoint_latencies(latencies_path)
+
+    with ENDPOINT_LATENCIES_LOCK:
+        for (endpoint, (calls, seconds)) in ENDPOINT_LATENCIES.items():
+            (recorded_calls, recorded_seconds) = latencies.get(endpoint, [0, 0.0])
+            latencies[endpoint] = [recorded_calls + calls, recorded_seconds + seconds]
+
+    return {endpoint: seconds / calls for (endpoint, (calls, seconds)) in latencies.items() if calls > 0}
+
+
+def record_endpoint_latencies(latencies_path: str = constants.ENDPOINT_LATENCIES_FILE):
+    """
+      Adds the latencies of this run to the latencies file, and resets
+      them. Runs that did not call the API are not recorded.
+
+      Raises
+      -------
+      FileSystemError in case the latencies could not be saved
+    """
+    with ENDPOINT_LATENCIES_LOCK:
+        if len(ENDPOINT_LATENCIES) == 0:
+            return
+
+        latencies = _read_endpoint_latencies(latencies_path)
+        for (endpoint, (calls, seconds)) in ENDPOINT_LATENCIES.items():
+            (recorded_calls, recorded_seconds) = latencies.get(endpoint, [0, 0.0])
+            latencies[endpoint] = [recorded_calls + calls, round(recorded_seconds + seconds, 6)]
+
+        try:
+            os.makedirs(os.path.dirname(latencies_path) or '.', exist_ok=True)
+            with open(latencies_path, 'w') as latencies_file:
+                json.dump(latencies, latencies_file)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not save endpoint latencies to %s" % latencies_path, e)
+
+        ENDPOINT_LATENCIES.clear()
+
 '''
   Testing APIs using requests package
 '''
@@ -50,6 +240,7 @@ def retry_server_errors(func):
 
         Retries the error up to 5 times and sleeps 2 seconds between retries
     '''
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         latest_exception = None
         num_retries = 5
@@ -166,16 +357,26 @@ def get_daily_stock_close_prices(ticker: str, start_date: datetime, end_date: da
     start_date_str = intrinio_util.date_to_string(start_date).replace('-', '')
     end_date_str = intrinio_util.date_to_string(end_date).replace('-', '')
 
+    # check the price store first
+    price_dict = _read_price_store(
+        price_store.read_close_prices, ticker, _to_date(start_date), _to_date(end_date))
+
+    if price_dict is not None:
+        if len(price_dict) == 0:
+            raise DataError("No prices returned from Intrinio Security API: ('%s', %s - %s)" %
+                            (ticker, start_date_str, end_date_str), None)
+        return price_dict
+
     price_dict = {}
 
-    cache_key = "%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
-                                    ticker, start_date_str, end_date_str, "closing-prices")
+    cache_key = _prices_cache_key(ticker, start_date_str, end_date_str)
     api_response = cache.read(cache_key)
 
     if api_response is None:
+        _ensure_online(cache_key)
         try:
-            api_response = SECURITY_API.get_security_stock_prices(
-                ticker, start_date=start_date_str, end_date=end_date_str, frequency='daily', page_size=100)
+            api_response = _timed_api_call(
+                ENDPOINT_STOCK_PRICES, SECURITY_API.get_security_stock_prices, ticker, start_date=start_date_str, end_date=end_date_str, frequency='daily', page_size=PRICE_PAGE_SIZE)
             cache.write(cache_key, api_response)
         except ApiException as ae:
             raise DataError("API Error while reading price data from Intrinio Security API: ('%s', %s - %s)" %
@@ -193,9 +394,89 @@ def get_daily_stock_close_prices(ticker: str, start_date: datetime, end_date: da
     for price in price_list:
         price_dict[intrinio_util.date_to_string(price.date)] = price.close
 
+    _store_prices(ticker, start_date, end_date, price_list)
+
     return price_dict
 
 
+def _read_price_store(read_function: object, ticker: str, *args):
+    """
+      Reads prices from the price store using one of its read functions,
+      returning None (i.e. not stored) if they can't be read, so that
+      they are read from the cache or the API instead.
+    """
+    try:
+        return read_function(ticker, *args)
+    except Exception as e:
+        # the price store is an optimization and must never
+        # prevent prices from being returned
+        log.warning("Could not read %s prices from the price store, because: %s" %
+                    (ticker, str(e)))
+        return None
+
+
+def _store_prices(ticker: str, start_date: datetime, end_date: datetime, price_list: list):
+    """
+      Saves a price API response to the price store so that subsequent
+      reads, including narrower ranges, don't require the cache or the API.
+
+      Since responses are limited to one page, a full page only covers
+      the range starting from the earliest returned price.
+    """
+    coverage_start_date = _to_date(start_date)
+    if len(price_list) >= PRICE_PAGE_SIZE:
+        coverage_start_date = min([_to_date(price.date)
+                                   for price in price_list])
+
+    coverage_end_date = _coverage_end_date(
+        end_date, max([_to_date(price.date) for price in price_list]))
+
+    try:
+        price_store.write_prices(ticker, coverage_start_date, coverage_end_date, [
+            (_to_date(price.date), price.open, price.high,
+             price.low, price.close, price.volume)
+            for price in price_list if _to_date(price.date) >= coverage_start_date
+        ])
+    except Exception as e:
+        # the price store is an optimization and must never
+        # prevent prices from being returned
+        log.warning("Could not save %s prices to the price store, because: %s" %
+                    (ticker, str(e)))
+
+
+def _coverage_end_date(end_date: datetime, latest_date: datetime.date):
+    """
+      Returns the end of the range covered by a response ending on end_date,
+      whose latest value is as of latest_date.
+
+      Days after the last completed business day may still receive data, so
+      ranges extending past it are only covered up to the latest value, and
+      the remaining days are requested again by later reads.
+    """
+    end_date = _to_date(end_date)
+
+    try:
+        last_business_date = util.get_business_date(
+            constants.BUSINESS_DATE_DAYS_LOOKBACK, constants.BUSINESS_DATE_CUTOVER_TIME)
+    except ValidationError as ve:
+        log.debug("Limiting coverage to the latest value, because: %s" % str(ve))
+        last_business_date = None
+
+    if last_business_date is not None and end_date <= last_business_date:
+        return end_date
+
+    return min(end_date, _to_date(latest_date))
+
+
+def _to_date(date_value: object):
+    """
+      Converts a datetime or date object into a date
+    """
+    if isinstance(date_value, datetime.datetime):
+        return date_value.date()
+    return date_value
+
+
 def get_latest_close_price(ticker, price_date: datetime, max_looback: int):
     """
       Retrieves the most recent close price given a price_date and a lookback window
@@ -211,6 +492,11 @@ def get_latest_close_price(ticker, price_date: datetime, max_looback: int):
 
     looback_date = price_date - timedelta(days=max_looback)
 
+    latest_price = _read_price_store(
+        price_store.read_asof_close_price, ticker, _to_date(price_date), _to_date(looback_date))
+    if latest_price is not None:
+        return latest_price
+
     price_dict = get_daily_stock_close_prices(ticker, looback_date, price_date)
 
     price_date = sorted(list(price_dict.keys()), reverse=True)[0]
@@ -267,18 +553,31 @@ def get_macd_indicator(ticker: str, start_date: datetime, end_date: datetime,
     end_date_str = intrinio_util.date_to_string(
         end_date).replace('-', '').replace('-', '')
 
+    # check any cached range covering the requested dates first
+    range_key = _macd_range_key(
+        ticker, fast_period, slow_period, signal_period)
+    macd_dict = cache.read_range(
+        range_key, _to_date(start_date), _to_date(end_date))
+
+    if macd_dict is not None:
+        if len(macd_dict) == 0:
+            raise DataError("No MACD indicators returned from Intrinio Security API: ('%s', %s - %s (%d, %d, %d))" %
+                            (ticker, start_date_str, end_date_str, fast_period, slow_period, signal_period), None)
+        return macd_dict
+
     macd_dict = {}
 
-    cache_key = "%s-%s-%s-%s-%d.%d.%d-%s" % (INTRINIO_CACHE_PREFIX,
-                                             ticker, start_date_str, end_date_str, fast_period, slow_period, signal_period, "tech-macd")
+    # entries cached before ranges were indexed
+    cache_key = _macd_cache_key(ticker, start_date_str, end_date_str,
+                                fast_period, slow_period, signal_period)
     api_response = cache.read(cache_key)
 
     if api_response is None:
+        _ensure_online(_range_request_key(
+            range_key, start_date_str, end_date_str))
         try:
-            api_response = SECURITY_API.get_security_price_technicals_macd(
-                ticker, fast_period=fast_period, slow_period=slow_period, signal_period=signal_period, price_key='close', start_date=start_date, end_date=end_date, page_size=100)
-
-            cache.write(cache_key, api_response)
+            api_response = _timed_api_call(
+                ENDPOINT_TECHNICALS_MACD, SECURITY_API.get_security_price_technicals_macd, ticker, fast_period=fast_period, slow_period=slow_period, signal_period=signal_period, price_key='close', start_date=start_date, end_date=end_date, page_size=TECHNICALS_PAGE_SIZE)
         except ApiException as ae:
             raise DataError("API Error while reading MACD indicator from Intrinio Security API: ('%s', %s - %s (%d, %d, %d))" %
                             (ticker, start_date_str, end_date_str, fast_period, slow_period, signal_period), ae)
@@ -299,6 +598,8 @@ def get_macd_indicator(ticker: str, start_date: datetime, end_date: datetime,
             "signal_line": macd.signal_line
         }
 
+    _write_technicals_range(range_key, start_date, end_date, macd_dict)
+
     return macd_dict
 
 
@@ -343,18 +644,30 @@ def get_sma_indicator(ticker: str, start_date: datetime, end_date: datetime,
     end_date_str = intrinio_util.date_to_string(
         end_date).replace('-', '').replace('-', '')
 
+    # check any cached range covering the requested dates first
+    range_key = _sma_range_key(ticker, period_days)
+    sma_dict = cache.read_range(
+        range_key, _to_date(start_date), _to_date(end_date))
+
+    if sma_dict is not None:
+        if len(sma_dict) == 0:
+            raise DataError("No SMA indicators returned from Intrinio Security API: ('%s', %s - %s (%d))" %
+                            (ticker, start_date_str, end_date_str, period_days), None)
+        return sma_dict
+
     sma_dict = {}
 
-    cache_key = "%s-%s-%s-%s-%d-%s" % (INTRINIO_CACHE_PREFIX,
-                                       ticker, start_date_str, end_date_str, period_days, "tech-sma")
+    # entries cached before ranges were indexed
+    cache_key = _sma_cache_key(
+        ticker, start_date_str, end_date_str, period_days)
     api_response = cache.read(cache_key)
 
     if api_response is None:
+        _ensure_online(_range_request_key(
+            range_key, start_date_str, end_date_str))
         try:
-            api_response = SECURITY_API.get_security_price_technicals_sma(
-                ticker, period=period_days, price_key='close', start_date=start_date, end_date=end_date, page_size=100)
-
-            cache.write(cache_key, api_response)
+            api_response = _timed_api_call(
+                ENDPOINT_TECHNICALS_SMA, SECURITY_API.get_security_price_technicals_sma, ticker, period=period_days, price_key='close', start_date=start_date, end_date=end_date, page_size=TECHNICALS_PAGE_SIZE)
         except ApiException as ae:
             raise DataError("API Error while reading SMA indicator from Intrinio Security API: ('%s', %s - %s (%d))" %
                             (ticker, start_date_str, end_date_str, period_days), ae)
@@ -371,9 +684,167 @@ def get_sma_indicator(ticker: str, start_date: datetime, end_date: datetime,
     for sma in sma_list:
         sma_dict[intrinio_util.date_to_string(sma.date_time)] = sma.sma
 
+    _write_technicals_range(range_key, start_date, end_date, sma_dict)
+
     return sma_dict
 
 
+def _write_technicals_range(range_key: str, start_date: datetime, end_date: datetime, technicals_dict: dict):
+    """
+      Saves a technical indicator response to the cache as a date range,
+      so that it may answer any request for a narrower range.
+
+      Since responses are limited to one page, a full page only covers
+      the range starting from the earliest returned value.
+    """
+    coverage_start_date = _to_date(start_date)
+    if len(technicals_dict) >= TECHNICALS_PAGE_SIZE:
+        coverage_start_date = intrinio_util.string_to_date(
+            min(technicals_dict.keys()))
+
+    coverage_end_date = _coverage_end_date(
+        end_date, intrinio_util.string_to_date(max(technicals_dict.keys())))
+
+    cache.write_range(range_key, coverage_start_date, coverage_end_date, {
+        date_str: value for (date_str, value) in technicals_dict.items()
+        if date_str >= intrinio_util.date_to_string(coverage_start_date)
+    })
+
+
+'''
+  Cache inspection APIs
+'''
+
+
+def is_cached(data_function: object, *args):
+    '''
+      Returns True if the data returned by one of the pricing, indicator or
+      zacks functions of this module, given the supplied arguments, can be
+      read locally without calling the Intrinio API.
+
+      For example:
+
+      is_cached(get_daily_stock_close_prices, 'AAPL', start_date, end_date)
+
+      Parameters
+      ----------
+      data_function : function
+        One of the public data functions of this module
+      args : list
+        The arguments that would be supplied to the data function
+
+      Raises
+      -----------
+      ValidationError in case the data function is not supported
+    '''
+    return data_stamp(data_function, *args) is not None
+
+
+def data_stamp(data_function: object, *args):
+    '''
+      Returns a stamp identifying the version of the locally stored data
+      returned by one of the functions supported by is_cached(), without
+      reading it. The stamp changes whenever the data is written again,
+      so it can be used to detect revised data.
+
+      Cache entries are only written when missing, so their key identifies
+      their value, while date ranges and the price store are identified by
+      the covering range and the state of the ticker files.
+
+      Returns
+      -----------
+      The stamp (str), or None if the data is not stored locally
+
+      Raises
+      -----------
+      ValidationError in case the data function is not supported
+    '''
+
+    if data_function is get_daily_stock_close_prices:
+        (ticker, start_date, end_date) = args
+        if price_store.is_covered(ticker, _to_date(start_date), _to_date(end_date)):
+            return "price-store-%s" % price_store.stamp(ticker)
+        return _cache_stamp(_prices_cache_key(
+            ticker, _to_compact_date_string(start_date), _to_compact_date_string(end_date)))
+
+    if data_function is get_latest_close_price:
+        (ticker, price_date, max_looback) = args
+        return data_stamp(get_daily_stock_close_prices, ticker,
+                          price_date - timedelta(days=max_looback), price_date)
+
+    if data_function is get_macd_indicator:
+        (ticker, start_date, end_date, fast_period, slow_period, signal_period) = args
+        return cache.covering_range_key(_macd_range_key(ticker, fast_period, slow_period, signal_period),
+                                        _to_date(start_date), _to_date(end_date)) or \
+            _cache_stamp(_macd_cache_key(ticker, _to_compact_date_string(start_date),
+                                         _to_compact_date_string(end_date), fast_period, slow_period, signal_period))
+
+    if data_function is get_sma_indicator:
+        (ticker, start_date, end_date, period_days) = args
+        return cache.covering_range_key(_sma_range_key(ticker, period_days),
+                                        _to_date(start_date), _to_date(end_date)) or \
+            _cache_stamp(_sma_cache_key(ticker, _to_compact_date_string(start_date),
+                                        _to_compact_date_string(end_date), period_days))
+
+    zacks_tags = {
+        get_zacks_target_price_std_dev: 'zacks_target_price_std_dev',
+        get_zacks_target_price_mean: 'zacks_target_price_mean',
+        get_zacks_target_price_cnt: 'zacks_target_price_cnt'
+    }
+
+    if data_function in zacks_tags:
+        (ticker, start_date, end_date) = args
+        return _cache_stamp(_company_historical_data_cache_key(
+            ticker, intrinio_util.date_to_string(start_date), intrinio_util.date_to_string(end_date),
+            COMPANY_HISTORICAL_DATA_FREQUENCY, zacks_tags[data_function]))
+
+    raise ValidationError("Cache inspection is not supported for %s" %
+                          getattr(data_function, '__name__', str(data_function)), None)
+
+
+def _cache_stamp(cache_key: str):
+    '''
+      Returns the stamp of a cache entry (see data_stamp), or None
+      if it's not cached
+    '''
+    if cache.contains(cache_key):
+        return cache_key
+    return None
+
+
+def get_data_endpoint(data_function: object):
+    '''
+      Returns the Intrinio API endpoint called by one of the pricing, indicator
+      or zacks functions of this module when its data is not cached
+
+      Raises
+      -----------
+      ValidationError in case the data function is not supported
+    '''
+    data_endpoints = {
+        get_daily_stock_close_prices: ENDPOINT_STOCK_PRICES,
+        get_latest_close_price: ENDPOINT_STOCK_PRICES,
+        get_macd_indicator: ENDPOINT_TECHNICALS_MACD,
+        get_sma_indicator: ENDPOINT_TECHNICALS_SMA,
+        get_zacks_target_price_std_dev: ENDPOINT_COMPANY_HISTORICAL_DATA,
+        get_zacks_target_price_mean: ENDPOINT_COMPANY_HISTORICAL_DATA,
+        get_zacks_target_price_cnt: ENDPOINT_COMPANY_HISTORICAL_DATA
+    }
+
+    if data_function not in data_endpoints:
+        raise ValidationError("Endpoint lookup is not supported for %s" %
+                              getattr(data_function, '__name__', str(data_function)), None)
+
+    return data_endpoints[data_function]
+
+
+def _to_compact_date_string(date_value: object):
+    '''
+      Returns the YYYYMMDD representation of a date used by cache keys
+    '''
+    return intrinio_util.date_to_string(date_value).replace('-', '')
+
+
 '''
   Finacial statement APIs using the FUNDAMENTALS_API client
 '''
@@ -596,8 +1067,9 @@ def _read_historical_financial_statement(ticker: str, statement_name: str, year_
             statement = cache.read(cache_key)
 
             if statement is None:
-                statement = FUNDAMENTALS_API.get_fundamental_standardized_financials(
-                    satement_name)
+                _ensure_online(cache_key)
+                statement = _timed_api_call(
+                    ENDPOINT_STANDARDIZED_FINANCIALS, FUNDAMENTALS_API.get_fundamental_standardized_financials, satement_name)
 
                 cache.write(cache_key, statement)
 
@@ -629,10 +1101,11 @@ def _read_company_data_point(ticker: str, tag: str):
     api_response = cache.read(cache_key)
 
     if api_response is None:
+        _ensure_online(cache_key)
         # else call the API directly
         try:
-            api_response = COMPANY_API.get_company_data_point_number(
-                ticker, tag)
+            api_response = _timed_api_call(
+                ENDPOINT_COMPANY_DATA_POINT, COMPANY_API.get_company_data_point_number, ticker, tag)
 
             cache.write(cache_key, api_response)
         except ApiException as ae:
@@ -675,18 +1148,19 @@ def _get_company_historical_data(ticker: str, start_date: str, end_date: str, ta
       ]
     """
 
-    frequency = 'yearly'
+    frequency = COMPANY_HISTORICAL_DATA_FREQUENCY
 
     # check the cache first
-    cache_key = "%s-%s-%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
-                                          "company_historical_data", ticker, start_date, end_date, frequency, tag)
+    cache_key = _company_historical_data_cache_key(
+        ticker, start_date, end_date, frequency, tag)
     api_response = cache.read(cache_key)
 
     if api_response is None:
+        _ensure_online(cache_key)
         # else call the API directly
         try:
-            api_response = COMPANY_API.get_company_historical_data(
-                ticker, tag, frequency=frequency, start_date=start_date, end_date=end_date)
+            api_response = _timed_api_call(
+                ENDPOINT_COMPANY_HISTORICAL_DATA, COMPANY_API.get_company_historical_data, ticker, tag, frequency=frequency, start_date=start_date, end_date=end_date)
         except ApiException as ae:
             raise DataError(
                 "Error retrieving ('%s', %s - %s) -> '%s' from Intrinio Company API" % (ticker, start_date, end_date, tag), ae)
@@ -704,6 +1178,45 @@ def _get_company_historical_data(ticker: str, start_date: str, end_date: str, ta
     return api_response.historical_data_dict
 
 
+def _prices_cache_key(ticker: str, start_date_str: str, end_date_str: str):
+    return "%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
+                               ticker, start_date_str, end_date_str, "closing-prices")
+
+
+def _macd_range_key(ticker: str, fast_period: int, slow_period: int, signal_period: int):
+    return "%s-%s-%d.%d.%d-%s" % (INTRINIO_CACHE_PREFIX,
+                                  ticker, fast_period, slow_period, signal_period, "tech-macd")
+
+
+def _macd_cache_key(ticker: str, start_date_str: str, end_date_str: str,
+                    fast_period: int, slow_period: int, signal_period: int):
+    return "%s-%s-%s-%s-%d.%d.%d-%s" % (INTRINIO_CACHE_PREFIX,
+                                        ticker, start_date_str, end_date_str, fast_period, slow_period, signal_period, "tech-macd")
+
+
+def _range_request_key(range_key: str, start_date_str: str, end_date_str: str):
+    '''
+      Identifies a request for a date range of a series. It has the format
+      of the cache entry that the request would write (see FinancialCache.write_range)
+    '''
+    return "%s-%s-%s" % (range_key, start_date_str, end_date_str)
+
+
+def _sma_range_key(ticker: str, period_days: int):
+    return "%s-%s-%d-%s" % (INTRINIO_CACHE_PREFIX,
+                            ticker, period_days, "tech-sma")
+
+
+def _sma_cache_key(ticker: str, start_date_str: str, end_date_str: str, period_days: int):
+    return "%s-%s-%s-%s-%d-%s" % (INTRINIO_CACHE_PREFIX,
+                                  ticker, start_date_str, end_date_str, period_days, "tech-sma")
+
+
+def _company_historical_data_cache_key(ticker: str, start_date: str, end_date: str, frequency: str, tag: str):
+    return "%s-%s-%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
+                                     "company_historical_data", ticker, start_date, end_date, frequency, tag)
+
+
 def _aggregate_by_year(historical_data_dict: dict):
     """
       Map historical company data by year (latest occurrence).
@@ -809,7 +1322,14 @@ def shutdown():
 
       This code exists in the API source, but it's not invoked reliably, so we force
       its invocation
+
+      The latencies of the API calls of this run are also recorded
     """
+    try:
+        record_endpoint_latencies()
+    except FileSystemError as fse:
+        log.warning(str(fse))
+
     FUNDAMENTALS_API.api_client.pool.close()
     FUNDAMENTALS_API.api_client.pool.join()
     COMPANY_API.api_client.pool.close()
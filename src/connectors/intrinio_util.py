@@ -110,6 +110,20 @@ def date_to_string(date: date):
     return date.strftime("%Y-%m-%d")
 
 
+def string_to_date(date_str: str):
+    """
+      returns the date represented by a string returned by date_to_string
+
+      Returns
+      ----------
+      A date object
+    """
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except Exception as e:
+        raise ValidationError("Could not parse date: %s" % date_str, e)
+
+
 def __validate_year__(year):
     if year < 2000:
         raise ValidationError("Invalid Year. Must be >= 2000", None)
@@ -0,0 +1,235 @@
+"""financial_cache_admin.py
+
+Reports on the contents of the financial data cache and performs
+maintenance tasks such as compaction, vacuum, export, import and
+merging of cache layers.
+"""
+import argparse
+import logging
+import time
+import pandas as pd
+from support import logging_definition
+from support.financial_cache import cache
+from exception.exceptions import ValidationError
+
+log = logging.getLogger()
+
+# cache key suffixes used by the intrinio_data module, which
+# identify the type of data stored by each entry
+KNOWN_DATA_TYPE_SUFFIXES = ['closing-prices', 'tech-macd', 'tech-sma']
+
+# age buckets (in days) used to report the age distribution of the cache
+AGE_BUCKETS = [0, 1, 7, 30, 90, 365, float('inf')]
+AGE_BUCKET_LABELS = ['<1d', '1-7d', '7-30d', '30-90d', '90-365d', '>365d']
+
+
+def describe_key(key: str):
+    '''
+        Breaks down a cache key into its prefix, ticker symbol and data type.
+        Keys are created by the intrinio_data module, e.g.
+
+        intrinio-AAPL-20200101-20200131-closing-prices
+        intrinio-AAPL-20200101-20200131-12.26.9-tech-macd
+        intrinio-AAPL-12.26.9-tech-macd-20200101-20201231
+        intrinio-company_historical_data-AAPL-2020-01-01-2020-01-31-yearly-zacks_target_price_mean
+        intrinio-statement-AAPL-income_statement-FY-2019
+
+        Returns
+        -------
+        A tuple of (prefix, ticker, data_type). Unrecognized elements
+        are returned as 'unknown'
+    '''
+    elements = str(key).split('-')
+
+    if len(elements) < 3:
+        return (elements[0], 'unknown', 'unknown')
+
+    prefix = elements[0]
+
+    for suffix in KNOWN_DATA_TYPE_SUFFIXES:
+        if "-%s" % suffix in key:
+            return (prefix, elements[1], suffix)
+
+    if elements[1] == 'company_historical_data':
+        return (prefix, elements[2], elements[-1])
+    if elements[1] == 'statement':
+        return (prefix, elements[2], elements[3])
+    if elements[1] == 'company_data_point_number':
+        return (prefix, elements[2], '-'.join(elements[3:]))
+
+    return (prefix, 'unknown', 'unknown')
+
+
+def build_report_dataframe():
+    '''
+        Returns a Pandas Dataframe with one row per cache entry, including
+        its layer, prefix, ticker, data type, size and age.
+        Entries of the read only base layer, if any, are included
+        with a 'base' layer.
+    '''
+    report_data = {
+        'layer': [],
+        'prefix': [],
+        'ticker': [],
+        'data_type': [],
+        'size_bytes': [],
+        'age_days': []
+    }
+
+    layers = [('local', cache.entries())]
+    if cache.base_cache is not None:
+        layers.append(('base', cache.base_cache.entries()))
+
+    now = time.time()
+    for (layer, entries) in layers:
+        for (key, size_bytes, store_time) in entries:
+            (prefix, ticker, data_type) = describe_key(key)
+
+            report_data['layer'].append(layer)
+            report_data['prefix'].append(prefix)
+            report_data['ticker'].append(ticker)
+            report_data['data_type'].append(data_type)
+            report_data['size_bytes'].append(size_bytes)
+            report_data['age_days'].append((now - store_time) / 86400)
+
+    return pd.DataFrame(report_data)
+
+
+def report(top: int):
+    '''
+        Displays a summary of the cache contents
+    '''
+    report_dataframe = build_report_dataframe()
+
+    log.info("Cache location: %s" % cache.path)
+    if cache.base_cache is not None:
+        log.info("Base layer location: %s" % cache.base_cache.path)
+    log.info("Total entries: %d" % len(report_dataframe))
+    log.info("Total size: %d bytes (%.2f MB)" % (
+        report_dataframe['size_bytes'].sum(), report_dataframe['size_bytes'].sum() / 1e6))
+
+    if len(report_dataframe) > 0:
+        for group_column in ['layer', 'prefix', 'data_type', 'ticker']:
+            grouped_dataframe = report_dataframe.groupby(group_column)['size_bytes'] \
+                .agg(['count', 'sum']) \
+                .rename(columns={'count': 'entries', 'sum': 'bytes'}) \
+                .sort_values(['bytes'], ascending=False)
+
+            print("")
+            print("Entries by %s" % group_column)
+            print(grouped_dataframe.head(top).to_string())
+
+        report_dataframe['age'] = pd.cut(
+            report_dataframe['age_days'], AGE_BUCKETS, labels=AGE_BUCKET_LABELS, right=False)
+        age_dataframe = report_dataframe.groupby('age', observed=False)['size_bytes'] \
+            .agg(['count', 'sum']) \
+            .rename(columns={'count': 'entries', 'sum': 'bytes'})
+
+        print("")
+        print("Age distribution")
+        print(age_dataframe.to_string())
+
+    run_stats = cache.run_stats()
+    if len(run_stats) > 0:
+        stats_dataframe = pd.DataFrame(run_stats)
+        stats_dataframe['hit_ratio'] = stats_dataframe['hits'] / \
+            (stats_dataframe['hits'] + stats_dataframe['misses'])
+
+        print("")
+        print("Hit ratio of recent runs")
+        print(stats_dataframe.tail(top).to_string(index=False))
+
+
+def parse_params():
+    """
+        Parse command line parameters
+
+        Returns
+        ----------
+        The parsed argparse namespace
+    """
+
+    description = """
+                Reports on the contents of the financial data cache (%s) and performs
+                maintenance tasks on it.
+              """ % cache.path
+
+    parser = argparse.ArgumentParser(description=description)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = subparsers.add_parser(
+        'report', help="Display entry counts, sizes, age distribution and hit ratios")
+    report_parser.add_argument(
+        "-top", help="Number of rows displayed for each grouping", type=int, default=20)
+
+    compact_parser = subparsers.add_parser(
+        'compact', help="Remove entries by key prefix and/or age")
+    compact_parser.add_argument(
+        "-key_prefix", help="Remove entries whose key starts with this prefix", type=str)
+    compact_parser.add_argument(
+        "-older_than_days", help="Remove entries older than this many days", type=int)
+    compact_parser.add_argument(
+        "-dry_run", help="Count matching entries without removing them", action='store_true')
+
+    subparsers.add_parser(
+        'vacuum', help="Check the cache and return unused space to the filesystem")
+
+    export_parser = subparsers.add_parser(
+        'export', help="Export the cache to a file")
+    export_parser.add_argument(
+        "-file", help="Export file path", type=str, required=True)
+    export_parser.add_argument(
+        "-key_prefix", help="Only export entries whose key starts with this prefix", type=str)
+
+    import_parser = subparsers.add_parser(
+        'import', help="Import a file created by the export command")
+    import_parser.add_argument(
+        "-file", help="Import file path", type=str, required=True)
+
+    merge_parser = subparsers.add_parser(
+        'merge', help="Merge the cache and its read only base into a new base cache")
+    merge_parser.add_argument(
+        "-output_path", help="Path of the new base cache", type=str, required=True)
+
+    return parser.parse_args()
+
+
+def main():
+    """
+        Main function for this script
+    """
+    args = parse_params()
+
+    try:
+        if args.command == 'report':
+            report(args.top)
+        elif args.command == 'compact':
+            removed = cache.compact(
+                args.key_prefix, args.older_than_days, args.dry_run)
+            if args.dry_run:
+                log.info("%d entries would be removed" % removed)
+            else:
+                log.info("Removed %d entries" % removed)
+        elif args.command == 'vacuum':
+            issues = cache.vacuum()
+            log.info("Cache was vacuumed. %d issues were fixed" % len(issues))
+        elif args.command == 'export':
+            exported = cache.export_entries(args.file, args.key_prefix)
+            log.info("Exported %d entries to %s" % (exported, args.file))
+        elif args.command == 'import':
+            imported = cache.import_entries(args.file)
+            log.info("Imported %d entries from %s" % (imported, args.file))
+        elif args.command == 'merge':
+            merged = cache.merge_layers(args.output_path)
+            log.info("Merged %d entries into %s" %
+                     (merged, args.output_path))
+    except ValidationError as ve:
+        log.error(str(ve))
+        exit(-1)
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        raise e
+
+
+if __name__ == "__main__":
+    main()
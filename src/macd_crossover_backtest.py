@@ -6,7 +6,7 @@ import logging
 import pandas_market_calendars as mcal
 from datetime import date, datetime
 from connectors import intrinio_data
-from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+from strategies import macd_backtest, run_planner
 from model.ticker_list import TickerList
 from support import constants, logging_definition
 from exception.exceptions import ValidationError
@@ -16,14 +16,6 @@ log = logging.getLogger()
 pd.set_option("display.max_rows", None, "display.max_columns", None)
 pd.options.display.float_format = '{:.2f}'.format
 
-'''
-    A dictionary of existing positions
-    {
-        'AAPL': (buy_date, buy_price)
-    }
-'''
-POSITIONS_DICT = {}
-
 # MACD Parameters
 DIVERGENCE_FACTOR_THRESHOLD = 0.0016
 FAST_PERIOD = 12
@@ -52,6 +44,10 @@ def main():
                         type=date_parser, required=True)
     parser.add_argument("-stop_loss_theshold", help="Stop Loss Threshold factor, e.g. -0.02 (-2%%)",
                         type=float, required=True)
+    parser.add_argument("-offline", help="Only read cached data. Missing data either raises an error or is reported at the end of the backtest",
+                        choices=intrinio_data.OFFLINE_MODES)
+    parser.add_argument("-dry_run", help="Report the expected API calls, cache hit rate and runtime without running the backtest",
+                        action='store_true')
 
     args = parser.parse_args()
 
@@ -60,11 +56,15 @@ def main():
     end_date = args.end_date
     stop_loss_theshold = args.stop_loss_theshold
 
+    if args.offline is not None:
+        intrinio_data.set_offline_mode(args.offline)
+
     log.info("Parameters:")
     log.info("Ticker File: %s" % ticker_file_name)
     log.info("Start Date: %s" % start_date)
     log.info("End Date: %s" % end_date)
     log.info("Stop Loss Threshold: %.2f" % stop_loss_theshold)
+    log.info("Offline Mode: %s" % intrinio_data.OFFLINE_MODE)
 
     log.info("")
     log.info("MACD Configuration:")
@@ -78,55 +78,17 @@ def main():
     ticker_list = TickerList.from_local_file("%s/%s" %
                                              (constants.TICKER_DATA_DIR, ticker_file_name))
 
-    trade_dict = {
-        'ticker': [],
-        'buy_date': [],
-        'buy_price': [],
-        'sell_date': [],
-        'sell_price': [],
-        'trade_pnl_factor': [],
-        'false_signal': []
-    }
-
     try:
         date_list = get_business_date_list(start_date, end_date)
-        init_portfolio_dict(ticker_list)
-
-        for i in range(0, len(date_list) - 1):
-            recommendation_date = date_list[i]
-            trade_date = date_list[i + 1]
-
-            strategy = MACDCrossoverStrategy(
-                ticker_list, recommendation_date, DIVERGENCE_FACTOR_THRESHOLD, FAST_PERIOD, SLOW_PERIOD, SIGNAL_PERIOD)
-            strategy.generate_recommendation()
-
-            print("processing: %s" % recommendation_date, end="\r")
-
-            unwound_positions = trade(
-                trade_date, strategy.recommendation_set)
-
-            for position in unwound_positions:
-                (ticker, buy_date, sell_date, buy_price) = position
-
-                sell_price = get_close_price(ticker, sell_date)
-                pnl = ((sell_price / buy_price) - 1)
-                false_signal = 0
-
-                if (pnl < stop_loss_theshold):
-                    sell_price = 'STOP_LOSS'
-                    false_signal = 1
-                    pnl = stop_loss_theshold
 
-                if (pnl < 0):
-                    false_signal = 1
+        if args.dry_run:
+            run_planner.display_plan("MACD_CROSSOVER backtest", run_planner.plan_data_requests(
+                get_backtest_data_requests(ticker_list, date_list)))
+            return
 
-                trade_dict['ticker'].append(ticker)
-                trade_dict['buy_date'].append(buy_date)
-                trade_dict['buy_price'].append(buy_price)
-                trade_dict['sell_date'].append(str(sell_date))
-                trade_dict['sell_price'].append(sell_price)
-                trade_dict['trade_pnl_factor'].append(pnl)
-                trade_dict['false_signal'].append(false_signal)
+        trade_dict = macd_backtest.run_backtest(
+            ticker_list.ticker_symbols, date_list[0], date_list[-1], DIVERGENCE_FACTOR_THRESHOLD,
+            (FAST_PERIOD, SLOW_PERIOD, SIGNAL_PERIOD), stop_loss_theshold)
 
         trades_by_ticker = []
         for ticker in ticker_list.model['ticker_symbols']:
@@ -138,6 +100,8 @@ def main():
     except Exception as e:
         log.error("Could run script, because, %s" % (str(e)))
         raise e
+    finally:
+        intrinio_data.display_missing_cache_keys()
 
 
 def get_business_date_list(start_date: date, end_date: date):
@@ -155,52 +119,14 @@ def get_business_date_list(start_date: date, end_date: date):
     return business_date_list
 
 
-def get_close_price(ticker: str, price_date: date):
-    '''
-        Reads the close price of a ticker symbol given a price date
-    '''
-    return intrinio_data.get_daily_stock_close_prices(
-        ticker, price_date, price_date
-    )[str(price_date)]
-
-
-def init_portfolio_dict(ticker_list: object):
-    '''
-        Initializes the portfolio dictionary based on the ticker list
-    '''
-    POSITIONS_DICT.clear()
-
-    for ticker in ticker_list.model['ticker_symbols']:
-        POSITIONS_DICT[ticker] = None
-
-
-def trade(trade_date: date, recommendation_set: object):
+def get_backtest_data_requests(ticker_list: object, date_list: list):
     '''
-        Executes a potential trade based on the contents of the recommednation set.
-        Specifically, it will simulate the purchase of any recommeneded security
-        and simulate the sale of any security that dropped off. 
+        Returns the financial data required by the backtest (see
+        BaseStrategy.get_data_requests)
     '''
-    security_set = recommendation_set.model['securities_set']
-
-    unwound_positions = []
-    recommended_ticker_list = [ticker_dict['ticker_symbol']
-                               for ticker_dict in security_set]
-
-    # add positions based on new recommendations
-    for ticker_dict in security_set:
-        ticker = ticker_dict['ticker_symbol']
-        if POSITIONS_DICT[ticker] == None:
-            buy_price = get_close_price(ticker, trade_date)
-            POSITIONS_DICT[ticker] = (trade_date, buy_price)
-
-    # remove existing positions no longer recommended
-    for ticker in POSITIONS_DICT.keys():
-        if POSITIONS_DICT[ticker] is not None and ticker not in recommended_ticker_list:
-            (buy_date, buy_price) = POSITIONS_DICT[ticker]
-            unwound_positions.append((ticker, buy_date, trade_date, buy_price))
-            POSITIONS_DICT[ticker] = None
-
-    return unwound_positions
+    return macd_backtest.get_data_requests(
+        ticker_list.ticker_symbols, date_list[0], date_list[-1],
+        (FAST_PERIOD, SLOW_PERIOD, SIGNAL_PERIOD))
 
 
 def calculate_returns(ticker: str, trade_dict: object):
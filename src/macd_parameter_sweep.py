@@ -0,0 +1,117 @@
+"""macd_parameter_sweep.py
+"""
+import argparse
+import logging
+import pandas as pd
+from datetime import datetime
+from connectors import intrinio_data
+from strategies import macd_sweep, run_planner
+from model.ticker_list import TickerList
+from support import constants, logging_definition
+from exception.exceptions import ValidationError
+
+log = logging.getLogger()
+
+pd.set_option("display.max_rows", None, "display.max_columns", None)
+
+
+def parse_list(value: str, value_type: type):
+    '''
+        Parses a comma separated list of values, e.g. "8,12,16"
+    '''
+    try:
+        return [value_type(element) for element in value.split(',')]
+    except Exception as e:
+        raise argparse.ArgumentTypeError(
+            "Invalid list of values: %s (%s)" % (value, str(e)))
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Backtests the MACD_CROSSOVER strategy for every combination of the
+                supplied MACD parameters, using a single price history that is loaded
+                once, and displays the results of each combination.
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("-ticker_list", help="Ticker List File",
+                        type=str, required=True)
+    date_parser = lambda s: datetime.strptime(s, '%Y/%m/%d').date()
+    parser.add_argument("-start_date", help="Backtest start date (YYYY/MM/DD)",
+                        type=date_parser, required=True)
+    parser.add_argument("-end_date", help="Backtest end date (YYYY/MM/DD)",
+                        type=date_parser, required=True)
+    parser.add_argument("-stop_loss_threshold", help="Stop Loss Threshold factor, e.g. -0.02 (-2%%)",
+                        type=float, required=True)
+    parser.add_argument("-fast_periods", help="Comma separated MACD fast periods (default 12)",
+                        type=lambda s: parse_list(s, int), default=[12])
+    parser.add_argument("-slow_periods", help="Comma separated MACD slow periods (default 26)",
+                        type=lambda s: parse_list(s, int), default=[26])
+    parser.add_argument("-signal_periods", help="Comma separated MACD signal periods (default 9)",
+                        type=lambda s: parse_list(s, int), default=[9])
+    parser.add_argument("-divergence_factor_thresholds", help="Comma separated divergence factor thresholds (default 0.0016)",
+                        type=lambda s: parse_list(s, float), default=[0.0016])
+    parser.add_argument("-top", help="Number of combinations displayed (default all)",
+                        type=int, default=None)
+    parser.add_argument("-offline", help="Only read cached data. Missing data either raises an error or is reported at the end of the sweep",
+                        choices=intrinio_data.OFFLINE_MODES)
+    parser.add_argument("-dry_run", help="Report the expected API calls, cache hit rate and runtime without running the sweep",
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    if args.offline is not None:
+        intrinio_data.set_offline_mode(args.offline)
+
+    log.info("Parameters:")
+    log.info("Ticker File: %s" % args.ticker_list)
+    log.info("Start Date: %s" % args.start_date)
+    log.info("End Date: %s" % args.end_date)
+    log.info("Stop Loss Threshold: %.2f" % args.stop_loss_threshold)
+    log.info("Fast Periods: %s" % args.fast_periods)
+    log.info("Slow Periods: %s" % args.slow_periods)
+    log.info("Signal Periods: %s" % args.signal_periods)
+    log.info("Divergence Factor Thresholds: %s" %
+             args.divergence_factor_thresholds)
+    log.info("Offline Mode: %s" % intrinio_data.OFFLINE_MODE)
+    log.info("")
+
+    try:
+        ticker_list = TickerList.from_local_file("%s/%s" %
+                                                 (constants.TICKER_DATA_DIR, args.ticker_list))
+
+        if args.dry_run:
+            run_planner.display_plan("MACD parameter sweep", run_planner.plan_data_requests(
+                macd_sweep.get_data_requests(ticker_list.ticker_symbols, args.start_date, args.end_date)))
+            return
+
+        log.info("Loading prices")
+        (close_prices, observed_prices) = macd_sweep.load_close_prices(
+            ticker_list.ticker_symbols, args.start_date, args.end_date)
+
+        log.info("Running sweep")
+        sweep_dataframe = macd_sweep.run_sweep(
+            close_prices, args.start_date, args.end_date, args.fast_periods, args.slow_periods,
+            args.signal_periods, args.divergence_factor_thresholds, args.stop_loss_threshold,
+            observed_prices)
+
+        if args.top is not None:
+            sweep_dataframe = sweep_dataframe.head(args.top)
+
+        print(sweep_dataframe.to_string(index=False))
+    except ValidationError as ve:
+        log.error(str(ve))
+        exit(-1)
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        raise e
+    finally:
+        intrinio_data.display_missing_cache_keys()
+
+
+if __name__ == "__main__":
+    main()
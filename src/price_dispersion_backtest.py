@@ -7,9 +7,9 @@ import pandas_market_calendars as mcal
 from datetime import date
 from datetime import timedelta
 from support import util
-from connectors import intrinio_util
+from connectors import intrinio_data, intrinio_util
 from strategies.price_dispersion_strategy import PriceDispersionStrategy
-from strategies import calculator
+from strategies import calculator, run_planner
 from model.ticker_list import TickerList
 from support import constants, logging_definition
 
@@ -34,6 +34,32 @@ def get_nearest_business_date(cal_date: date):
     return business_date
 
 
+def get_mmt_dates(data_end_date: date):
+    '''
+        Returns the dates of the 1, 2 and 3 month returns of a period
+    '''
+    return [get_nearest_business_date(data_end_date + timedelta(days=days)) for days in (30, 60, 90)]
+
+
+def get_backtest_data_requests(ticker_list: object, analysis_periods: list):
+    '''
+        Returns the financial data required by the backtest (see
+        BaseStrategy.get_data_requests). Returns are assumed to be
+        calculated for all tickers.
+    '''
+    data_requests = PriceDispersionStrategy.get_period_data_requests(
+        ticker_list, analysis_periods, None)
+
+    for period in analysis_periods:
+        mmt_dates = get_mmt_dates(
+            intrinio_util.get_month_period_range(period)[1])
+        for ticker in ticker_list.ticker_symbols:
+            data_requests.append((intrinio_data.get_daily_stock_close_prices,
+                                  (ticker, min(mmt_dates), max(mmt_dates))))
+
+    return data_requests
+
+
 def main():
     """
         Main Function for this script
@@ -55,15 +81,23 @@ def main():
                         type=str, required=True)
     parser.add_argument(
         "-output_size", help="Number of selected securities", type=int, required=True)
+    parser.add_argument("-offline", help="Only read cached data. Missing data either raises an error or is reported at the end of the backtest",
+                        choices=intrinio_data.OFFLINE_MODES)
+    parser.add_argument("-dry_run", help="Report the expected API calls, cache hit rate and runtime without running the backtest",
+                        action='store_true')
 
     args = parser.parse_args()
 
     ticker_file_name = args.ticker_list
     output_size = args.output_size
 
+    if args.offline is not None:
+        intrinio_data.set_offline_mode(args.offline)
+
     log.info("Parameters:")
     log.info("Ticker File: %s" % ticker_file_name)
     log.info("Output Size: %d" % output_size)
+    log.info("Offline Mode: %s" % intrinio_data.OFFLINE_MODE)
 
     ticker_list = None
 
@@ -91,34 +125,24 @@ def main():
 
     today = date.today()
 
-    def backtest(analysis_period: str):
-        log.info("Performing backtest for %s" % analysis_period)
-
-        period = pd.Period(analysis_period)
+    def backtest(period: object, strategy: object):
+        log.info("Performing backtest for %s" % period)
 
         data_end_date = intrinio_util.get_month_period_range(period)[1]
 
-        strategy = PriceDispersionStrategy(
-            ticker_list, period, None, output_size)
-        strategy.generate_recommendation()
-
-        date_1m = get_nearest_business_date(data_end_date + timedelta(days=30))
-        date_2m = get_nearest_business_date(data_end_date + timedelta(days=60))
-        date_3m = get_nearest_business_date(data_end_date + timedelta(days=90))
-
-        portfolio_1m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, 'ticker', 'analysis_price', date_1m)['actual_return'].mean() * 100
-        portfolio_2m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, 'ticker', 'analysis_price', date_2m)['actual_return'].mean() * 100
-        portfolio_3m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, 'ticker', 'analysis_price', date_3m)['actual_return'].mean() * 100
+        # prices are read once for all dates and the recommended
+        # securities are a subset of the raw dataframe
+        mmt_dates = get_mmt_dates(data_end_date)
+        all_stocks_dataframe = calculator.mark_to_market(
+            strategy.raw_dataframe, 'ticker', 'analysis_price', mmt_dates)
+        portfolio_dataframe = all_stocks_dataframe.loc[strategy.recommendation_dataframe.index]
 
-        all_stocks_1m = calculator.mark_to_market(strategy.raw_dataframe, 'ticker', 'analysis_price', date_1m)[
-            'actual_return'].mean() * 100
-        all_stocks_2m = calculator.mark_to_market(strategy.raw_dataframe, 'ticker', 'analysis_price', date_2m)[
-            'actual_return'].mean() * 100
-        all_stocks_3m = calculator.mark_to_market(strategy.raw_dataframe, 'ticker', 'analysis_price', date_3m)[
-            'actual_return'].mean() * 100
+        (all_stocks_1m, all_stocks_2m, all_stocks_3m) = [
+            all_stocks_dataframe['actual_return_%s' % mmt_date.strftime("%Y-%m-%d")].mean() * 100
+            for mmt_date in mmt_dates]
+        (portfolio_1m, portfolio_2m, portfolio_3m) = [
+            portfolio_dataframe['actual_return_%s' % mmt_date.strftime("%Y-%m-%d")].mean() * 100
+            for mmt_date in mmt_dates]
 
         backtest_report['investment_period'].append(
             data_end_date.strftime('%Y/%m'))
@@ -137,16 +161,20 @@ def main():
         ticker_list = TickerList.from_local_file("%s/%s" %
                                                  (constants.TICKER_DATA_DIR, ticker_file_name))
 
-        backtest('2019-05')
-        backtest('2019-06')
-        backtest('2019-07')
-        backtest('2019-08')
-        backtest('2019-09')
-        backtest('2019-10')
-        backtest('2019-11')
-        backtest('2019-12')
-        backtest('2020-01')
-        backtest('2020-02')
+        analysis_periods = pd.period_range('2019-05', '2020-02', freq='M')
+
+        if args.dry_run:
+            run_planner.display_plan("PRICE_DISPERSION backtest", run_planner.plan_data_requests(
+                get_backtest_data_requests(ticker_list, analysis_periods)))
+            return
+
+        # the financial data of all periods is loaded in a single pass
+        log.info("Evaluating the strategy")
+        strategies = PriceDispersionStrategy.evaluate_periods(
+            ticker_list, analysis_periods, None, output_size)
+
+        for (period, strategy) in strategies.items():
+            backtest(period, strategy)
 
         backtest_dataframe = pd.DataFrame(backtest_report)
         pd.options.display.float_format = '{:.2f}%'.format
@@ -175,6 +203,9 @@ def main():
         log.error("Could run script, because, %s" % (str(e)))
         raise e
         exit(-1)
+    finally:
+        intrinio_data.display_missing_cache_keys()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,2 @@
+#!/bin/sh
+python cache_warmup.py -app_namespace sa -days_ahead 1
\ No newline at end of file
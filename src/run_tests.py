@@ -6,11 +6,20 @@ import unittest
 import logging
 from test.test_exceptions import TestExceptions
 from test.test_support_financial_cache import TestFinancialCache
+from test.test_support_price_store import TestPriceStore
 from test.test_support_configuration import TestConfiguration
 from test.test_support_util import TestSupportUtil
 from test.test_strategies_price_dispersion import TestStrategiesPriceDispersion
 from test.test_strategies_macd_crossover import TestStrategiesMACDCrossover
 from test.test_strategies_calculator import TestStrategiesCalculator
+from test.test_strategies_registry import TestStrategiesRegistry
+from test.test_strategies_ranking import TestStrategiesRanking
+from test.test_strategies_macd_sweep import TestStrategiesMACDSweep
+from test.test_strategies_macd_backtest import TestStrategiesMACDBacktest
+from test.test_strategies_macd_state import TestStrategiesMACDState
+from test.test_strategies_factor_matrix import TestStrategiesFactorMatrix
+from test.test_strategies_frame_memory import TestStrategiesFrameMemory
+from test.test_strategies_run_planner import TestStrategiesRunPlanner
 from test.test_connectors_aws_service_wrapper import TestConnectorsAWSServiceWrapper
 from test.test_connectors_td_ameritrade import TestConnectorsTDAmeritrade
 from test.test_connectors_intrinio_util import TestConnectorsIntrinioUtil
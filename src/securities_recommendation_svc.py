@@ -9,14 +9,11 @@ https://github.com/hanegraaff/stock-advisor-software
 import argparse
 import logging
 import traceback
-import pandas as pd
 from datetime import datetime, timedelta
 from connectors import aws_service_wrapper, connector_test
-from exception.exceptions import ValidationError, AWSError
-from strategies.price_dispersion_strategy import PriceDispersionStrategy
-from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+from exception.exceptions import ValidationError
+from strategies import strategy_registry
 from services import recommendation_svc
-from model.recommendation_set import SecurityRecommendationSet
 from support import constants, logging_definition, util
 from support.configuration import Configuration
 
@@ -37,7 +34,7 @@ def parse_params():
         Returns
         ----------
         A tuple containing the application paramter values
-        (environment, ticker_file_name, output_size, month, year, current_price_date, app_ns)
+        (app_ns, strategy)
     """
 
     description = """ 
@@ -55,11 +52,12 @@ def parse_params():
 
     parser.add_argument(
         "-app_namespace", help="Application namespace used to identify AWS resources", type=str, required=True)
+    parser.add_argument(
+        "-strategy", help="Only execute the strategy with this configuration section, e.g. macd_crossover_strategy", type=str)
 
     args = parser.parse_args()
-    app_ns = args.app_namespace
 
-    return app_ns
+    return (args.app_namespace, args.strategy)
 
 
 def main():
@@ -67,10 +65,11 @@ def main():
         Main function for this script
     """
     try:
-        app_ns = parse_params()
+        (app_ns, strategy) = parse_params()
 
         log.info("Parameters:")
         log.info("Application Namespace: %s" % app_ns)
+        log.info("Strategy: %s" % (strategy or "All enabled strategies"))
 
         business_date = util.get_business_date(
             constants.BUSINESS_DATE_DAYS_LOOKBACK, constants.BUSINESS_DATE_CUTOVER_TIME)
@@ -87,41 +86,23 @@ def main():
             constants.STRATEGY_CONFIG_FILE_NAME, app_ns)
 
         log.info("Initalizing Trading Strategies")
-        strategies = [
-            PriceDispersionStrategy.from_configuration(configuration, app_ns),
-            MACDCrossoverStrategy.from_configuration(configuration, app_ns)
-        ]
-
-        notification_list = []
-        for strategy in strategies:
-            recommendation_set = None
-            try:
-                log.info("Executing %s strategy" % strategy.STRATEGY_NAME)
-                recommendation_set = SecurityRecommendationSet.from_s3(
-                    app_ns, strategy.S3_RECOMMENDATION_SET_OBJECT_NAME)
-            except AWSError as awe:
-                if not awe.resource_not_found():
-                    raise awe
-                log.info("No recommendation set was found in S3.")
-
-            if recommendation_set == None  \
-                    or not recommendation_set.is_current(business_date):
-
-                strategy.generate_recommendation()
-                strategy.display_results()
-
-                recommendation_set = strategy.recommendation_set
-
-                recommendation_set.save_to_s3(
-                    app_ns, strategy.S3_RECOMMENDATION_SET_OBJECT_NAME)
-
-                notification_list.append(recommendation_set)
-            else:
-                log.info(
-                    "Recommendation set is still valid. There is nothing to do")
+        strategies = strategy_registry.load_strategies(
+            configuration, app_ns, config_section=strategy)
+        for strategy_instance in strategies:
+            strategy_instance.enable_incremental_recompute(
+                constants.STRATEGY_METRICS_DIR)
+            strategy_instance.enable_result_cache(
+                constants.STRATEGY_RESULTS_DIR, app_ns)
+
+        (notification_list, failures) = recommendation_svc.execute_strategies(
+            strategies, app_ns, business_date)
 
         recommendation_svc.notify_new_recommendation(
             notification_list, app_ns)
+
+        if len(failures) > 0:
+            raise ValidationError("Could not execute the following strategies: %s" %
+                                  ", ".join(failures.keys()), None)
     except Exception as e:
         stack_trace = traceback.format_exc()
         log.error("Could run script, because: %s" % (str(e)))
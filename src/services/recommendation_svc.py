@@ -5,12 +5,119 @@ It exists solely so that the code may be tested. otherwise it would
 be organized along with the service itself.
 """
 import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from connectors import aws_service_wrapper
+from exception.exceptions import AWSError
+from model.recommendation_set import SecurityRecommendationSet
 from support import constants
 import dateutil.parser as parser
 
 log = logging.getLogger()
 
+# serializes the output of strategies executed concurrently
+DISPLAY_LOCK = threading.Lock()
+
+
+def execute_strategy(strategy: object, app_ns: str, business_date: object):
+    '''
+        Executes a single strategy. The current recommendation set is
+        read from S3, and if it's no longer current a new one is generated,
+        displayed and saved to S3.
+
+        Parameters
+        ----------
+        strategy: BaseStrategy
+            The strategy to execute
+        app_ns: str
+            The application namespace supplied to the command line
+        business_date: date
+            The business date used to determine whether the current
+            recommendation set is still valid
+
+        Returns
+        ----------
+        The new SecurityRecommendationSet, or None if the current
+        one is still valid
+    '''
+    recommendation_set = None
+    try:
+        log.info("Executing %s strategy" % strategy.STRATEGY_NAME)
+        recommendation_set = SecurityRecommendationSet.from_s3(
+            app_ns, strategy.S3_RECOMMENDATION_SET_OBJECT_NAME)
+    except AWSError as awe:
+        if not awe.resource_not_found():
+            raise awe
+        log.info("No %s recommendation set was found in S3." %
+                 strategy.STRATEGY_NAME)
+
+    if recommendation_set is not None and recommendation_set.is_current(business_date):
+        log.info(
+            "%s recommendation set is still valid. There is nothing to do" % strategy.STRATEGY_NAME)
+        return None
+
+    strategy.generate_recommendation()
+
+    with DISPLAY_LOCK:
+        strategy.display_results()
+
+    recommendation_set = strategy.recommendation_set
+    recommendation_set.save_to_s3(
+        app_ns, strategy.S3_RECOMMENDATION_SET_OBJECT_NAME)
+
+    return recommendation_set
+
+
+def execute_strategies(strategies: list, app_ns: str, business_date: object, max_workers: int = None):
+    '''
+        Executes all strategies concurrently (see execute_strategy), so
+        that the total runtime is that of the slowest strategy.
+        A failing strategy does not prevent the others from completing.
+
+        Parameters
+        ----------
+        strategies: list
+            List of BaseStrategy objects
+        app_ns: str
+            The application namespace supplied to the command line
+        business_date: date
+            See execute_strategy
+        max_workers: int
+            (optional) maximum number of strategies executed at the same
+            time. Defaults to the number of strategies
+
+        Returns
+        ----------
+        A tuple of (notification_list, failures) where notification_list
+        contains the new recommendation sets, in the order of the
+        supplied strategies, and failures is a dictionary of
+        strategy name -> exception
+    '''
+    notification_list = []
+    failures = {}
+
+    if len(strategies) == 0:
+        return (notification_list, failures)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(strategies)) as executor:
+        futures = [executor.submit(execute_strategy, strategy, app_ns, business_date)
+                   for strategy in strategies]
+
+        for (strategy, future) in zip(strategies, futures):
+            try:
+                recommendation_set = future.result()
+                if recommendation_set is not None:
+                    notification_list.append(recommendation_set)
+            except Exception as e:
+                log.error("Could not execute %s strategy, because: %s" %
+                          (strategy.STRATEGY_NAME, str(e)))
+                log.error("".join(traceback.format_exception(
+                    type(e), e, e.__traceback__)))
+                failures[strategy.STRATEGY_NAME] = e
+
+    return (notification_list, failures)
+
 
 def notify_new_recommendation(notification_list: list, app_ns: str):
     '''
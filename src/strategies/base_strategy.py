@@ -1,10 +1,16 @@
 """Author: Mark Hanegraaff -- 2020
 """
 from abc import ABC, abstractmethod
+import os
+import json
+import pickle
+import time
+import hashlib
 import logging
+import threading
 import configparser
 from support import constants
-from exception.exceptions import ValidationError
+from exception.exceptions import BaseError, ValidationError, DataError, AWSError
 from support.configuration import Configuration
 from model.ticker_list import TickerList
 
@@ -20,16 +26,41 @@ class BaseStrategy(ABC):
                 /config/strategies.ini
             S3_RECOMMENDATION_SET_OBJECT_NAME: The S3 object name used to store
                 the recommendation set.
+            RESULT_PARAMETERS: The names of the attributes that, along with
+                the ticker list, determine the result of the strategy,
+                including the ones set by the enable_*() methods that
+                change how it is computed. They key the result cache.
+            RESULT_ATTRIBUTES: The names of the attributes set by
+                generate_recommendation() and stored in the result cache.
 
     '''
 
     STRATEGY_NAME = ""
     CONFIG_SECTION = ""
     S3_RECOMMENDATION_SET_OBJECT_NAME = ""
+    RESULT_PARAMETERS = []
+    RESULT_ATTRIBUTES = ['recommendation_set', 'raw_dataframe']
+
+    # path of the file containing the per ticker metrics of previous
+    # runs. Set by enable_incremental_recompute()
+    ticker_metrics_path = None
+
+    # number of tickers loaded and scored at a time. Set by enable_streaming()
+    chunk_size = None
+
+    # directory and (optional) application namespace of the result
+    # cache. Set by enable_result_cache()
+    result_cache_dir = None
+    result_cache_app_ns = None
+
+    # total seconds allowed to load the data of a run, and seconds
+    # allowed to load the data of each ticker. Set by enable_time_budget()
+    time_budget_seconds = None
+    ticker_deadline_seconds = None
 
     @classmethod
     @abstractmethod
-    def from_configuration(cls, configuration: object, app_ns: str):
+    def from_configuration(cls, configuration: object, app_ns: str, days_offset: int = 0):
         '''
             Every Strategy must have the ability to be initialized from a local
             configuration file. This is how strategies must be intialzied in
@@ -42,10 +73,43 @@ class BaseStrategy(ABC):
                 Configuration object used to initialize this class
             app_ns: str
                 Application namespace used to identify
+            days_offset: int
+                Initializes the strategy as if it was run this many days
+                from now. E.g. 1 will initialize it for tomorrow's run.
+                Used to prepare data ahead of a scheduled run.
 
         '''
         pass
 
+    @abstractmethod
+    def get_data_requests(self):
+        '''
+            Returns the financial data required by generate_recommendation()
+            and display_results(), so that it can be checked or fetched
+            ahead of time.
+
+            Returns
+            -------
+            A list of (data_function, args) tuples, where data_function is
+            one of the intrinio_data functions supported by intrinio_data.is_cached()
+            and args is the tuple of arguments supplied to it. E.g.
+
+            [
+                (intrinio_data.get_daily_stock_close_prices, ('AAPL', date(2020, 6, 8), date(2020, 6, 8)))
+            ]
+        '''
+        pass
+
+    def plan_run(self):
+        '''
+            Returns the plan of generate_recommendation(), i.e. the expected
+            number of API calls, cache hit rate and runtime, without
+            reading any financial data. See run_planner.plan_data_requests()
+        '''
+        from strategies import run_planner
+
+        return run_planner.plan_data_requests(self.get_data_requests())
+
     @abstractmethod
     def generate_recommendation(self):
         '''
@@ -60,3 +124,451 @@ class BaseStrategy(ABC):
     @abstractmethod
     def display_results(self):
         pass
+
+    '''
+        Time budget methods
+    '''
+
+    def enable_time_budget(self, time_budget_seconds: float = None, ticker_deadline_seconds: float = None):
+        '''
+            Limits the time spent loading the data of a run. Tickers whose
+            data is not loaded within the ticker deadline, or before the
+            time budget is exhausted, are dropped from the run, and the
+            recommendation is generated from the remaining ones.
+
+            Parameters
+            ----------
+            time_budget_seconds: float
+                (optional) Total number of seconds allowed to load the
+                data of a run
+            ticker_deadline_seconds: float
+                (optional) Number of seconds allowed to load
+                the data of each ticker
+        '''
+        for limit in (time_budget_seconds, ticker_deadline_seconds):
+            if limit is not None and limit <= 0:
+                raise ValidationError(
+                    "Time budget and ticker deadline must be positive", None)
+
+        self.time_budget_seconds = time_budget_seconds
+        self.ticker_deadline_seconds = ticker_deadline_seconds
+        self._start_time_budget()
+
+    def _start_time_budget(self):
+        '''
+            Starts the clock of the time budget and resets the time spent
+            on each ticker. Called by the strategies before loading the
+            data of a run
+        '''
+        self.budget_deadline = None
+        self.ticker_elapsed_seconds = {}
+        self.dropped_tickers = []
+
+        if self.time_budget_seconds is not None:
+            self.budget_deadline = time.monotonic() + self.time_budget_seconds
+
+    def _load_with_deadline(self, ticker_symbol: str, load_function: object, *args):
+        '''
+            Calls load_function(*args) to load (part of) the data of a ticker,
+            within the ticker deadline and the remaining time budget.
+            Time spent on a ticker accumulates across calls.
+
+            Since a hung request cannot be interrupted, the function is
+            executed by a daemon thread, which is abandoned if the
+            deadline is missed.
+
+            Returns
+            -------
+            The return value of load_function
+
+            Raises
+            -------
+            DataError if the deadline was missed or the time budget is
+            exhausted, in which case the ticker is added to
+            self.dropped_tickers. Errors raised by load_function
+            are passed through
+        '''
+        if self.time_budget_seconds is None and self.ticker_deadline_seconds is None:
+            return load_function(*args)
+
+        timeouts = []
+        if self.budget_deadline is not None:
+            timeouts.append(self.budget_deadline - time.monotonic())
+        if self.ticker_deadline_seconds is not None:
+            timeouts.append(self.ticker_deadline_seconds -
+                            self.ticker_elapsed_seconds.get(ticker_symbol, 0))
+
+        timeout = min(timeouts)
+        if timeout <= 0:
+            self._drop_ticker(ticker_symbol)
+            raise DataError("%s was dropped, because the time budget of %s is exhausted" % (
+                ticker_symbol, self.STRATEGY_NAME), None)
+
+        result = {}
+
+        def load():
+            try:
+                result['value'] = load_function(*args)
+            except Exception as e:
+                result['error'] = e
+
+        start_time = time.monotonic()
+
+        load_thread = threading.Thread(target=load, daemon=True)
+        load_thread.start()
+        load_thread.join(timeout)
+
+        self.ticker_elapsed_seconds[ticker_symbol] = self.ticker_elapsed_seconds.get(
+            ticker_symbol, 0) + time.monotonic() - start_time
+
+        if load_thread.is_alive():
+            self._drop_ticker(ticker_symbol)
+            raise DataError("%s was dropped, because its data was not loaded within %.1f seconds" % (
+                ticker_symbol, timeout), None)
+
+        if 'error' in result:
+            raise result['error']
+
+        return result['value']
+
+    def _with_deadline(self, load_function: object):
+        '''
+            Returns a function of a ticker symbol that calls
+            load_function(ticker_symbol) within its deadline
+            (see _load_with_deadline)
+        '''
+        return lambda ticker_symbol: self._load_with_deadline(
+            ticker_symbol, load_function, ticker_symbol)
+
+    def _drop_ticker(self, ticker_symbol: str):
+        '''
+            Records a ticker that missed its deadline
+        '''
+        if ticker_symbol not in self.dropped_tickers:
+            logging.warning("%s will be dropped from the %s run, because it missed its deadline" % (
+                ticker_symbol, self.STRATEGY_NAME))
+            self.dropped_tickers.append(ticker_symbol)
+
+    '''
+        Streaming methods
+    '''
+
+    def enable_streaming(self, chunk_size: int):
+        '''
+            Loads and scores the tickers in chunks of the supplied size,
+            retaining only the compact summary columns required for the
+            final ranking, so that memory usage does not grow with the raw
+            data of the ticker universe. Used with very large ticker lists.
+
+            Parameters
+            ----------
+            chunk_size: int
+                Number of tickers processed at a time
+        '''
+        if chunk_size is None or chunk_size < 1:
+            raise ValidationError("Chunk size must be at least 1", None)
+
+        self.chunk_size = chunk_size
+
+    def _ticker_chunks(self, ticker_symbols: list):
+        '''
+            Returns a generator of lists of ticker symbols, one per chunk.
+            Unless streaming is enabled, all tickers are returned
+            in a single chunk
+        '''
+        if len(ticker_symbols) == 0:
+            yield []
+            return
+
+        chunk_size = self.chunk_size or len(ticker_symbols)
+
+        for i in range(0, len(ticker_symbols), chunk_size):
+            yield list(ticker_symbols[i:i + chunk_size])
+
+    '''
+        Incremental recompute methods
+    '''
+
+    def enable_incremental_recompute(self, metrics_dir: str):
+        '''
+            Persists the per ticker metrics computed by this strategy, along
+            with a fingerprint of their inputs, so that subsequent runs only
+            recompute the tickers whose inputs changed.
+
+            Parameters
+            ----------
+            metrics_dir: str
+                The directory where the metrics are stored
+        '''
+        from support import util
+
+        util.create_dir(metrics_dir)
+        self.ticker_metrics_path = os.path.join(
+            metrics_dir, "%s-ticker-metrics.pickle" % self.CONFIG_SECTION)
+
+    @staticmethod
+    def ticker_fingerprints(data_requests: list):
+        '''
+            Returns a fingerprint of the inputs of each ticker, computed from
+            the arguments of the supplied data requests (see
+            get_data_requests), where the first argument of each request is
+            the ticker symbol, and the stamp of their stored data
+            (see intrinio_data.data_stamp). Data is not read.
+
+            Tickers with data that is not stored locally have no
+            fingerprint and are always recomputed.
+
+            Returns
+            -------
+            A dictionary of ticker -> fingerprint (str)
+        '''
+        from connectors import intrinio_data
+
+        ticker_stamps = {}
+        for (data_function, args) in data_requests:
+            ticker = args[0]
+            stamps = ticker_stamps.setdefault(ticker, [])
+            if stamps is None:
+                continue
+
+            try:
+                stamp = intrinio_data.data_stamp(data_function, *args)
+            except BaseError as be:
+                logging.debug("%s has no fingerprint, because: %s" %
+                              (ticker, str(be)))
+                stamp = None
+
+            if stamp is None:
+                ticker_stamps[ticker] = None
+                continue
+
+            stamps.append(json.dumps([getattr(data_function, '__name__', str(data_function)),
+                                      args, stamp], default=str))
+
+        return {ticker: hashlib.sha256("|".join(stamps).encode('utf-8')).hexdigest()
+                for (ticker, stamps) in ticker_stamps.items() if stamps is not None}
+
+    def _load_ticker_metrics(self, fingerprints: dict):
+        '''
+            Returns the persisted metrics of the tickers whose fingerprint
+            did not change, or an empty Dataframe if incremental
+            recompute is not enabled.
+
+            Returns
+            -------
+            A Dataframe with a 'ticker' and 'fingerprint' column, followed by
+            the metric columns saved by _save_ticker_metrics()
+        '''
+        import pandas as pd
+
+        if self.ticker_metrics_path is None or not os.path.isfile(self.ticker_metrics_path):
+            return pd.DataFrame({'ticker': [], 'fingerprint': []})
+
+        try:
+            ticker_metrics = pd.read_pickle(self.ticker_metrics_path)
+        except Exception as e:
+            logging.warning("Ignoring the metrics of previous %s runs, because: %s" % (
+                self.STRATEGY_NAME, str(e)))
+            return pd.DataFrame({'ticker': [], 'fingerprint': []})
+
+        unchanged = ticker_metrics['fingerprint'].values == \
+            ticker_metrics['ticker'].map(fingerprints).values
+
+        logging.debug("%d tickers of %s have unchanged inputs" %
+                      (unchanged.sum(), self.STRATEGY_NAME))
+
+        return ticker_metrics[unchanged].reset_index(drop=True)
+
+    def _save_ticker_metrics(self, metrics_dataframe: object, fingerprints: dict, data_requests: list):
+        '''
+            Persists the supplied per ticker metrics along with the
+            fingerprint of the data they were computed from, replacing the
+            metrics of the same tickers. Does nothing if incremental
+            recompute is not enabled.
+
+            Parameters
+            ----------
+            metrics_dataframe: Dataframe
+                A Dataframe with a 'ticker' column followed by the metric columns
+            fingerprints: dict
+                The fingerprints computed at the start of the run
+                (see ticker_fingerprints)
+            data_requests: list
+                The data requests used to compute the metrics. Only used
+                to fingerprint the tickers whose data was not stored
+                locally at the start of the run
+        '''
+        import pandas as pd
+
+        if self.ticker_metrics_path is None:
+            return
+
+        metrics_dataframe = metrics_dataframe.drop_duplicates(
+            'ticker', keep='last').copy()
+
+        unstamped_tickers = set(metrics_dataframe['ticker']) - set(fingerprints)
+        if len(unstamped_tickers) > 0:
+            fingerprints = dict(fingerprints, **self.ticker_fingerprints(
+                [(data_function, args) for (data_function, args)
+                 in data_requests if args[0] in unstamped_tickers]))
+
+        metrics_dataframe['fingerprint'] = metrics_dataframe['ticker'].map(
+            fingerprints)
+
+        if os.path.isfile(self.ticker_metrics_path):
+            try:
+                previous_metrics = pd.read_pickle(self.ticker_metrics_path)
+                previous_metrics = previous_metrics[~previous_metrics['ticker'].isin(
+                    metrics_dataframe['ticker'])]
+                metrics_dataframe = pd.concat(
+                    [previous_metrics, metrics_dataframe], ignore_index=True)
+            except Exception as e:
+                logging.warning("Replacing the metrics of previous %s runs, because: %s" % (
+                    self.STRATEGY_NAME, str(e)))
+
+        try:
+            metrics_dataframe.to_pickle(self.ticker_metrics_path)
+        except Exception as e:
+            logging.warning("Could not save the metrics of %s, because: %s" % (
+                self.STRATEGY_NAME, str(e)))
+
+    '''
+        Result cache methods
+    '''
+
+    def enable_result_cache(self, result_cache_dir: str, app_ns: str = None):
+        '''
+            Stores the results of generate_recommendation() keyed by a
+            fingerprint of the strategy inputs (see result_fingerprint), so
+            that retries and repeated runs with the same inputs reuse them
+            rather than recomputing the strategy.
+
+            Parameters
+            ----------
+            result_cache_dir: str
+                The local directory where results are stored
+            app_ns: str
+                (optional) Application namespace. When supplied, results are
+                also stored in the S3 data bucket, so that they are
+                available to other hosts (e.g. a retried task)
+        '''
+        from support import util
+
+        util.create_dir(result_cache_dir)
+        self.result_cache_dir = result_cache_dir
+        self.result_cache_app_ns = app_ns
+
+    def result_fingerprint(self):
+        '''
+            Returns a fingerprint of the inputs of the strategy, i.e. its
+            name, the attributes listed in RESULT_PARAMETERS
+            and the contents of the ticker list
+
+            Returns
+            -------
+            The fingerprint as a hex string
+        '''
+        result_inputs = {
+            'strategy_name': self.STRATEGY_NAME,
+            'parameters': {parameter: str(getattr(self, parameter))
+                           for parameter in self.RESULT_PARAMETERS},
+            'ticker_list': self.ticker_list.model
+        }
+
+        return hashlib.sha256(json.dumps(
+            result_inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _result_object_name(self):
+        return "%s-%s.pickle" % (self.CONFIG_SECTION, self.result_fingerprint())
+
+    def _s3_result_location(self):
+        '''
+            Returns the (bucket_name, object_name) tuple of the
+            result stored in S3
+        '''
+        from connectors import aws_service_wrapper
+
+        s3_data_bucket_name = aws_service_wrapper.cf_read_export_value(
+            constants.s3_data_bucket_export_name(self.result_cache_app_ns))
+
+        return (s3_data_bucket_name, "%s/%s" % (constants.S3_STRATEGY_RESULTS_FOLDER_PREFIX,
+                                                self._result_object_name()))
+
+    def _load_result(self):
+        '''
+            Restores the attributes listed in RESULT_ATTRIBUTES from the
+            result cache. Results are read from S3 when they are not
+            available locally. Cache errors are logged and treated as misses.
+
+            Returns
+            -------
+            True if the result was restored, False if it must be computed
+        '''
+        from connectors import aws_service_wrapper
+
+        if self.result_cache_dir is None:
+            return False
+
+        result_path = os.path.join(
+            self.result_cache_dir, self._result_object_name())
+
+        try:
+            if not os.path.isfile(result_path) and self.result_cache_app_ns is not None:
+                (bucket_name, object_name) = self._s3_result_location()
+                try:
+                    aws_service_wrapper.s3_download_object(
+                        bucket_name, object_name, result_path)
+                except AWSError as awe:
+                    if not awe.resource_not_found():
+                        raise awe
+
+            if not os.path.isfile(result_path):
+                return False
+
+            with open(result_path, 'rb') as result_file:
+                result = pickle.load(result_file)
+
+            for attribute in self.RESULT_ATTRIBUTES:
+                setattr(self, attribute, result[attribute])
+        except Exception as e:
+            logging.warning("Ignoring the cached %s result, because: %s" % (
+                self.STRATEGY_NAME, str(e)))
+            return False
+
+        logging.info("Using the cached %s result" % self.STRATEGY_NAME)
+        return True
+
+    def _save_result(self):
+        '''
+            Stores the attributes listed in RESULT_ATTRIBUTES in the result
+            cache, keyed by result_fingerprint() (see RESULT_PARAMETERS).
+            Does nothing if the result cache is not enabled, or if
+            tickers were dropped by the time budget, so that a retry
+            loads them rather than reusing a partial result.
+            Cache errors are logged and do not fail the strategy.
+        '''
+        from connectors import aws_service_wrapper
+
+        if self.result_cache_dir is None:
+            return
+
+        if len(getattr(self, 'dropped_tickers', [])) > 0:
+            logging.info("The %s result will not be cached, because %d tickers were dropped" % (
+                self.STRATEGY_NAME, len(self.dropped_tickers)))
+            return
+
+        result_path = os.path.join(
+            self.result_cache_dir, self._result_object_name())
+
+        try:
+            with open(result_path, 'wb') as result_file:
+                pickle.dump({attribute: getattr(self, attribute)
+                             for attribute in self.RESULT_ATTRIBUTES}, result_file)
+
+            if self.result_cache_app_ns is not None:
+                (bucket_name, object_name) = self._s3_result_location()
+                aws_service_wrapper.s3_upload_object(
+                    result_path, bucket_name, object_name)
+        except Exception as e:
+            logging.warning("Could not cache the %s result, because: %s" % (
+                self.STRATEGY_NAME, str(e)))
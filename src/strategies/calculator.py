@@ -9,7 +9,7 @@ from connectors import intrinio_data
 from exception.exceptions import ValidationError, CalculationError, DataError
 
 
-def mark_to_market(data_frame: object, ticker_col_name: str, price_col_name: str, price_date: date):
+def mark_to_market(data_frame: object, ticker_col_name: str, price_col_name: str, price_date: object):
     """
         Peforms a Mark to Market on a Pandas dataframe representing
         a set of stocks given a price date. This is used
@@ -22,6 +22,15 @@ def mark_to_market(data_frame: object, ticker_col_name: str, price_col_name: str
         * current_price
         * actual_return
 
+        When a list of price dates is supplied, the columns are added
+        for each date and suffixed with it, e.g.
+
+        * current_price_2020-06-30
+        * actual_return_2020-06-30
+
+        Prices are fetched once per unique ticker (see get_close_prices)
+        and joined back to the dataframe.
+
         Parmeters
         ---------
         data_frame: Pandas DataFrame
@@ -30,8 +39,8 @@ def mark_to_market(data_frame: object, ticker_col_name: str, price_col_name: str
             Name of the ticker column
         price_col_name: str
             Name of the price column
-        price_date: date
-            Price date, current or historical
+        price_date: date or list of dates
+            Price date(s), current or historical
 
         Returns
         ---------
@@ -48,18 +57,76 @@ def mark_to_market(data_frame: object, ticker_col_name: str, price_col_name: str
         raise ValidationError(
             "Could not extract required fields for Mark to Market calculation", None)
 
-    mmt_prices = []
+    price_dates = price_date if isinstance(price_date, list) else [price_date]
+
+    if len(price_dates) == 0 or None in price_dates:
+        raise ValidationError(
+            "Invalid Parameters supplied to Mark to Market calculation", None)
+
+    price_dataframe = get_close_prices(
+        data_frame[ticker_col_name], price_dates)
+
+    for mmt_date in price_dates:
+        date_str = mmt_date.strftime("%Y-%m-%d")
+        suffix = "_%s" % date_str if isinstance(price_date, list) else ""
+
+        current_price_col_name = 'current_price%s' % suffix
+        # tickers may be categorical (see frame_memory)
+        data_frame[current_price_col_name] = data_frame[ticker_col_name].astype(object).map(
+            price_dataframe[date_str]).values.astype(float)
+        data_frame['actual_return%s' % suffix] = (data_frame[current_price_col_name] -
+                                                  data_frame[price_col_name]) / data_frame[price_col_name]
+    return data_frame
+
+
+def get_close_prices(ticker_symbols: object, price_dates: list):
+    """
+        Returns the close prices of a set of tickers on a set of dates.
+
+        Tickers are deduplicated and the prices of each ticker are read
+        with a single request spanning all dates, falling back to a
+        request for the individual date when the range does not include it
+        (e.g. when the range exceeds the size of a response).
+
+        Parmeters
+        ---------
+        ticker_symbols: list or Pandas Series
+            Ticker symbols, which may contain duplicates
+        price_dates: list
+            List of price dates
+
+        Returns
+        ---------
+        A Pandas DataFrame indexed by ticker with one column
+        per price date, formatted as 'YYYY-MM-DD'
 
-    for ticker in data_frame[ticker_col_name]:
+        Raises
+        ---------
+        DataError if a price could not be read
+    """
+    tickers = pd.unique(pd.Series(ticker_symbols, dtype=object))
+    price_dates = list(dict.fromkeys(price_dates))
+    date_strs = [price_date.strftime("%Y-%m-%d") for price_date in price_dates]
+
+    start_date = min(price_dates)
+    end_date = max(price_dates)
+
+    price_rows = []
+    for ticker in tickers:
         try:
-            latest_price = intrinio_data.get_daily_stock_close_prices(
-                ticker, price_date, price_date)
+            ticker_prices = intrinio_data.get_daily_stock_close_prices(
+                ticker, start_date, end_date)
+
+            price_row = []
+            for (price_date, date_str) in zip(price_dates, date_strs):
+                if date_str in ticker_prices:
+                    price_row.append(ticker_prices[date_str])
+                else:
+                    price_row.append(intrinio_data.get_daily_stock_close_prices(
+                        ticker, price_date, price_date)[date_str])
 
-            mmt_prices.append(latest_price[price_date.strftime("%Y-%m-%d")])
+            price_rows.append(price_row)
         except Exception as e:
             raise DataError("Could not perform MMT calculation", e)
 
-    data_frame['current_price'] = mmt_prices
-    data_frame['actual_return'] = (data_frame['current_price'] -
-                                   data_frame[price_col_name]) / data_frame[price_col_name]
-    return data_frame
+    return pd.DataFrame(price_rows, index=tickers, columns=date_strs, dtype=float)
@@ -0,0 +1,304 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains a factor matrix engine, which loads the financial data
+of a universe of tickers into aligned (dates x tickers) arrays, so that
+strategies and backtests can express their logic as array operations on a
+shared block of data that is built once.
+
+Dates are NYSE business dates. Daily factors (prices and MACD indicators)
+are stored on their date, while monthly factors (Zacks target prices) are
+stored on the last business date of their month, i.e. when they become known.
+Every factor is forward filled, and a mask records where values were
+actually observed.
+
+Data is read through the intrinio_data module, and is therefore
+served by the financial cache whenever possible.
+"""
+import logging
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pandas_market_calendars as mcal
+from connectors import intrinio_data
+from exception.exceptions import BaseError, ValidationError
+
+log = logging.getLogger()
+
+FACTOR_CLOSE = 'close'
+FACTOR_MACD_LINE = 'macd_line'
+FACTOR_SIGNAL_LINE = 'signal_line'
+FACTOR_MACD_HISTOGRAM = 'macd_histogram'
+FACTOR_TARGET_PRICE_MEAN = 'target_price_mean'
+FACTOR_TARGET_PRICE_STD_DEV = 'target_price_std_dev'
+
+MACD_FACTORS = [FACTOR_MACD_LINE, FACTOR_SIGNAL_LINE, FACTOR_MACD_HISTOGRAM]
+FACTORS = [FACTOR_CLOSE] + MACD_FACTORS + \
+    [FACTOR_TARGET_PRICE_MEAN, FACTOR_TARGET_PRICE_STD_DEV]
+
+# calendar days of daily data requested at a time. Must fit in a single
+# page of the Intrinio price and technicals APIs (100 results)
+DAILY_WINDOW_DAYS = 120
+
+
+def business_dates(start_date: date, end_date: date):
+    '''
+        Returns the NYSE business dates between the supplied dates (inclusive)
+        as a Pandas DatetimeIndex
+    '''
+    nyse_cal = mcal.get_calendar('NYSE')
+    market_calendar = nyse_cal.schedule(start_date, end_date)
+
+    return pd.DatetimeIndex(market_calendar.index.date)
+
+
+def _daily_windows(start_date: date, end_date: date):
+    '''
+        Splits a date range into windows of DAILY_WINDOW_DAYS
+    '''
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(
+            window_start + timedelta(days=DAILY_WINDOW_DAYS - 1), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+
+    return windows
+
+
+def _load_daily(ticker: str, start_date: date, end_date: date, load_function: object):
+    '''
+        Reads daily data one window at a time, and returns the merged
+        dictionary of 'YYYY-MM-DD' -> value. Windows that cannot be read
+        (e.g. without any business dates) are skipped.
+    '''
+    daily_dict = {}
+    for (window_start, window_end) in _daily_windows(start_date, end_date):
+        try:
+            daily_dict.update(load_function(ticker, window_start, window_end))
+        except BaseError as be:
+            log.debug("Could not read %s data between %s and %s, because: %s" %
+                      (ticker, window_start, window_end, str(be)))
+
+    return daily_dict
+
+
+def data_requests(ticker_symbols: list, start_date: date, end_date: date,
+                  factors: list = None, macd_parameters: tuple = (12, 26, 9)):
+    '''
+        Returns the data requests made by FactorMatrix.build() given the
+        same parameters, as a list of (data_function, args) tuples
+        (see BaseStrategy.get_data_requests)
+    '''
+    factors = FACTORS if factors is None else factors
+    (fast_period, slow_period, signal_period) = macd_parameters
+
+    requests = []
+    for ticker in pd.unique(pd.Series(ticker_symbols, dtype=object)):
+        for (window_start, window_end) in _daily_windows(start_date, end_date):
+            if FACTOR_CLOSE in factors:
+                requests.append((intrinio_data.get_daily_stock_close_prices,
+                                 (ticker, window_start, window_end)))
+            if any([factor in factors for factor in MACD_FACTORS]):
+                requests.append((intrinio_data.get_macd_indicator,
+                                 (ticker, window_start, window_end, fast_period, slow_period, signal_period)))
+
+        if FACTOR_TARGET_PRICE_MEAN in factors:
+            requests.append((intrinio_data.get_zacks_target_price_mean,
+                             (ticker, start_date, end_date)))
+        if FACTOR_TARGET_PRICE_STD_DEV in factors:
+            requests.append((intrinio_data.get_zacks_target_price_std_dev,
+                             (ticker, start_date, end_date)))
+
+    return requests
+
+
+class FactorMatrix():
+    """
+        A set of aligned (dates x tickers) factor arrays
+    """
+
+    def __init__(self, dates: object, ticker_symbols: list):
+        '''
+            Initializes an empty factor matrix
+
+            Parameters
+            ----------
+            dates: Pandas DatetimeIndex
+                The (sorted) dates of the matrix rows
+            ticker_symbols: list
+                The ticker symbols of the matrix columns
+        '''
+        self.dates = pd.DatetimeIndex(dates)
+        self.ticker_symbols = list(pd.unique(
+            pd.Series(ticker_symbols, dtype=object)))
+
+        # factor -> forward filled values
+        self.values = {}
+        # factor -> True where values were observed
+        self.masks = {}
+        # (ticker, factor, reason) tuples of data that could not be loaded
+        self.failures = []
+
+    @classmethod
+    def build(cls, ticker_symbols: list, start_date: date, end_date: date,
+              factors: list = None, macd_parameters: tuple = (12, 26, 9)):
+        '''
+            Builds a factor matrix for a universe of tickers and date range
+
+            Parameters
+            ----------
+            ticker_symbols: list
+                The universe of tickers
+            start_date, end_date: date
+                The date range (inclusive)
+            factors: list
+                (optional) The factors to load. Defaults to all FACTORS
+            macd_parameters: tuple
+                (fast_period, slow_period, signal_period) of the MACD factors
+
+            Returns
+            ----------
+            A new FactorMatrix
+        '''
+        if start_date > end_date:
+            raise ValidationError("Start date must be before end date", None)
+
+        factors = FACTORS if factors is None else factors
+        unknown_factors = [
+            factor for factor in factors if factor not in FACTORS]
+        if len(unknown_factors) > 0:
+            raise ValidationError("Unknown factors: %s" %
+                                  unknown_factors, None)
+
+        factor_matrix = cls(business_dates(
+            start_date, end_date), ticker_symbols)
+
+        observations = {factor: np.full((len(factor_matrix.dates), len(factor_matrix.ticker_symbols)), np.nan)
+                        for factor in factors}
+
+        (fast_period, slow_period, signal_period) = macd_parameters
+
+        for (column, ticker) in enumerate(factor_matrix.ticker_symbols):
+            if FACTOR_CLOSE in factors:
+                factor_matrix._place_daily(observations[FACTOR_CLOSE], column, _load_daily(
+                    ticker, start_date, end_date, intrinio_data.get_daily_stock_close_prices))
+
+            if any([factor in factors for factor in MACD_FACTORS]):
+                macd_dict = _load_daily(ticker, start_date, end_date,
+                                        lambda ticker, window_start, window_end: intrinio_data.get_macd_indicator(
+                                            ticker, window_start, window_end, fast_period, slow_period, signal_period))
+                for factor in MACD_FACTORS:
+                    if factor in factors:
+                        factor_matrix._place_daily(observations[factor], column, {
+                            date_str: indicators[factor] for (date_str, indicators) in macd_dict.items()})
+
+            for (factor, load_function) in [(FACTOR_TARGET_PRICE_MEAN, intrinio_data.get_zacks_target_price_mean),
+                                            (FACTOR_TARGET_PRICE_STD_DEV, intrinio_data.get_zacks_target_price_std_dev)]:
+                if factor not in factors:
+                    continue
+                try:
+                    factor_matrix._place_monthly(
+                        observations[factor], column, load_function(ticker, start_date, end_date))
+                except BaseError as be:
+                    factor_matrix.failures.append((ticker, factor, str(be)))
+
+        for factor in factors:
+            if FACTOR_CLOSE == factor or factor in MACD_FACTORS:
+                for column in np.flatnonzero(np.isnan(observations[factor]).all(axis=0)):
+                    factor_matrix.failures.append(
+                        (factor_matrix.ticker_symbols[column], factor, "No data was loaded"))
+
+            factor_matrix.add_factor(factor, observations[factor])
+
+        return factor_matrix
+
+    def _place_daily(self, observations: np.ndarray, column: int, daily_dict: dict):
+        '''
+            Copies a dictionary of 'YYYY-MM-DD' -> value into a
+            column of the observations array
+        '''
+        if len(daily_dict) == 0:
+            return
+
+        daily_series = pd.Series(daily_dict, dtype=float)
+        daily_series.index = pd.to_datetime(daily_series.index)
+
+        observations[:, column] = daily_series.groupby(level=0).last().reindex(
+            self.dates).values
+
+    def _place_monthly(self, observations: np.ndarray, column: int, monthly_dict: dict):
+        '''
+            Copies a dictionary of year -> month -> value into a column
+            of the observations array, on the last business date of each month
+        '''
+        if len(self.dates) == 0:
+            return
+
+        for (year, month_dict) in monthly_dict.items():
+            for (month, value) in month_dict.items():
+                month_start = pd.Timestamp(year, month, 1)
+                month_end = month_start + pd.offsets.BMonthEnd(0)
+
+                # months ending after the matrix are not known yet
+                if value is None or month_end > self.dates[-1]:
+                    continue
+
+                row = self.dates.searchsorted(month_end, side='right') - 1
+                if row >= 0 and self.dates[row] >= month_start:
+                    observations[row, column] = value
+
+    def add_factor(self, factor: str, observations: np.ndarray):
+        '''
+            Adds (or replaces) a factor given its (dates x tickers)
+            observations, where missing values are NaN. This can also be
+            used to add factors derived from existing ones.
+        '''
+        observations = np.asarray(observations, dtype=float)
+
+        if observations.shape != (len(self.dates), len(self.ticker_symbols)):
+            raise ValidationError("Factor %s must be shaped (%d, %d)" % (
+                factor, len(self.dates), len(self.ticker_symbols)), None)
+
+        self.masks[factor] = ~np.isnan(observations)
+        self.values[factor] = pd.DataFrame(observations).ffill().values
+
+    def _check_factor(self, factor: str):
+        if factor not in self.values:
+            raise ValidationError(
+                "Factor %s was not loaded" % factor, None)
+
+    def get(self, factor: str):
+        '''
+            Returns the forward filled (dates x tickers) array of a factor
+        '''
+        self._check_factor(factor)
+        return self.values[factor]
+
+    def mask(self, factor: str):
+        '''
+            Returns a (dates x tickers) boolean array that is True
+            where the factor was observed
+        '''
+        self._check_factor(factor)
+        return self.masks[factor]
+
+    def to_dataframe(self, factor: str):
+        '''
+            Returns the forward filled values of a factor as a Pandas
+            Dataframe indexed by date, with one column per ticker
+        '''
+        return pd.DataFrame(self.get(factor), index=self.dates, columns=self.ticker_symbols)
+
+    def as_of(self, factor: str, as_of_date: date):
+        '''
+            Returns the values of a factor as of the supplied date, i.e. on
+            the last business date on or before it, as a Pandas Series
+            indexed by ticker. Values are NaN if the date precedes the matrix
+        '''
+        row = self.dates.searchsorted(pd.Timestamp(as_of_date), side='right') - 1
+
+        if row < 0:
+            return pd.Series(np.nan, index=self.ticker_symbols)
+
+        return pd.Series(self.get(factor)[row], index=self.ticker_symbols)
@@ -0,0 +1,79 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains functions that reduce and report the memory used by
+the Dataframes of the trading strategies contained in this package.
+
+Strategy Dataframes repeat the same few strings (ticker symbols, analysis
+periods, momentum labels) in every row and store every number as a float64.
+Repeated values are converted to categoricals, which store each row as a
+small integer code, and derived metrics that are only used for ranking
+and display are converted to float32. Prices are left as float64, since
+they are part of the recommendation sets and returns.
+"""
+import logging
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger()
+
+
+def compact_dataframe(data_frame: object, category_col_names: list = None, float32_col_names: list = None):
+    """
+        Converts the columns of a Dataframe to more compact types
+
+        Parameters
+        ----------
+        data_frame: Pandas DataFrame
+            The Dataframe to convert
+        category_col_names: list
+            Columns of repeated values (e.g. tickers or periods) converted to
+            categoricals. Integer columns of less than 128 distinct
+            values (e.g. deciles) are converted to int8 instead
+        float32_col_names: list
+            Float columns converted to float32
+
+        Returns
+        ----------
+        A new Dataframe. Columns that are missing are ignored
+    """
+    converted_columns = {}
+
+    for col_name in (category_col_names or []):
+        if col_name not in data_frame.columns:
+            continue
+        column = data_frame[col_name]
+        if pd.api.types.is_integer_dtype(column) and len(column) > 0 \
+                and column.min() >= -128 and column.max() < 128:
+            converted_columns[col_name] = column.astype(np.int8)
+        elif not pd.api.types.is_integer_dtype(column):
+            converted_columns[col_name] = column.astype('category')
+
+    for col_name in (float32_col_names or []):
+        if col_name in data_frame.columns:
+            converted_columns[col_name] = data_frame[col_name].astype(np.float32)
+
+    return data_frame.assign(**converted_columns)
+
+
+def frame_memory(data_frame: object):
+    """
+        Returns the memory used by a Dataframe in bytes, including
+        the contents of its object columns and index
+    """
+    return int(data_frame.memory_usage(index=True, deep=True).sum())
+
+
+def log_frame_memory(stage: str, data_frame: object):
+    """
+        Logs the size and memory used by a Dataframe at a stage of
+        a strategy, e.g. "PRICE_DISPERSION raw_dataframe"
+
+        Returns
+        ----------
+        The memory used by the Dataframe in bytes
+    """
+    memory_bytes = frame_memory(data_frame)
+    log.debug("%s: %d rows, %.3f MB" %
+              (stage, len(data_frame), memory_bytes / (1024 * 1024)))
+
+    return memory_bytes
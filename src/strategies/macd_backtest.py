@@ -0,0 +1,244 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains a vectorized backtest engine for the MACD Crossover
+strategy.
+
+Rather than running the strategy once per business day and trading one day
+at a time, the close prices and MACD indicators of every ticker are loaded
+once into a factor matrix (see the factor_matrix module), and the strategy's
+rules (see MACDCrossoverStrategy.classify_securities) are applied to all
+tickers and dates at once. Trades follow the same rules as the original
+backtest: securities are bought at the close of the day following a bullish
+signal, sold at the close of the day following a bearish one, and positions
+still open at the end of the backtest are not included. Trades are only
+priced from observed close prices.
+"""
+import logging
+from datetime import date
+import numpy as np
+import pandas as pd
+from exception.exceptions import ValidationError, DataError
+from strategies import factor_matrix
+from strategies.factor_matrix import FactorMatrix
+from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+
+log = logging.getLogger()
+
+BACKTEST_FACTORS = [factor_matrix.FACTOR_CLOSE,
+                    factor_matrix.FACTOR_MACD_LINE, factor_matrix.FACTOR_SIGNAL_LINE]
+
+
+def get_data_requests(ticker_symbols: list, start_date: date, end_date: date, macd_parameters: tuple):
+    """
+        Returns the financial data required by load_backtest_matrix() given
+        the same parameters (see BaseStrategy.get_data_requests)
+    """
+    return factor_matrix.data_requests(ticker_symbols, start_date, end_date,
+                                       BACKTEST_FACTORS, macd_parameters)
+
+
+def load_backtest_matrix(ticker_symbols: list, start_date: date, end_date: date, macd_parameters: tuple):
+    """
+        Loads the close prices and MACD indicators of a set of tickers
+
+        Returns
+        ----------
+        A FactorMatrix with the close, macd_line and signal_line factors
+
+        Raises
+        ----------
+        DataError if no prices could be loaded
+    """
+    backtest_matrix = FactorMatrix.build(
+        ticker_symbols, start_date, end_date, BACKTEST_FACTORS, macd_parameters)
+
+    for (ticker, factor, reason) in backtest_matrix.failures:
+        log.warning("%s %s data could not be loaded, because: %s" %
+                    (ticker, factor, reason))
+
+    if not backtest_matrix.mask(factor_matrix.FACTOR_CLOSE).any():
+        raise DataError(
+            "Could not load prices for any of the supplied tickers", None)
+
+    return backtest_matrix
+
+
+def bullish_signals(backtest_matrix: object, divergence_factor_threshold: float):
+    """
+        Classifies every ticker on every date of the matrix
+
+        Only observed values are used, so that a ticker is never
+        bullish on a date without price or MACD data
+
+        Returns
+        ----------
+        A (dates x tickers) boolean NumPy array
+    """
+    observed = np.logical_and.reduce(
+        [backtest_matrix.mask(factor) for factor in BACKTEST_FACTORS])
+
+    (bullish_mask, _) = MACDCrossoverStrategy.classify_securities(
+        backtest_matrix.get(factor_matrix.FACTOR_CLOSE), backtest_matrix.get(factor_matrix.FACTOR_MACD_LINE),
+        backtest_matrix.get(factor_matrix.FACTOR_SIGNAL_LINE), divergence_factor_threshold)
+
+    return bullish_mask & observed
+
+
+def closed_trades(bullish_mask: object):
+    """
+        Returns the closed positions resulting from a (dates x tickers)
+        bullish mask. A position is held on a date if the security was
+        bullish on the previous date, so securities are bought (or sold)
+        on the date following the signal. Positions still open on the
+        last date are not included.
+
+        Returns
+        ----------
+        A tuple of NumPy arrays (columns, buy_rows, sell_rows) with one
+        element per trade, ordered by sell row and column
+    """
+    bullish_mask = np.asarray(bullish_mask, dtype=bool)
+
+    held = np.zeros(bullish_mask.shape, dtype=bool)
+    held[1:] = bullish_mask[:-1]
+
+    changes = np.diff(held.astype(np.int8), axis=0, prepend=0)
+
+    # transitions ordered by column and then row. Entries and exits of
+    # a column alternate, so the nth exit closes the nth entry
+    (entry_columns, entry_rows) = np.nonzero((changes > 0).T)
+    (exit_columns, exit_rows) = np.nonzero((changes < 0).T)
+
+    column_count = bullish_mask.shape[1]
+    exit_counts = np.bincount(exit_columns, minlength=column_count)
+    entry_counts = np.bincount(entry_columns, minlength=column_count)
+    entry_ordinals = np.arange(len(entry_columns)) - \
+        np.repeat(np.cumsum(entry_counts) - entry_counts, entry_counts)
+
+    entry_rows = entry_rows[entry_ordinals < exit_counts[entry_columns]]
+
+    order = np.lexsort((exit_columns, exit_rows))
+
+    return (exit_columns[order], entry_rows[order], exit_rows[order])
+
+
+def price_trades(close_prices: object, columns: object, buy_rows: object, sell_rows: object,
+                 stop_loss_threshold: float):
+    """
+        Prices the trades returned by closed_trades() at the close of their
+        buy and sell dates. Losses are limited by the stop loss threshold.
+
+        Returns
+        ----------
+        A tuple of NumPy arrays (buy_prices, sell_prices, trade_pnl, stop_loss)
+        where stop_loss is True for the trades whose loss exceeded the
+        threshold, and whose PNL is the threshold
+    """
+    close_prices = np.asarray(close_prices, dtype=float)
+
+    buy_prices = close_prices[buy_rows, columns]
+    sell_prices = close_prices[sell_rows, columns]
+
+    trade_pnl = sell_prices / buy_prices - 1
+    stop_loss = trade_pnl < stop_loss_threshold
+
+    return (buy_prices, sell_prices, np.where(stop_loss, stop_loss_threshold, trade_pnl), stop_loss)
+
+
+def simulate_trades(dates: object, ticker_symbols: list, close_prices: object,
+                    bullish_mask: object, stop_loss_threshold: float, observed_prices: object = None):
+    """
+        Simulates the trades resulting from a (dates x tickers) bullish mask
+
+        Parameters
+        ----------
+        dates: list like
+            The business dates of the rows
+        ticker_symbols: list
+            The tickers of the columns
+        close_prices: array like
+            (dates x tickers) close prices used to price the trades
+        bullish_mask: array like
+            (dates x tickers) boolean mask, see bullish_signals()
+        stop_loss_threshold: float
+            Stop Loss Threshold factor, e.g. -0.02 (-2%)
+        observed_prices: array like
+            (optional) (dates x tickers) boolean mask of the prices that were
+            observed, e.g. FactorMatrix.mask(). Trades bought or sold on a
+            date without an observed price are logged and excluded
+
+        Returns
+        ----------
+        A dictionary of trades, ordered by sell date and ticker,
+        with the following keys:
+
+        ticker, buy_date, buy_price, sell_date, sell_price,
+        trade_pnl_factor, false_signal
+
+        sell_price is 'STOP_LOSS' when the loss of a trade exceeds the stop
+        loss threshold, in which case its PNL is the threshold
+    """
+    dates = pd.DatetimeIndex(dates)
+    ticker_symbols = np.asarray(ticker_symbols, dtype=object)
+
+    (columns, buy_rows, sell_rows) = closed_trades(bullish_mask)
+
+    if observed_prices is not None:
+        observed_prices = np.asarray(observed_prices, dtype=bool)
+        priced = observed_prices[buy_rows, columns] & observed_prices[sell_rows, columns]
+
+        for (column, buy_row, sell_row) in zip(columns[~priced], buy_rows[~priced], sell_rows[~priced]):
+            log.warning("The %s trade of %s - %s will be excluded, because its price was not observed" % (
+                ticker_symbols[column], dates[buy_row].date(), dates[sell_row].date()))
+
+        (columns, buy_rows, sell_rows) = (
+            columns[priced], buy_rows[priced], sell_rows[priced])
+
+    (buy_prices, sell_prices, trade_pnl, stop_loss) = price_trades(
+        close_prices, columns, buy_rows, sell_rows, stop_loss_threshold)
+
+    return {
+        'ticker': list(ticker_symbols[columns]),
+        'buy_date': list(dates[buy_rows].date),
+        'buy_price': list(buy_prices),
+        'sell_date': [str(sell_date) for sell_date in dates[sell_rows].date],
+        'sell_price': list(np.where(stop_loss, 'STOP_LOSS', sell_prices.astype(object))),
+        'trade_pnl_factor': list(trade_pnl),
+        'false_signal': list((trade_pnl < 0).astype(int))
+    }
+
+
+def run_backtest(ticker_symbols: list, start_date: date, end_date: date, divergence_factor_threshold: float,
+                 macd_parameters: tuple, stop_loss_threshold: float):
+    """
+        Backtests the MACD Crossover strategy over a date range
+
+        Parameters
+        ----------
+        ticker_symbols: list
+            The universe of tickers
+        start_date, end_date: date
+            The backtest period
+        divergence_factor_threshold: float
+            See MACDCrossoverStrategy
+        macd_parameters: tuple
+            (fast_period, slow_period, signal_period)
+        stop_loss_threshold: float
+            Stop Loss Threshold factor, e.g. -0.02 (-2%)
+
+        Returns
+        ----------
+        A dictionary of trades, see simulate_trades()
+    """
+    if start_date >= end_date:
+        raise ValidationError("Start date must be before end date", None)
+
+    backtest_matrix = load_backtest_matrix(
+        ticker_symbols, start_date, end_date, macd_parameters)
+
+    bullish_mask = bullish_signals(
+        backtest_matrix, divergence_factor_threshold)
+
+    return simulate_trades(backtest_matrix.dates, backtest_matrix.ticker_symbols,
+                           backtest_matrix.get(factor_matrix.FACTOR_CLOSE), bullish_mask, stop_loss_threshold,
+                           backtest_matrix.mask(factor_matrix.FACTOR_CLOSE))
@@ -1,7 +1,9 @@
 """Author: Mark Hanegraaff -- 2020
 """
 
+import os
 import logging
+import numpy as np
 import pandas as pd
 import pandas_market_calendars as mcal
 import dateutil.parser as parser
@@ -9,10 +11,10 @@ from datetime import datetime, timedelta, date, time
 from collections import OrderedDict
 from support import util, constants
 from strategies.base_strategy import BaseStrategy
-from strategies import calculator
+from strategies import calculator, macd_state, frame_memory
 from model.recommendation_set import SecurityRecommendationSet
 from model.ticker_list import TickerList
-from exception.exceptions import ValidationError, DataError
+from exception.exceptions import ValidationError, DataError, FileSystemError
 from connectors import intrinio_data, intrinio_util
 
 log = logging.getLogger()
@@ -42,6 +44,17 @@ class MACDCrossoverStrategy(BaseStrategy):
     STRATEGY_NAME = "MACD_CROSSOVER"
     CONFIG_SECTION = "macd_crossover_strategy"
     S3_RECOMMENDATION_SET_OBJECT_NAME = constants.S3_MACD_CROSSOVER_RECOMMENDATION_SET_OBJECT_NAME
+    RESULT_PARAMETERS = ['analysis_date', 'divergence_factor_threshold',
+                         'macd_fast_period', 'macd_slow_period', 'macd_signal_period',
+                         'macd_state_path', 'ticker_metrics_path']
+
+    # compact column types of the strategy Dataframes (see frame_memory)
+    CATEGORY_COLUMNS = ['ticker_symbol', 'momentum']
+    FLOAT32_COLUMNS = ['macd', 'signal', 'divergence']
+
+    # path of the file containing the MACD state of each ticker.
+    # Set by enable_macd_state()
+    macd_state_path = None
 
     def __init__(self, ticker_list: object, analysis_date: date, divergence_factor_threshold: float, macd_fast_period: int, macd_slow_period: int, macd_signal_period: int):
         '''
@@ -72,13 +85,13 @@ class MACDCrossoverStrategy(BaseStrategy):
         self.macd_signal_period = macd_signal_period
 
     @classmethod
-    def from_configuration(cls, configuration: object, app_ns: str):
+    def from_configuration(cls, configuration: object, app_ns: str, days_offset: int = 0):
         '''
             See BaseStrategy.from_configuration for documentation
         '''
 
         analysis_date = util.get_business_date(
-            constants.BUSINESS_DATE_DAYS_LOOKBACK, constants.BUSINESS_DATE_CUTOVER_TIME)
+            constants.BUSINESS_DATE_DAYS_LOOKBACK + days_offset, constants.BUSINESS_DATE_CUTOVER_TIME)
 
         try:
             config_params = dict(configuration.config[cls.CONFIG_SECTION])
@@ -89,6 +102,8 @@ class MACDCrossoverStrategy(BaseStrategy):
             macd_fast_period = int(config_params['macd_fast_period'])
             macd_slow_period = int(config_params['macd_slow_period'])
             macd_signal_period = int(config_params['macd_signal_period'])
+            incremental_macd = configuration.config[cls.CONFIG_SECTION].getboolean(
+                'incremental_macd', fallback=False)
         except Exception as e:
             raise ValidationError(
                 "Could not read MACD Crossover Strategy configuration parameters", e)
@@ -97,7 +112,88 @@ class MACDCrossoverStrategy(BaseStrategy):
 
         ticker_list = TickerList.try_from_s3(app_ns, ticker_file_name)
 
-        return cls(ticker_list, analysis_date, divergence_factor_threshold, macd_fast_period, macd_slow_period, macd_signal_period)
+        strategy = cls(ticker_list, analysis_date, divergence_factor_threshold,
+                       macd_fast_period, macd_slow_period, macd_signal_period)
+
+        if incremental_macd:
+            strategy.enable_macd_state(constants.STRATEGY_METRICS_DIR)
+
+        return strategy
+
+    def enable_macd_state(self, state_dir: str):
+        '''
+            Computes the MACD of each ticker locally from a persisted state
+            (see the macd_state module) rather than reading it from
+            Intrinio, so that a daily run only requires the latest close
+            price of each ticker. The state of a ticker is rebuilt from its
+            price history when it's missing, it was computed with different
+            parameters, or it's not as of the previous business day.
+
+            Because the state is built from a finite price history, MACD
+            values differ slightly from the ones returned by Intrinio.
+
+            Parameters
+            ----------
+            state_dir: str
+                The directory where the MACD state is stored
+        '''
+        util.create_dir(state_dir)
+        self.macd_state_path = os.path.join(
+            state_dir, "%s-macd-state.pickle" % self.CONFIG_SECTION)
+        self.macd_states = macd_state.load_states(self.macd_state_path)
+
+    def _previous_business_date(self):
+        '''
+            Returns the business date preceding the analysis date
+        '''
+        nyse_cal = mcal.get_calendar('NYSE')
+        market_calendar = nyse_cal.schedule(
+            self.analysis_date - timedelta(days=10), self.analysis_date - timedelta(days=1))
+
+        return market_calendar.index[-1].date()
+
+    def _has_current_macd_state(self, ticker_symbol: str):
+        '''
+            Returns True if the MACD state of the ticker can be updated
+            (or is already up to date) for the analysis date
+        '''
+        state = self.macd_states.get(ticker_symbol)
+
+        if state is None or not macd_state.has_parameters(
+                state, self.macd_fast_period, self.macd_slow_period, self.macd_signal_period):
+            return False
+
+        if state['as_of_date'] == self.analysis_date:
+            return True
+
+        if not hasattr(self, 'previous_business_date'):
+            self.previous_business_date = self._previous_business_date()
+
+        return state['as_of_date'] == self.previous_business_date
+
+    def get_data_requests(self):
+        '''
+            See BaseStrategy.get_data_requests for documentation
+        '''
+        data_requests = []
+
+        for ticker_symbol in self.ticker_list.ticker_symbols:
+            if self.macd_state_path is not None:
+                if self._has_current_macd_state(ticker_symbol):
+                    data_requests.append((intrinio_data.get_daily_stock_close_prices,
+                                          (ticker_symbol, self.analysis_date, self.analysis_date)))
+                else:
+                    data_requests.append((intrinio_data.get_daily_stock_close_prices,
+                                          (ticker_symbol, self.analysis_date - timedelta(days=macd_state.REBUILD_DAYS), self.analysis_date)))
+                continue
+
+            data_requests.append((intrinio_data.get_daily_stock_close_prices,
+                                  (ticker_symbol, self.analysis_date, self.analysis_date)))
+            data_requests.append((intrinio_data.get_macd_indicator,
+                                  (ticker_symbol, self.analysis_date, self.analysis_date,
+                                   self.macd_fast_period, self.macd_slow_period, self.macd_signal_period)))
+
+        return data_requests
 
     def _read_price_metrics(self, ticker_symbol: str):
         '''
@@ -114,6 +210,9 @@ class MACDCrossoverStrategy(BaseStrategy):
                 The past 3 days of MACD Singal values
 
         '''
+        if self.macd_state_path is not None:
+            return self._read_macd_state_metrics(ticker_symbol)
+
         dict_key = self.analysis_date.strftime("%Y-%m-%d")
 
         current_price_dict = intrinio_data.get_daily_stock_close_prices(
@@ -134,6 +233,39 @@ class MACDCrossoverStrategy(BaseStrategy):
 
         return (current_price, macd_line, signal_line)
 
+    def _read_macd_state_metrics(self, ticker_symbol: str):
+        '''
+            Version of _read_price_metrics that computes the MACD from the
+            persisted state of the ticker (see enable_macd_state)
+        '''
+        dict_key = self.analysis_date.strftime("%Y-%m-%d")
+
+        try:
+            if self._has_current_macd_state(ticker_symbol):
+                state = self.macd_states[ticker_symbol]
+                if state['as_of_date'] != self.analysis_date:
+                    current_price_dict = intrinio_data.get_daily_stock_close_prices(
+                        ticker_symbol, self.analysis_date, self.analysis_date)
+                    state = macd_state.update_state(
+                        state, self.analysis_date, current_price_dict[dict_key])
+            else:
+                log.debug("Rebuilding the MACD state of %s" % ticker_symbol)
+                price_dict = intrinio_data.get_daily_stock_close_prices(
+                    ticker_symbol, self.analysis_date - timedelta(days=macd_state.REBUILD_DAYS), self.analysis_date)
+                if dict_key not in price_dict:
+                    raise ValidationError(
+                        "No price as of %s" % dict_key, None)
+                state = macd_state.build_state(
+                    price_dict, self.macd_fast_period, self.macd_slow_period, self.macd_signal_period)
+        except KeyError as ke:
+            raise ValidationError(
+                "Could not read pricing data for %s" % ticker_symbol, ke)
+
+        self.macd_states[ticker_symbol] = state
+        (macd_line, signal_line) = macd_state.macd_values(state)
+
+        return (state['close'], macd_line, signal_line)
+
     def _analyze_security(self, current_price: float, macd_line: float, signal_line: float):
         '''
             Helper function that, based on the price and MACD data determines if a security
@@ -162,6 +294,43 @@ class MACDCrossoverStrategy(BaseStrategy):
         else:
             return False
 
+    @staticmethod
+    def classify_securities(current_prices: object, macd_lines: object, signal_lines: object,
+                            divergence_factor_threshold: float):
+        '''
+            Vectorized version of _analyze_security that classifies any number
+            of securities (e.g. tickers, or tickers x dates) at once, using
+            the same rules.
+
+            Parameters
+            ----------
+            current_prices, macd_lines, signal_lines: array like
+                Arrays of the same shape containing the price and MACD data
+            divergence_factor_threshold: float
+                See __init__
+
+            Returns
+            -------
+            A tuple of NumPy arrays (bullish_mask, divergence) of the
+            same shape as the inputs, where divergence is the
+            MACD histogram (macd_line - signal_line)
+        '''
+        current_prices = np.asarray(current_prices, dtype=float)
+        macd_lines = np.asarray(macd_lines, dtype=float)
+        signal_lines = np.asarray(signal_lines, dtype=float)
+
+        divergence = macd_lines - signal_lines
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            significant_divergence = np.abs(
+                divergence / current_prices) > divergence_factor_threshold
+
+        # a zero MACD or histogram is never bullish
+        bullish_mask = ((macd_lines > 0) | (macd_lines < 0)) & \
+            ((divergence > 0) | ((divergence < 0) & ~significant_divergence))
+
+        return (bullish_mask, divergence)
+
     def generate_recommendation(self):
         '''
             Analyzes all securitues supplied in the ticker list and returns a SecurityRecommendationSet
@@ -171,37 +340,90 @@ class MACDCrossoverStrategy(BaseStrategy):
             internally sets the self.recommendation_set object
 
         '''
+        if self._load_result():
+            return
+
+        ticker_symbols = self.ticker_list.ticker_symbols
+        self._start_time_budget()
+
+        # the metrics of tickers whose inputs did not change are reused
+        data_requests = self.get_data_requests() if self.ticker_metrics_path is not None else []
+        fingerprints = self.ticker_fingerprints(data_requests)
+        previous_metrics = self._load_ticker_metrics(
+            fingerprints).drop_duplicates('ticker').set_index('ticker')
+
+        analysis_chunks = []
+        loaded_chunks = []
+
+        for chunk_tickers in self._ticker_chunks(ticker_symbols):
+            # one row of (current_price, macd_line, signal_line) per ticker
+            ticker_metrics = previous_metrics.reindex(
+                index=chunk_tickers, columns=['price', 'macd_line', 'signal_line'])
+
+            changed = ticker_metrics.isna().any(axis=1).values
+            if self.macd_state_path is not None:
+                # reusing the metrics of a ticker would not advance its
+                # MACD state, so they are only reused when the state is
+                # already as of the analysis date
+                changed = changed | np.array([self.macd_states.get(ticker_symbol, {}).get('as_of_date') != self.analysis_date
+                                              for ticker_symbol in ticker_metrics.index], dtype=bool)
+
+            for ticker_symbol in ticker_metrics.index[changed]:
+                try:
+                    ticker_metrics.loc[ticker_symbol] = self._load_with_deadline(
+                        ticker_symbol, self._read_price_metrics, ticker_symbol)
+                except DataError as de:
+                    if ticker_symbol not in self.dropped_tickers:
+                        raise de
+
+            # tickers that missed their deadline are excluded
+            completed = ~ticker_metrics.index.isin(self.dropped_tickers)
+            if self.ticker_metrics_path is not None:
+                loaded_chunks.append(
+                    ticker_metrics[changed & completed].rename_axis('ticker').reset_index())
+            ticker_metrics = ticker_metrics[completed]
+            chunk_tickers = list(ticker_metrics.index)
+
+            price_metrics = ticker_metrics.values.astype(float).reshape(-1, 3)
+
+            (bullish_mask, divergence) = self.classify_securities(
+                price_metrics[:, 0], price_metrics[:, 1], price_metrics[:, 2], self.divergence_factor_threshold)
+
+            analysis_chunks.append(pd.DataFrame({
+                'ticker_symbol': chunk_tickers,
+                'price': price_metrics[:, 0],
+                'macd': price_metrics[:, 1],
+                'signal': price_metrics[:, 2],
+                'divergence': divergence,
+                'momentum': np.where(bullish_mask, "BULLISH", "BEARISH")
+            }))
+
+        if len(loaded_chunks) > 0:
+            self._save_ticker_metrics(pd.concat(
+                loaded_chunks, ignore_index=True), fingerprints, data_requests)
+
+        if self.macd_state_path is not None:
+            try:
+                macd_state.save_states(
+                    self.macd_state_path, dict(self.macd_states))
+            except FileSystemError as fse:
+                log.warning(str(fse))
+
+        self.raw_dataframe = pd.concat(analysis_chunks, ignore_index=True)
+
+        if len(self.raw_dataframe) == 0 and len(self.dropped_tickers) > 0:
+            raise DataError(
+                "No ticker was loaded within the time budget of %s" % self.STRATEGY_NAME, None)
+
+        self.raw_dataframe = frame_memory.compact_dataframe(
+            self.raw_dataframe, self.CATEGORY_COLUMNS, self.FLOAT32_COLUMNS)
+        frame_memory.log_frame_memory(
+            "%s raw_dataframe" % self.STRATEGY_NAME, self.raw_dataframe)
+
+        bullish_dataframe = self.raw_dataframe[self.raw_dataframe['momentum'] == "BULLISH"]
+        recommended_securities = {ticker_symbol: float(current_price) for (ticker_symbol, current_price)
+                                  in zip(bullish_dataframe['ticker_symbol'], bullish_dataframe['price'])}
 
-        analysis_data = {
-            'ticker_symbol': [],
-            'price': [],
-            'macd': [],
-            'signal': [],
-            'divergence': [],
-            'momentum': []
-        }
-
-        recommended_securities = {}
-
-        for ticker_symbol in self.ticker_list.ticker_symbols:
-            (current_price, macd_line, signal_line) = self._read_price_metrics(
-                ticker_symbol)
-
-            buy_sell_indicator = self._analyze_security(
-                current_price, macd_line, signal_line)
-
-            analysis_data['ticker_symbol'].append(ticker_symbol)
-            analysis_data['price'].append(current_price)
-            analysis_data['macd'].append(macd_line)
-            analysis_data['signal'].append(signal_line)
-            analysis_data['divergence'].append(macd_line - signal_line)
-            if buy_sell_indicator == True:
-                analysis_data['momentum'].append("BULLISH")
-                recommended_securities[ticker_symbol] = current_price
-            else:
-                analysis_data['momentum'].append("BEARISH")
-
-        self.raw_dataframe = pd.DataFrame(analysis_data)
         self.raw_dataframe = self.raw_dataframe.sort_values(
             ['momentum', 'divergence'], ascending=(False, False))
 
@@ -212,6 +434,8 @@ class MACDCrossoverStrategy(BaseStrategy):
             "US_EQUITIES", recommended_securities
         )
 
+        self._save_result()
+
     def display_results(self):
         '''
             Display the final recommendation and the intermediate results of the strategy
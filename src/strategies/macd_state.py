@@ -0,0 +1,171 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains the persisted state of the MACD indicator, which
+allows the MACD of a ticker to be updated in constant time from the state of
+the previous business day and the latest close price, rather than being
+recomputed from its entire price history.
+
+The MACD is a chain of exponential moving averages (EMA):
+
+    fast_ema = EMA(close, fast_period)
+    slow_ema = EMA(close, slow_period)
+    macd_line = fast_ema - slow_ema
+    signal_line = EMA(macd_line, signal_period)
+
+where EMA(t) = alpha * value(t) + (1 - alpha) * EMA(t - 1)
+and alpha = 2 / (period + 1)
+
+The state of a ticker is a dictionary like this:
+
+{
+    'fast_period': 12,
+    'slow_period': 26,
+    'signal_period': 9,
+    'as_of_date': date(2020, 6, 8),
+    'close': 54.74,
+    'fast_ema': 52.3,
+    'slow_ema': 50.2,
+    'signal_ema': 1.17
+}
+"""
+import os
+import logging
+from datetime import date
+import pandas as pd
+from exception.exceptions import ValidationError, FileSystemError
+
+log = logging.getLogger()
+
+# calendar days of price history used to rebuild a state. Must fit in
+# a single page of the Intrinio price API (100 prices)
+REBUILD_DAYS = 120
+
+
+def _alpha(period: int):
+    return 2 / (period + 1)
+
+
+def update_state(state: dict, price_date: date, close: float):
+    '''
+        Returns the state following the supplied close price. When the
+        state has no as_of_date, the price seeds a new state.
+
+        Parameters
+        ----------
+        state: dict
+            The state of the previous business day
+        price_date: date
+            The date of the close price
+        close: float
+            The close price
+
+        Returns
+        ----------
+        A new state dictionary
+    '''
+    if close is None:
+        raise ValidationError("Close price of %s is missing" % price_date, None)
+
+    new_state = dict(state)
+    new_state['as_of_date'] = price_date
+    new_state['close'] = float(close)
+
+    if state.get('as_of_date') is None:
+        # the first price seeds the moving averages
+        new_state['fast_ema'] = new_state['slow_ema'] = float(close)
+        new_state['signal_ema'] = 0.0
+        return new_state
+
+    new_state['fast_ema'] = _alpha(state['fast_period']) * close + \
+        (1 - _alpha(state['fast_period'])) * state['fast_ema']
+    new_state['slow_ema'] = _alpha(state['slow_period']) * close + \
+        (1 - _alpha(state['slow_period'])) * state['slow_ema']
+    new_state['signal_ema'] = _alpha(state['signal_period']) * (new_state['fast_ema'] - new_state['slow_ema']) + \
+        (1 - _alpha(state['signal_period'])) * state['signal_ema']
+
+    return new_state
+
+
+def build_state(price_dict: dict, fast_period: int, slow_period: int, signal_period: int):
+    '''
+        Builds the state of a ticker from its price history
+
+        Parameters
+        ----------
+        price_dict: dict
+            A dictionary of 'YYYY-MM-DD' -> close price, as returned by
+            intrinio_data.get_daily_stock_close_prices()
+        fast_period, slow_period, signal_period: int
+            MACD parameters, e.g. (12, 26, 9)
+
+        Returns
+        ----------
+        The state as of the last price
+    '''
+    if len(price_dict) == 0:
+        raise ValidationError("Price history is empty", None)
+
+    state = {
+        'fast_period': fast_period,
+        'slow_period': slow_period,
+        'signal_period': signal_period,
+        'as_of_date': None
+    }
+
+    for price_date_str in sorted(price_dict.keys()):
+        state = update_state(state, date.fromisoformat(
+            price_date_str), price_dict[price_date_str])
+
+    return state
+
+
+def macd_values(state: dict):
+    '''
+        Returns the (macd_line, signal_line) tuple of a state
+    '''
+    return (state['fast_ema'] - state['slow_ema'], state['signal_ema'])
+
+
+def has_parameters(state: dict, fast_period: int, slow_period: int, signal_period: int):
+    '''
+        Returns True if the state was computed with the supplied parameters
+    '''
+    return (state['fast_period'], state['slow_period'], state['signal_period']) == \
+        (fast_period, slow_period, signal_period)
+
+
+def load_states(state_path: str):
+    '''
+        Loads the persisted states
+
+        Returns
+        ----------
+        A dictionary of ticker -> state. Empty if no states are persisted
+        or if they could not be read
+    '''
+    if not os.path.isfile(state_path):
+        return {}
+
+    try:
+        states = pd.read_pickle(state_path).to_dict(orient='index')
+    except Exception as e:
+        log.warning("Ignoring the MACD state in %s, because: %s" %
+                    (state_path, str(e)))
+        return {}
+
+    for state in states.values():
+        for period in ('fast_period', 'slow_period', 'signal_period'):
+            state[period] = int(state[period])
+
+    return states
+
+
+def save_states(state_path: str, states: dict):
+    '''
+        Persists a dictionary of ticker -> state
+    '''
+    try:
+        pd.DataFrame.from_dict(states, orient='index').to_pickle(state_path)
+    except Exception as e:
+        raise FileSystemError(
+            "Could not save the MACD state to %s" % state_path, e)
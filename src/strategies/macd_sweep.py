@@ -0,0 +1,260 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains a parameter sweep engine for the MACD Crossover strategy.
+
+The close prices of every ticker are loaded once into a (dates x tickers)
+Dataframe (see the factor_matrix module), and the MACD of every parameter combination is computed from them
+as column operations, rather than reading the MACD indicator of each
+combination from Intrinio. Each combination is then classified using the
+strategy's rules (see MACDCrossoverStrategy.classify_securities) and traded
+the same way as the macd_crossover_backtest.py script, i.e. securities are
+bought at the close of the day following a bullish signal and sold at the
+close of the day following a bearish one.
+
+Because the MACD is computed locally from a finite price history, its values
+will differ slightly from the ones returned by the Intrinio API.
+"""
+import itertools
+import logging
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from exception.exceptions import ValidationError, DataError
+from strategies import factor_matrix, macd_backtest
+from strategies.factor_matrix import FactorMatrix
+from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+
+log = logging.getLogger()
+
+# calendar days of prices loaded ahead of the sweep start date,
+# so that the moving averages converge
+WARMUP_DAYS = 180
+
+
+def get_data_requests(ticker_symbols: list, start_date: date, end_date: date):
+    """
+        Returns the financial data required by load_close_prices() given
+        the same parameters (see BaseStrategy.get_data_requests)
+    """
+    return factor_matrix.data_requests(
+        ticker_symbols, start_date - timedelta(days=WARMUP_DAYS), end_date,
+        [factor_matrix.FACTOR_CLOSE])
+
+
+def load_close_prices(ticker_symbols: list, start_date: date, end_date: date):
+    """
+        Loads the daily close prices of a set of tickers, including
+        WARMUP_DAYS of history ahead of the start date, using the
+        factor matrix engine. Tickers without any prices are logged
+        and excluded.
+
+        Returns
+        ----------
+        A tuple of Pandas Dataframes (close_prices, observed_prices) indexed
+        by business date (Timestamp) with one column per ticker. Missing
+        prices are forward filled, and observed_prices is the boolean mask
+        of the prices that were actually observed
+
+        Raises
+        ----------
+        DataError if no prices could be loaded
+    """
+    if start_date > end_date:
+        raise ValidationError("Start date must be before end date", None)
+
+    price_matrix = FactorMatrix.build(
+        ticker_symbols, start_date - timedelta(days=WARMUP_DAYS), end_date,
+        [factor_matrix.FACTOR_CLOSE])
+
+    loaded = price_matrix.mask(factor_matrix.FACTOR_CLOSE).any(axis=0)
+
+    for ticker in np.array(price_matrix.ticker_symbols, dtype=object)[~loaded]:
+        log.warning("%s will be excluded from the sweep, because no prices were loaded" %
+                    ticker)
+
+    if not loaded.any():
+        raise DataError("Could not load prices for any of the supplied tickers", None)
+
+    close_prices = price_matrix.to_dataframe(factor_matrix.FACTOR_CLOSE)
+    observed_prices = pd.DataFrame(price_matrix.mask(factor_matrix.FACTOR_CLOSE),
+                                   index=close_prices.index, columns=close_prices.columns)
+
+    return (close_prices.loc[:, loaded], observed_prices.loc[:, loaded])
+
+
+def compute_macd(close_prices: object, fast_period: int, slow_period: int, signal_period: int,
+                 ema_cache: dict = None):
+    """
+        Computes the MACD and signal lines of every column of a (dates x tickers)
+        price Dataframe.
+
+        Parameters
+        ----------
+        close_prices: Pandas DataFrame
+            Close prices sorted by date
+        fast_period, slow_period, signal_period: int
+            MACD parameters, e.g. (12, 26, 9)
+        ema_cache: dict
+            Optional dictionary of period -> exponential moving average of
+            the close prices, used to share moving averages across calls
+
+        Returns
+        ----------
+        A tuple of Dataframes (macd_line, signal_line) shaped like close_prices
+    """
+    if ema_cache is None:
+        ema_cache = {}
+
+    for period in (fast_period, slow_period):
+        if period not in ema_cache:
+            ema_cache[period] = close_prices.ewm(
+                span=period, adjust=False).mean()
+
+    macd_line = ema_cache[fast_period] - ema_cache[slow_period]
+    signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+
+    return (macd_line, signal_line)
+
+
+def simulate_trades(close_prices: object, bullish_mask: object, stop_loss_threshold: float,
+                    observed_prices: object = None):
+    """
+        Simulates the trades resulting from a (dates x tickers) bullish mask,
+        using the rules of the backtest engine (see macd_backtest.simulate_trades).
+        When an observed_prices mask is supplied, trades bought or sold on
+        a date without an observed price are excluded
+
+        Returns
+        ----------
+        A Dataframe shaped like close_prices containing the PNL factor
+        of each trade on its sell date, and NaN elsewhere
+    """
+    (columns, buy_rows, sell_rows) = macd_backtest.closed_trades(bullish_mask)
+
+    if observed_prices is not None:
+        observed_prices = np.asarray(observed_prices, dtype=bool)
+        priced = observed_prices[buy_rows, columns] & observed_prices[sell_rows, columns]
+        (columns, buy_rows, sell_rows) = (
+            columns[priced], buy_rows[priced], sell_rows[priced])
+
+    (_, _, pnl, _) = macd_backtest.price_trades(
+        close_prices.values, columns, buy_rows, sell_rows, stop_loss_threshold)
+
+    trade_pnl = np.full(close_prices.shape, np.nan)
+    trade_pnl[sell_rows, columns] = pnl
+
+    return pd.DataFrame(trade_pnl, index=close_prices.index, columns=close_prices.columns)
+
+
+def summarize_trades(trade_pnl: object):
+    """
+        Summarizes the trades returned by simulate_trades()
+
+        Returns
+        ----------
+        A dictionary with the following keys:
+
+        trades: number of trades
+        avg_trade_pnl: average PNL factor of a trade
+        false_signal_pct: percentage of losing trades
+        avg_compounded_pnl: compounded PNL factor of each traded
+            security, averaged across securities
+    """
+    pnl_values = trade_pnl.values[~np.isnan(trade_pnl.values)]
+    traded = trade_pnl.notna().any(axis=0)
+
+    if len(pnl_values) == 0:
+        return {
+            'trades': 0,
+            'avg_trade_pnl': np.nan,
+            'false_signal_pct': np.nan,
+            'avg_compounded_pnl': np.nan
+        }
+
+    return {
+        'trades': len(pnl_values),
+        'avg_trade_pnl': pnl_values.mean(),
+        'false_signal_pct': (pnl_values < 0).mean() * 100,
+        'avg_compounded_pnl': ((1 + trade_pnl.loc[:, traded]).prod(axis=0) - 1).mean()
+    }
+
+
+def run_sweep(close_prices: object, start_date: date, end_date: date,
+              fast_periods: list, slow_periods: list, signal_periods: list,
+              divergence_factor_thresholds: list, stop_loss_threshold: float,
+              observed_prices: object = None):
+    """
+        Backtests every combination of the supplied MACD parameters
+        over the same price history.
+
+        Combinations where the fast period is not shorter than the
+        slow period are skipped.
+
+        Parameters
+        ----------
+        close_prices: Pandas DataFrame
+            (dates x tickers) close prices, as returned by load_close_prices()
+        start_date, end_date: date
+            The backtest period. Earlier prices are only used to
+            compute the moving averages
+        fast_periods, slow_periods, signal_periods: list
+            MACD periods to sweep
+        divergence_factor_thresholds: list
+            Divergence factor thresholds to sweep
+        stop_loss_threshold: float
+            Stop Loss Threshold factor, e.g. -0.02 (-2%)
+        observed_prices: Pandas DataFrame
+            (optional) the observed price mask returned by load_close_prices().
+            Trades on prices that were not observed are excluded
+
+        Returns
+        ----------
+        A Pandas Dataframe with one row per combination, sorted by
+        avg_compounded_pnl in descending order, with the following columns:
+
+        fast_period, slow_period, signal_period, divergence_factor_threshold,
+        trades, avg_trade_pnl, false_signal_pct, avg_compounded_pnl
+    """
+    period_combinations = [(fast_period, slow_period, signal_period)
+                           for (fast_period, slow_period, signal_period)
+                           in itertools.product(fast_periods, slow_periods, signal_periods)
+                           if fast_period < slow_period]
+
+    if len(period_combinations) == 0 or len(divergence_factor_thresholds) == 0:
+        raise ValidationError("No valid MACD parameter combinations", None)
+
+    backtest_dates = (close_prices.index >= pd.Timestamp(start_date)) & \
+        (close_prices.index <= pd.Timestamp(end_date))
+    backtest_prices = close_prices.loc[backtest_dates]
+    if observed_prices is not None:
+        observed_prices = observed_prices.loc[backtest_dates]
+
+    if len(backtest_prices) < 2:
+        raise DataError("Not enough prices in the backtest period", None)
+
+    ema_cache = {}
+    sweep_results = []
+
+    for (fast_period, slow_period, signal_period) in period_combinations:
+        (macd_line, signal_line) = compute_macd(
+            close_prices, fast_period, slow_period, signal_period, ema_cache)
+
+        macd_line = macd_line.loc[backtest_dates]
+        signal_line = signal_line.loc[backtest_dates]
+
+        for divergence_factor_threshold in divergence_factor_thresholds:
+            (bullish_mask, _) = MACDCrossoverStrategy.classify_securities(
+                backtest_prices, macd_line, signal_line, divergence_factor_threshold)
+
+            trade_summary = summarize_trades(simulate_trades(
+                backtest_prices, bullish_mask, stop_loss_threshold, observed_prices))
+
+            sweep_results.append(dict({
+                'fast_period': fast_period,
+                'slow_period': slow_period,
+                'signal_period': signal_period,
+                'divergence_factor_threshold': divergence_factor_threshold
+            }, **trade_summary))
+
+    return pd.DataFrame(sweep_results).sort_values(
+        ['avg_compounded_pnl'], ascending=False).reset_index(drop=True)
@@ -1,6 +1,7 @@
 """Author: Mark Hanegraaff -- 2020
 """
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, date, timedelta, timezone
 from connectors import intrinio_data, intrinio_util
@@ -10,10 +11,19 @@ from exception.exceptions import BaseError, ValidationError, DataError
 from model.recommendation_set import SecurityRecommendationSet
 from model.ticker_list import TickerList
 from strategies.base_strategy import BaseStrategy
-from strategies import calculator
+from strategies import calculator, ranking, factor_matrix, frame_memory
+from strategies.factor_matrix import FactorMatrix
 
 log = logging.getLogger()
 
+# calendar days before the end of an analysis period in which
+# its analysis (close) price is searched for
+PRICE_LOOKBACK_DAYS = 5
+
+# format of the floats displayed by display_results(). Passed to the
+# table rather than set globally, since strategies run concurrently
+DISPLAY_FLOAT_FORMAT = '{:.3f}'.format
+
 
 class PriceDispersionStrategy(BaseStrategy):
     """
@@ -59,6 +69,15 @@ class PriceDispersionStrategy(BaseStrategy):
     STRATEGY_NAME = "PRICE_DISPERSION"
     CONFIG_SECTION = "price_dispersion_strategy"
     S3_RECOMMENDATION_SET_OBJECT_NAME = constants.S3_PRICE_DISPERSION_RECOMMENDATION_SET_OBJECT_NAME
+    RESULT_PARAMETERS = ['analysis_period', 'current_price_date', 'output_size',
+                         'ticker_metrics_path']
+    RESULT_ATTRIBUTES = ['recommendation_set', 'raw_dataframe',
+                         'recommendation_dataframe', 'failures_dataframe']
+
+    # compact column types of the strategy Dataframes (see frame_memory)
+    CATEGORY_COLUMNS = ['analysis_period', 'ticker', 'decile']
+    FLOAT32_COLUMNS = ['target_price_avg',
+                       'dispersion_stdev_pct', 'analyst_expected_return']
 
     def __init__(self, ticker_list: list, analysis_period: str, current_price_date: date, output_size: int):
         """
@@ -116,13 +135,14 @@ class PriceDispersionStrategy(BaseStrategy):
         self.recommendation_set = None
         self.raw_dataframe = None
         self.recommendation_dataframe = None
+        self.failures_dataframe = None
 
     @classmethod
-    def from_configuration(cls, configuration: object, app_ns: str):
+    def from_configuration(cls, configuration: object, app_ns: str, days_offset: int = 0):
         '''
             See BaseStrategy.from_configuration for documentation
         '''
-        today = pd.to_datetime('today').date()
+        today = pd.to_datetime('today').date() + timedelta(days=days_offset)
 
         try:
             config_params = dict(configuration.config[cls.CONFIG_SECTION])
@@ -138,27 +158,60 @@ class PriceDispersionStrategy(BaseStrategy):
             pd.Period(today, 'M') - 1).strftime("%Y-%m")
 
         current_price_date = util.get_business_date(
-            constants.BUSINESS_DATE_DAYS_LOOKBACK, constants.BUSINESS_DATE_CUTOVER_TIME)
+            constants.BUSINESS_DATE_DAYS_LOOKBACK + days_offset, constants.BUSINESS_DATE_CUTOVER_TIME)
 
         return cls(ticker_list, analysis_period, current_price_date, output_size)
 
+    def get_data_requests(self):
+        '''
+            See BaseStrategy.get_data_requests for documentation
+        '''
+        data_requests = self._metric_data_requests()
+
+        for ticker in self.ticker_list.ticker_symbols:
+            # used by display_results() to calculate current returns
+            data_requests.append((intrinio_data.get_daily_stock_close_prices,
+                                  (ticker, self.current_price_date, self.current_price_date)))
+
+        return data_requests
+
+    def _metric_data_requests(self):
+        '''
+            Returns the data requests used to compute the metrics
+            of each ticker (see get_data_requests)
+        '''
+        data_requests = []
+
+        dds = self.analysis_start_date
+        dde = self.analysis_end_date
+
+        for ticker in self.ticker_list.ticker_symbols:
+            data_requests.append(
+                (intrinio_data.get_zacks_target_price_std_dev, (ticker, dds, dde)))
+            data_requests.append(
+                (intrinio_data.get_zacks_target_price_mean, (ticker, dds, dde)))
+            data_requests.append(
+                (intrinio_data.get_latest_close_price, (ticker, dde, PRICE_LOOKBACK_DAYS)))
+
+        return data_requests
+
     def _load_financial_data(self):
         """
-            loads the raw financial required by this strategy and returns it as
-            a dictionary suitable for Pandas processing.
+            loads the raw financial data required by this strategy into a
+            (ticker x field) Dataframe, and computes the dispersion and
+            expected return of all securities as column operations.
+
+            Securities whose data could not be loaded are excluded, and
+            recorded in self.failures_dataframe
 
             Returns
             ------------
-            A Dictionary with the following format.
+            A Dataframe with the following columns:
+
+            analysis_period, ticker, analysis_price, target_price_avg,
+            dispersion_stdev_pct, analyst_expected_return
 
-            {
-                'analysis_period': [],
-                'ticker': [],
-                'analysis_price': [],
-                'target_price_avg': [],
-                'dispersion_stdev_pct': [],
-                'analyst_expected_return': []
-            }
+            target_price_avg is omitted when streaming (see _compute_metrics)
 
             Raises
             ------------
@@ -169,63 +222,158 @@ class PriceDispersionStrategy(BaseStrategy):
         logging.debug("Loading financial data for %s strategy" %
                       self.STRATEGY_NAME)
 
-        financial_data = {
-            'analysis_period': [],
-            'ticker': [],
-            'analysis_price': [],
-            'target_price_avg': [],
-            'dispersion_stdev_pct': [],
-            'analyst_expected_return': []
-        }
-
         dds = self.analysis_start_date
         dde = self.analysis_end_date
         year = dds.year
         month = dds.month
 
-        at_least_one = False
-
         logging.debug("Analysis date range is %s, %s" %
                       (dds.strftime("%Y-%m-%d"), dde.strftime("%Y-%m-%d")))
         logging.debug("Analysis price date is %s" %
                       (self.current_price_date.strftime("%Y-%m-%d")))
 
-        for ticker in self.ticker_list.ticker_symbols:
-            try:
-                target_price_sdtdev = intrinio_data.get_zacks_target_price_std_dev(ticker, dds, dde)[
-                    year][month]
-                target_price_avg = intrinio_data.get_zacks_target_price_mean(ticker, dds, dde)[
-                    year][month]
-                dispersion_stdev_pct = target_price_sdtdev / target_price_avg * 100
-
-                analysis_price = intrinio_data.get_latest_close_price(ticker, dde, 5)[
-                    1]
-
-                analyst_expected_return = (
-                    target_price_avg - analysis_price) / analysis_price
-
-                financial_data['analysis_period'].append(self.analysis_period)
-                financial_data['ticker'].append(ticker)
-                financial_data['analysis_price'].append(analysis_price)
-                financial_data['target_price_avg'].append(target_price_avg)
-                financial_data['dispersion_stdev_pct'].append(
-                    dispersion_stdev_pct)
-                financial_data['analyst_expected_return'].append(
-                    analyst_expected_return)
-
-                at_least_one = True
-            except BaseError as be:
-                logging.debug(
-                    "%s will not be factored in recommendation, because: %s" % (ticker, str(be)))
-            except Exception as e:
-                raise DataError(
-                    "Could not read %s financial data" % (ticker), e)
+        # tickers that miss their deadline are recorded as failures
+        self._start_time_budget()
+        field_loaders = {
+            'target_price_sdtdev': self._with_deadline(lambda ticker: intrinio_data.get_zacks_target_price_std_dev(ticker, dds, dde)[year][month]),
+            'target_price_avg': self._with_deadline(lambda ticker: intrinio_data.get_zacks_target_price_mean(ticker, dds, dde)[year][month]),
+            'analysis_price': self._with_deadline(lambda ticker: intrinio_data.get_latest_close_price(ticker, dde, PRICE_LOOKBACK_DAYS)[1])
+        }
 
-        if not at_least_one:
+        # only load the tickers whose inputs changed since the previous run
+        tickers = pd.unique(
+            pd.Series(self.ticker_list.ticker_symbols, dtype=object))
+        data_requests = self._metric_data_requests() if self.ticker_metrics_path is not None else []
+        fingerprints = self.ticker_fingerprints(data_requests)
+        ticker_metrics = self._load_ticker_metrics(fingerprints).reindex(
+            columns=['ticker'] + list(field_loaders.keys())).set_index('ticker')
+
+        data_chunks = []
+        loaded_chunks = []
+        failure_chunks = []
+
+        for chunk_tickers in self._ticker_chunks(tickers):
+            changed_tickers = [ticker for ticker in chunk_tickers
+                               if ticker not in ticker_metrics.index]
+
+            (loaded_data, failures) = self._load_fields(
+                changed_tickers, field_loaders)
+            loaded_data = loaded_data.dropna()
+
+            chunk_data = pd.concat([ticker_metrics.reindex(chunk_tickers).dropna().reset_index(), loaded_data]) \
+                .set_index('ticker').reindex(chunk_tickers).dropna().reset_index()
+
+            data_chunks.append(self._compute_metrics(chunk_data))
+            failure_chunks.append(failures)
+            if self.ticker_metrics_path is not None:
+                loaded_chunks.append(loaded_data)
+
+        self.failures_dataframe = pd.concat(failure_chunks, ignore_index=True)
+
+        if len(loaded_chunks) > 0:
+            self._save_ticker_metrics(pd.concat(
+                loaded_chunks, ignore_index=True), fingerprints, data_requests)
+
+        for failure in self.failures_dataframe.itertuples(index=False):
+            logging.debug("%s will not be factored in recommendation, because: %s" % (
+                failure.ticker, failure.reason))
+
+        data_frame = pd.concat(data_chunks, ignore_index=True)
+
+        if len(data_frame) == 0:
             raise DataError(
                 "Could not load financial data for any if the supplied tickers", None)
 
-        return financial_data
+        data_frame.insert(0, 'analysis_period', self.analysis_period)
+
+        return data_frame
+
+    def _compute_metrics(self, data_frame: object):
+        """
+            Computes the dispersion and expected return of the securities
+            in the supplied (ticker x field) Dataframe.
+
+            Returns
+            ------------
+            A Dataframe with the ticker, analysis_price, target_price_avg,
+            dispersion_stdev_pct and analyst_expected_return columns.
+            When streaming, only the columns required for the ranking
+            are returned and target_price_avg is omitted.
+        """
+        metrics_dataframe = pd.DataFrame({
+            'ticker': data_frame['ticker'],
+            'analysis_price': data_frame['analysis_price'],
+            'target_price_avg': data_frame['target_price_avg'],
+            'dispersion_stdev_pct': data_frame['target_price_sdtdev'] / data_frame['target_price_avg'] * 100,
+            'analyst_expected_return': (data_frame['target_price_avg'] - data_frame['analysis_price']) / data_frame['analysis_price']
+        })
+
+        if self.chunk_size is not None:
+            metrics_dataframe = metrics_dataframe.drop(
+                ['target_price_avg'], axis=1)
+
+        return frame_memory.compact_dataframe(
+            metrics_dataframe, float32_col_names=self.FLOAT32_COLUMNS)
+
+    @staticmethod
+    def _load_fields(ticker_symbols: list, field_loaders: dict):
+        """
+            Loads the supplied fields of every ticker, one column at a time.
+            A field that cannot be loaded is left empty (NaN) and recorded
+            as a failure, and once a ticker fails its remaining
+            fields are not loaded.
+
+            Parameters
+            ------------
+            ticker_symbols : list
+                the ticker symbols to load
+            field_loaders : dict
+                field name -> function returning the value of the
+                field given a ticker symbol
+
+            Returns
+            ------------
+            A tuple of Dataframes (data_frame, failures_dataframe) where
+            data_frame has a 'ticker' column followed by one column per field
+            and failures_dataframe has a (ticker, field, reason) row per failure
+        """
+        tickers = pd.Series(ticker_symbols, dtype=object)
+        columns = {'ticker': tickers}
+        failed = pd.Series(False, index=tickers.index)
+
+        failures = {
+            'ticker': [],
+            'field': [],
+            'reason': []
+        }
+
+        for (field, field_loader) in field_loaders.items():
+            values = []
+            for (ticker, ticker_failed) in zip(tickers, failed):
+                value = None
+                reason = None
+                if not ticker_failed:
+                    try:
+                        value = field_loader(ticker)
+                        if value is None:
+                            reason = "No %s value was returned" % field
+                    except BaseError as be:
+                        reason = str(be)
+                    except Exception as e:
+                        raise DataError(
+                            "Could not read %s financial data" % (ticker), e)
+
+                if reason is not None:
+                    failures['ticker'].append(ticker)
+                    failures['field'].append(field)
+                    failures['reason'].append(reason)
+
+                values.append(float('nan') if value is None else value)
+
+            columns[field] = pd.Series(values, index=tickers.index, dtype=float)
+            failed = failed | columns[field].isna()
+
+        return (pd.DataFrame(columns), pd.DataFrame(failures))
 
     def generate_recommendation(self):
         """
@@ -236,7 +384,7 @@ class PriceDispersionStrategy(BaseStrategy):
                 A SecurityRecommendationSet object with the current 
                 recommendation
             self.raw_dataframe
-                Dataframe with all stocks sorted into deciles. Useful for
+                Dataframe with all stocks and their decile. Useful for
                 displaying intermediate results.
             self.recommendation_dataframe
                 A Dataframe containing just the recommended stocks
@@ -245,25 +393,52 @@ class PriceDispersionStrategy(BaseStrategy):
             ------------
             None
         """
+        if self._load_result():
+            return
 
-        financial_data = self._load_financial_data()
-
-        self.raw_dataframe = pd.DataFrame(financial_data)
-        pd.options.display.float_format = '{:.3f}'.format
+        self.raw_dataframe = pd.DataFrame(
+            self._load_financial_data()).reset_index(drop=True)
 
         # sort the dataframe into deciles
         self.raw_dataframe['decile'] = pd.qcut(
-            financial_data['dispersion_stdev_pct'], 10, labels=False, duplicates='drop')
-        self.raw_dataframe = self.raw_dataframe.sort_values(
-            ['decile', 'analyst_expected_return'], ascending=(False, False))
+            self.raw_dataframe['dispersion_stdev_pct'], 10, labels=False, duplicates='drop')
+
+        self.raw_dataframe = frame_memory.compact_dataframe(
+            self.raw_dataframe, self.CATEGORY_COLUMNS)
+        frame_memory.log_frame_memory(
+            "%s raw_dataframe" % self.STRATEGY_NAME, self.raw_dataframe)
+
+        self._select_recommendation()
 
-        self.recommendation_dataframe = self.raw_dataframe.head(self.output_size).drop(
-            ['decile', 'target_price_avg', 'dispersion_stdev_pct', 'analyst_expected_return'], axis=1)
+        self._save_result()
+
+    def _select_recommendation(self):
+        """
+            Selects the recommended securities from self.raw_dataframe,
+            which must already be sorted into deciles, and sets
+            self.recommendation_dataframe and self.recommendation_set
+        """
+        # select the highest decile and expected return securities
+        # without sorting the entire dataframe
+        if self.chunk_size is None:
+            selected_dataframe = ranking.top_k(
+                self.raw_dataframe, 'decile', 'analyst_expected_return', self.output_size)
+        else:
+            # when streaming, the securities are offered to the selector
+            # one chunk at a time, and only the current top k are retained
+            selector = ranking.TopKSelector(self.output_size)
+            for start in range(0, len(self.raw_dataframe), self.chunk_size):
+                chunk = self.raw_dataframe.iloc[start:start + self.chunk_size]
+                selector.push_all(chunk['decile'], chunk['analyst_expected_return'],
+                                  range(start, start + len(chunk)))
+            selected_dataframe = self.raw_dataframe.iloc[selector.results()]
+
+        self.recommendation_dataframe = selected_dataframe.drop(
+            ['decile', 'target_price_avg', 'dispersion_stdev_pct', 'analyst_expected_return'], axis=1, errors='ignore')
 
         # price the recommended securitues
-        priced_securities = {}
-        for row in self.recommendation_dataframe.itertuples(index=False):
-            priced_securities[row.ticker] = row.analysis_price
+        priced_securities = dict(zip(
+            self.recommendation_dataframe['ticker'], self.recommendation_dataframe['analysis_price']))
 
         # determine the recommendation valid date range
         (valid_from, valid_to) = intrinio_util.get_month_period_range(
@@ -272,6 +447,172 @@ class PriceDispersionStrategy(BaseStrategy):
         self.recommendation_set = SecurityRecommendationSet.from_parameters(datetime.now(), valid_from, valid_to, self.analysis_end_date,
                                                                             self.STRATEGY_NAME, "US Equities", priced_securities)
 
+    @classmethod
+    def evaluate_periods(cls, ticker_list: list, analysis_periods: list, current_price_date: date, output_size: int):
+        """
+            Evaluates the strategy for several analysis periods using a
+            single pass over the financial data. The Zacks history of each
+            ticker is read once for the entire range, and its prices are read
+            through the factor matrix engine, rather than once per period.
+            Dispersion, expected returns and deciles of all periods are then
+            computed as grouped column operations.
+
+            Parameters
+            ------------
+            ticker_list : list of tickers to be included in the analisys
+            analysis_periods: list of analysis periods, e.g. ['2020-05', '2020-06']
+                or pd.period_range('2020-01', '2020-06', freq='M')
+            current_price_date: see the constructor
+            output_size : number of recommended securities of each period
+
+            Returns
+            ------------
+            A dictionary of analysis period (Pandas Period) -> strategy,
+            sorted by period, where each strategy is in the state following
+            generate_recommendation()
+
+            Raises
+            ------------
+            DataError in case financial data could not be loaded for
+            any of the securities of a period
+        """
+        strategies = {}
+        for analysis_period in analysis_periods:
+            strategy = cls(ticker_list, analysis_period,
+                           current_price_date, output_size)
+            strategies[strategy.analysis_period] = strategy
+
+        if len(strategies) == 0:
+            raise ValidationError("At least one analysis period is required", None)
+
+        strategies = dict(sorted(strategies.items()))
+
+        (data_frame, failures_dataframe) = cls._load_period_data(
+            ticker_list.ticker_symbols, list(strategies.values()))
+
+        for failure in failures_dataframe.itertuples(index=False):
+            logging.debug("%s will not be factored in the %s recommendation, because: %s" % (
+                failure.ticker, failure.analysis_period, failure.reason))
+
+        data_frame['decile'] = data_frame.groupby('analysis_period')['dispersion_stdev_pct'].transform(
+            lambda dispersion: pd.qcut(dispersion, 10, labels=False, duplicates='drop'))
+
+
+        for (analysis_period, strategy) in strategies.items():
+            strategy.raw_dataframe = frame_memory.compact_dataframe(
+                data_frame[data_frame['analysis_period'] == analysis_period].reset_index(drop=True), cls.CATEGORY_COLUMNS)
+            frame_memory.log_frame_memory("%s %s raw_dataframe" % (
+                cls.STRATEGY_NAME, analysis_period), strategy.raw_dataframe)
+            strategy.failures_dataframe = failures_dataframe[failures_dataframe['analysis_period'] == analysis_period].drop(
+                ['analysis_period'], axis=1).reset_index(drop=True)
+
+            if len(strategy.raw_dataframe) == 0:
+                raise DataError(
+                    "Could not load %s financial data for any if the supplied tickers" % analysis_period, None)
+
+            strategy._select_recommendation()
+
+        return strategies
+
+    @classmethod
+    def get_period_data_requests(cls, ticker_list: list, analysis_periods: list, current_price_date: date):
+        """
+            Returns the financial data required by evaluate_periods() given
+            the same parameters (see BaseStrategy.get_data_requests)
+        """
+        strategies = [cls(ticker_list, analysis_period, current_price_date, 1)
+                      for analysis_period in analysis_periods]
+
+        if len(strategies) == 0:
+            raise ValidationError("At least one analysis period is required", None)
+
+        dds = min([strategy.analysis_start_date for strategy in strategies])
+        dde = max([strategy.analysis_end_date for strategy in strategies])
+
+        return factor_matrix.data_requests(ticker_list.ticker_symbols, dds, dde, [factor_matrix.FACTOR_TARGET_PRICE_STD_DEV, factor_matrix.FACTOR_TARGET_PRICE_MEAN]) + \
+            factor_matrix.data_requests(ticker_list.ticker_symbols, dds - timedelta(days=PRICE_LOOKBACK_DAYS), dde,
+                                        [factor_matrix.FACTOR_CLOSE])
+
+    @classmethod
+    def _load_period_data(cls, ticker_symbols: list, strategies: list):
+        """
+            Loads the financial data of every (period, ticker) pair of the
+            supplied strategies, and computes their dispersion and expected
+            return. See evaluate_periods()
+
+            Returns
+            ------------
+            A tuple of Dataframes (data_frame, failures_dataframe) where
+            data_frame has the same columns as _load_financial_data() and
+            failures_dataframe has a (analysis_period, ticker, field, reason)
+            row per (period, ticker) pair that could not be loaded
+        """
+        fields = ['target_price_sdtdev', 'target_price_avg', 'analysis_price']
+
+        tickers = pd.unique(pd.Series(ticker_symbols, dtype=object))
+        periods = [strategy.analysis_period for strategy in strategies]
+
+        dds = min([strategy.analysis_start_date for strategy in strategies])
+        dde = max([strategy.analysis_end_date for strategy in strategies])
+
+        # field -> (period, ticker) -> value
+        field_values = {field: {} for field in fields}
+        # (ticker, field) -> reason the field could not be loaded
+        load_errors = {}
+
+        for ticker in tickers:
+            for (field, load_function) in [('target_price_sdtdev', intrinio_data.get_zacks_target_price_std_dev),
+                                           ('target_price_avg', intrinio_data.get_zacks_target_price_mean)]:
+                try:
+                    monthly_values = load_function(ticker, dds, dde)
+                except BaseError as be:
+                    load_errors[(ticker, field)] = str(be)
+                    continue
+
+                for period in periods:
+                    field_values[field][(period, ticker)] = monthly_values.get(
+                        period.year, {}).get(period.month)
+
+        # the analysis price is the latest close price within
+        # PRICE_LOOKBACK_DAYS of the end of each period
+        price_matrix = FactorMatrix.build(
+            tickers, dds - timedelta(days=PRICE_LOOKBACK_DAYS), dde, [factor_matrix.FACTOR_CLOSE])
+        close_prices = price_matrix.to_dataframe(factor_matrix.FACTOR_CLOSE).where(
+            price_matrix.mask(factor_matrix.FACTOR_CLOSE))
+
+        for strategy in strategies:
+            analysis_end_date = pd.Timestamp(strategy.analysis_end_date)
+            period_prices = close_prices.loc[analysis_end_date -
+                                             timedelta(days=PRICE_LOOKBACK_DAYS):analysis_end_date].ffill()
+            if len(period_prices) > 0:
+                for (ticker, price) in period_prices.iloc[-1].items():
+                    field_values['analysis_price'][(
+                        strategy.analysis_period, ticker)] = price
+
+        pair_index = pd.MultiIndex.from_product(
+            [periods, tickers], names=['analysis_period', 'ticker'])
+        period_data = pd.DataFrame({
+            field: pd.Series([field_values[field].get(pair) for pair in pair_index],
+                             index=pair_index, dtype=float)
+            for field in fields
+        })
+
+        # a pair fails on its first missing field
+        missing = period_data.isna()
+        failed = missing.any(axis=1)
+        failed_fields = missing.loc[failed].idxmax(axis=1)
+
+        failures_dataframe = failed_fields.rename('field').reset_index()
+        failures_dataframe['reason'] = [
+            load_errors.get((ticker, field), "No %s value was returned" % field)
+            for (ticker, field) in zip(failures_dataframe['ticker'], failures_dataframe['field'])]
+
+        data_frame = period_data.loc[~failed].reset_index()
+        metrics_dataframe = strategies[0]._compute_metrics(data_frame)
+        metrics_dataframe.insert(0, 'analysis_period', data_frame['analysis_period'])
+
+        return (metrics_dataframe.reset_index(drop=True), failures_dataframe)
+
     def display_results(self):
         '''
             Displays the results of the strategy to the screen.
@@ -281,8 +622,8 @@ class PriceDispersionStrategy(BaseStrategy):
         log.info("Calculating Current Returns")
         raw_dataframe = calculator.mark_to_market(
             self.raw_dataframe, 'ticker', 'analysis_price', self.current_price_date)
-        recommendation_dataframe = calculator.mark_to_market(
-            self.recommendation_dataframe, 'ticker', 'analysis_price', self.current_price_date)
+        # the recommended securities are a subset of the raw dataframe
+        recommendation_dataframe = raw_dataframe.loc[self.recommendation_dataframe.index]
 
         log.info("")
         log.info("Recommended Securities")
@@ -297,6 +638,10 @@ class PriceDispersionStrategy(BaseStrategy):
         log.info("Analysis Period - %s, Actual Returns as of: %s" %
                  (self.analysis_period, self.current_price_date))
 
+        raw_dataframe = raw_dataframe.sort_values(
+            ['decile', 'analyst_expected_return'], ascending=(False, False))
+
         # Using the logger will mess up the header of this table
         print(raw_dataframe[['analysis_period', 'ticker', 'dispersion_stdev_pct',
-                             'analyst_expected_return', 'actual_return', 'decile']].to_string(index=False))
+                             'analyst_expected_return', 'actual_return', 'decile']].to_string(
+            index=False, float_format=DISPLAY_FLOAT_FORMAT))
@@ -0,0 +1,172 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains ranking functions shared by the trading strategies
+contained in this package.
+
+Strategies rank securities by a bucket (e.g. a decile) and then by a value
+within the bucket (e.g. an expected return), both in descending order, and
+only recommend the top few. Rather than sorting the entire universe, these
+functions select the top k rows using partial selection, and order
+ties the way a stable sort would (i.e. by their original position).
+"""
+import heapq
+import numpy as np
+from exception.exceptions import ValidationError
+
+
+def _ranking_keys(keys: object):
+    '''
+        Converts a ranking key into a float array where missing
+        values (NaN) rank last
+    '''
+    keys = np.asarray(keys, dtype=float)
+    return np.where(np.isnan(keys), -np.inf, keys)
+
+
+def top_k_indices(buckets: object, values: object, k: int):
+    """
+        Returns the positions of the top k rows ranked by bucket and then value,
+        in descending order. Yields the same ordering as:
+
+        data_frame.sort_values([bucket, value], ascending=(False, False)).head(k)
+
+        but only the selected rows are sorted. Missing values rank last.
+
+        Parameters
+        ----------
+        buckets: array like
+            The primary ranking key of each row, e.g. its decile
+        values: array like
+            The secondary ranking key of each row, e.g. its expected return
+        k: int
+            The number of rows to select
+
+        Returns
+        ----------
+        A NumPy array with the positions of the selected rows, best first
+    """
+    if k is None or k < 0:
+        raise ValidationError("k must not be negative", None)
+
+    buckets = _ranking_keys(buckets)
+    values = _ranking_keys(values)
+
+    if len(buckets) != len(values):
+        raise ValidationError(
+            "Buckets and values must have the same length", None)
+
+    row_count = len(buckets)
+
+    if k >= row_count:
+        candidates = np.arange(row_count)
+    elif k == 0:
+        candidates = np.arange(0)
+    else:
+        # every row above the kth largest bucket is selected, and the
+        # remainder is selected from the boundary bucket by value
+        bucket_threshold = np.partition(
+            buckets, row_count - k)[row_count - k]
+        above = np.flatnonzero(buckets > bucket_threshold)
+        boundary = np.flatnonzero(buckets == bucket_threshold)
+
+        needed = k - len(above)
+        boundary_values = values[boundary]
+
+        if needed < len(boundary):
+            value_threshold = np.partition(
+                boundary_values, len(boundary) - needed)[len(boundary) - needed]
+            greater = boundary[boundary_values > value_threshold]
+            ties = boundary[boundary_values ==
+                            value_threshold][:needed - len(greater)]
+            boundary = np.concatenate((greater, ties))
+
+        candidates = np.concatenate((above, boundary))
+
+    order = np.lexsort(
+        (candidates, -values[candidates], -buckets[candidates]))
+
+    return candidates[order]
+
+
+def top_k(data_frame: object, bucket_col_name: str, value_col_name: str, k: int):
+    """
+        Returns the top k rows of a Pandas Dataframe ranked by bucket and
+        then value, in descending order (see top_k_indices)
+
+        Returns
+        ----------
+        A new dataframe with the selected rows, best first
+    """
+    if (bucket_col_name not in data_frame.columns
+            or value_col_name not in data_frame.columns):
+        raise ValidationError(
+            "Could not extract required fields for ranking", None)
+
+    return data_frame.iloc[top_k_indices(
+        data_frame[bucket_col_name].values, data_frame[value_col_name].values, k)]
+
+
+class TopKSelector():
+    """
+        Selects the top k items of a stream ranked by bucket and then value,
+        in descending order, using a bounded heap. Memory usage is
+        proportional to k rather than to the length of the stream.
+
+        Items with the same bucket and value are ranked in the
+        order they were pushed.
+    """
+
+    def __init__(self, k: int):
+        '''
+            Initializes the selector
+
+            Parameters
+            ----------
+            k : int
+            The number of items to select
+        '''
+        if k is None or k < 0:
+            raise ValidationError("k must not be negative", None)
+
+        self.k = k
+        self.heap = []
+        self.sequence = 0
+
+    def push(self, bucket: float, value: float, item: object):
+        '''
+            Offers an item to the selector. Missing (None or NaN)
+            buckets and values rank last
+        '''
+        entry = (_ranking_key(bucket), _ranking_key(value),
+                 -self.sequence, item)
+        self.sequence += 1
+
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif self.k > 0 and entry[:3] > self.heap[0][:3]:
+            heapq.heapreplace(self.heap, entry)
+
+    def push_all(self, buckets: object, values: object, items: object):
+        '''
+            Offers a batch of items to the selector, e.g. a chunk of
+            ranked securities
+        '''
+        for (bucket, value, item) in zip(buckets, values, items):
+            self.push(bucket, value, item)
+
+    def results(self):
+        '''
+            Returns the list of selected items, best first
+        '''
+        return [entry[3] for entry in sorted(self.heap, key=lambda entry: entry[:3], reverse=True)]
+
+
+def _ranking_key(key: float):
+    '''
+        Converts a single ranking key into a float where missing
+        values rank last
+    '''
+    if key is None or np.isnan(key):
+        return -np.inf
+
+    return float(key)
@@ -0,0 +1,109 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains a planner that estimates the cost of a strategy or
+backtest run before it is executed.
+
+Given the data requests of a run (see BaseStrategy.get_data_requests), it
+checks which ones are already cached and estimates the number of Intrinio
+API calls the run will make, its cache hit rate and its runtime, based on
+the endpoint latencies recorded by previous runs
+(see intrinio_data.get_endpoint_latencies).
+"""
+import logging
+import pandas as pd
+from connectors import intrinio_data
+
+log = logging.getLogger()
+
+# latency assumed for endpoints that were never called
+DEFAULT_LATENCY_SECONDS = 0.5
+
+
+def plan_data_requests(data_requests: list, endpoint_latencies: dict = None):
+    """
+        Plans the execution of a list of data requests. Duplicate
+        requests are only counted once, since they are served by the
+        cache after the first one.
+
+        Parameters
+        ----------
+        data_requests: list
+            A list of (data_function, args) tuples
+        endpoint_latencies: dict
+            (optional) endpoint -> average latency in seconds. Defaults to
+            the latencies recorded by previous runs
+
+        Returns
+        ----------
+        A dictionary with the following keys:
+
+        data_requests: number of unique data requests
+        cached_requests: number of requests served by the cache
+        api_calls: expected number of API calls
+        cache_hit_rate: percentage of requests served by the cache
+        estimated_runtime_seconds: expected time spent calling the API
+        endpoints: Pandas Dataframe with the requests, api_calls,
+            avg_latency_seconds and estimated_seconds of each endpoint
+        missing_requests: list of the data requests that are not cached
+    """
+    if endpoint_latencies is None:
+        endpoint_latencies = intrinio_data.get_endpoint_latencies()
+
+    unique_requests = list(dict.fromkeys(data_requests))
+
+    endpoints = []
+    cached = []
+    missing_requests = []
+
+    for data_request in unique_requests:
+        (data_function, args) = data_request
+
+        endpoints.append(intrinio_data.get_data_endpoint(data_function))
+        cached.append(intrinio_data.is_cached(data_function, *args))
+
+        if not cached[-1]:
+            missing_requests.append(data_request)
+
+    request_dataframe = pd.DataFrame({
+        'endpoint': pd.Series(endpoints, dtype=object),
+        'cached': pd.Series(cached, dtype=bool)
+    })
+
+    endpoints_dataframe = request_dataframe.groupby('endpoint', sort=True).agg(
+        requests=('cached', 'size'), cached_requests=('cached', 'sum')).reset_index()
+    endpoints_dataframe['api_calls'] = endpoints_dataframe['requests'] - \
+        endpoints_dataframe['cached_requests']
+    endpoints_dataframe['avg_latency_seconds'] = endpoints_dataframe['endpoint'].map(
+        endpoint_latencies).astype(float).fillna(DEFAULT_LATENCY_SECONDS)
+    endpoints_dataframe['estimated_seconds'] = endpoints_dataframe['api_calls'] * \
+        endpoints_dataframe['avg_latency_seconds']
+
+    request_count = len(unique_requests)
+    cached_count = int(request_dataframe['cached'].sum())
+
+    return {
+        'data_requests': request_count,
+        'cached_requests': cached_count,
+        'api_calls': request_count - cached_count,
+        'cache_hit_rate': cached_count / request_count * 100 if request_count > 0 else 100.0,
+        'estimated_runtime_seconds': float(endpoints_dataframe['estimated_seconds'].sum()),
+        'endpoints': endpoints_dataframe.drop(['cached_requests'], axis=1),
+        'missing_requests': missing_requests
+    }
+
+
+def display_plan(run_name: str, run_plan: dict):
+    """
+        Displays a plan returned by plan_data_requests() to the screen
+    """
+    log.info("Run plan of %s" % run_name)
+    log.info("Data Requests: %d" % run_plan['data_requests'])
+    log.info("Cached Requests: %d" % run_plan['cached_requests'])
+    log.info("Expected API Calls: %d" % run_plan['api_calls'])
+    log.info("Cache Hit Rate: %.2f%%" % run_plan['cache_hit_rate'])
+    log.info("Estimated Runtime: %.1f seconds" %
+             run_plan['estimated_runtime_seconds'])
+
+    if len(run_plan['endpoints']) > 0:
+        # Using the logger will mess up the header of this table
+        print(run_plan['endpoints'].to_string(index=False))
@@ -0,0 +1,188 @@
+"""Author: Mark Hanegraaff -- 2020
+
+A registry of the trading strategies contained in this package.
+
+Strategies are discovered by parsing the source of the modules in this
+package, without importing them, so that only the strategies enabled in
+the configuration (/config/strategies.ini) and their dependencies are
+loaded. A strategy is enabled when its configuration section is present
+and does not contain 'enabled = false'. A 'chunk_size' value enables
+the streaming mode of the strategy (see BaseStrategy.enable_streaming),
+and 'time_budget_seconds' and 'ticker_deadline_seconds' values limit
+the time spent loading its data (see BaseStrategy.enable_time_budget).
+"""
+import ast
+import os
+import logging
+import importlib
+import pkgutil
+from exception.exceptions import ValidationError
+
+log = logging.getLogger()
+
+# name of the optional configuration key used to disable a strategy
+ENABLED_CONFIG_KEY = 'enabled'
+# name of the optional configuration key used to enable streaming
+CHUNK_SIZE_CONFIG_KEY = 'chunk_size'
+# names of the optional configuration keys used to enable a time budget
+TIME_BUDGET_CONFIG_KEY = 'time_budget_seconds'
+TICKER_DEADLINE_CONFIG_KEY = 'ticker_deadline_seconds'
+
+# config section -> (module name, class name)
+_STRATEGY_INDEX = {}
+
+
+def discover_strategies():
+    '''
+        Returns the strategies defined in this package, i.e. the
+        BaseStrategy subclasses declaring a CONFIG_SECTION.
+
+        Returns
+        -------
+        A dictionary of CONFIG_SECTION -> (module name, class name). E.g.
+
+        {
+            'macd_crossover_strategy': ('strategies.macd_crossover_strategy', 'MACDCrossoverStrategy')
+        }
+    '''
+    if len(_STRATEGY_INDEX) > 0:
+        return _STRATEGY_INDEX
+
+    package_path = os.path.dirname(__file__)
+
+    for module_info in pkgutil.iter_modules([package_path]):
+        module_path = os.path.join(package_path, "%s.py" % module_info.name)
+        if not os.path.isfile(module_path):
+            continue
+
+        try:
+            with open(module_path) as module_file:
+                module_tree = ast.parse(module_file.read())
+        except Exception as e:
+            log.warning("Could not parse %s, because: %s" %
+                        (module_path, str(e)))
+            continue
+
+        for (class_name, config_section) in _find_strategy_classes(module_tree):
+            _STRATEGY_INDEX[config_section] = (
+                "%s.%s" % (__package__, module_info.name), class_name)
+
+    return _STRATEGY_INDEX
+
+
+def _find_strategy_classes(module_tree: object):
+    '''
+        Returns the (class name, config section) of the classes in the
+        supplied module (AST) that extend BaseStrategy and assign
+        a string literal to CONFIG_SECTION
+    '''
+    strategy_classes = []
+
+    for node in module_tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        if 'BaseStrategy' not in [base.id for base in node.bases if isinstance(base, ast.Name)]:
+            continue
+
+        for statement in node.body:
+            if isinstance(statement, ast.Assign) and \
+                    any(isinstance(target, ast.Name) and target.id == 'CONFIG_SECTION' for target in statement.targets) and \
+                    isinstance(statement.value, ast.Constant) and isinstance(statement.value.value, str):
+                strategy_classes.append((node.name, statement.value.value))
+
+    return strategy_classes
+
+
+def enabled_config_sections(configuration: object):
+    '''
+        Returns the configuration sections of the enabled strategies,
+        in the order they appear in the configuration
+    '''
+    strategy_index = discover_strategies()
+
+    config_sections = []
+    for config_section in configuration.config.sections():
+        if config_section not in strategy_index:
+            continue
+        if not configuration.config[config_section].getboolean(ENABLED_CONFIG_KEY, fallback=True):
+            log.info("Strategy %s is disabled" % config_section)
+            continue
+        config_sections.append(config_section)
+
+    return config_sections
+
+
+def load_strategy_class(config_section: str):
+    '''
+        Imports and returns the strategy class associated with
+        the supplied configuration section
+    '''
+    strategy_index = discover_strategies()
+
+    if config_section not in strategy_index:
+        raise ValidationError("Unknown strategy: '%s'. Available strategies are: %s" %
+                              (config_section, str(sorted(strategy_index.keys()))), None)
+
+    (module_name, class_name) = strategy_index[config_section]
+
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except Exception as e:
+        raise ValidationError("Could not load strategy: '%s'" %
+                              config_section, e)
+
+
+def load_strategies(configuration: object, app_ns: str, days_offset: int = 0, config_section: str = None):
+    '''
+        Initializes the enabled strategies from the supplied configuration.
+
+        Parameters
+        ----------
+        configuration: Configuration
+            Configuration object used to initialize the strategies
+        app_ns: str
+            Application namespace
+        days_offset: int
+            See BaseStrategy.from_configuration
+        config_section: str
+            (optional) only initialize the strategy associated with this
+            configuration section, whether it's enabled or not
+
+        Returns
+        -------
+        A list of BaseStrategy objects
+    '''
+    if config_section is not None:
+        if not configuration.config.has_section(config_section):
+            raise ValidationError("Strategy '%s' is not configured" %
+                                  config_section, None)
+        config_sections = [config_section]
+    else:
+        config_sections = enabled_config_sections(configuration)
+
+    strategies = []
+    for config_section in config_sections:
+        strategy = load_strategy_class(config_section).from_configuration(
+            configuration, app_ns, days_offset)
+
+        section = configuration.config[config_section]
+        try:
+            chunk_size = section.getint(CHUNK_SIZE_CONFIG_KEY, fallback=None)
+            time_budget_seconds = section.getfloat(
+                TIME_BUDGET_CONFIG_KEY, fallback=None)
+            ticker_deadline_seconds = section.getfloat(
+                TICKER_DEADLINE_CONFIG_KEY, fallback=None)
+        except Exception as e:
+            raise ValidationError("Invalid streaming or time budget parameters for strategy: '%s'" %
+                                  config_section, e)
+
+        if chunk_size is not None:
+            strategy.enable_streaming(chunk_size)
+
+        if time_budget_seconds is not None or ticker_deadline_seconds is not None:
+            strategy.enable_time_budget(
+                time_budget_seconds, ticker_deadline_seconds)
+
+        strategies.append(strategy)
+
+    return strategies
@@ -18,6 +18,23 @@ BUSINESS_DATE_CUTOVER_TIME = time(4, 0, 0)
 APP_DATA_DIR = "./app_data/"
 TICKER_DATA_DIR = "./ticker-data"
 FINANCIAL_DATA_DIR = "./financial-data/"
+PRICE_STORE_DIR = "./financial-data/price-store/"
+STRATEGY_METRICS_DIR = "./financial-data/strategy-metrics/"
+STRATEGY_RESULTS_DIR = "./financial-data/strategy-results/"
+ENDPOINT_LATENCIES_FILE = "./financial-data/endpoint-latencies.json"
+
+# environment variable used to set the number of financial cache shards.
+# Multiple processes sharing the same cache should use a sharded cache
+FINANCIAL_CACHE_SHARDS_ENV_VAR = "FINANCIAL_CACHE_SHARDS"
+# environment variable used to enable write behind (asynchronous)
+# cache writes. Set to "true" to enable
+FINANCIAL_CACHE_WRITE_BEHIND_ENV_VAR = "FINANCIAL_CACHE_WRITE_BEHIND"
+# environment variable used to set the path of a shared, read only cache
+# used as the base layer of the financial cache
+FINANCIAL_CACHE_BASE_DIR_ENV_VAR = "FINANCIAL_CACHE_BASE_DIR"
+# environment variable used to enable the intrinio offline (cache only) mode.
+# Set to "raise" or "report". See intrinio_data.set_offline_mode()
+INTRINIO_OFFLINE_MODE_ENV_VAR = "INTRINIO_OFFLINE_MODE"
 CONFIG_FILE_PATH = "./config/strategies.ini"
 
 
@@ -41,6 +58,7 @@ def s3_data_bucket_export_name(app_ns):
 
 S3_TICKER_FILE_FOLDER_PREFIX = "ticker-files"
 S3_RECOMMENDATION_SET_FOLDER_PREFIX = "base-recommendations"
+S3_STRATEGY_RESULTS_FOLDER_PREFIX = "strategy-results"
 S3_RECOMMENDATION_SET_OBJECT_NAME = "security-recommendation-set.json"
 
 S3_MACD_CROSSOVER_RECOMMENDATION_SET_OBJECT_NAME = "macd-crossover-recommendation-set.json"
@@ -2,20 +2,161 @@
 """
 from io import BytesIO
 import atexit
-from diskcache import Cache
+import os
+import json
+import fcntl
+import pickle
+import sqlite3
+import time
+import threading
+from datetime import datetime, date
+from urllib.request import pathname2url
+from diskcache import Cache, Disk, Timeout
+from diskcache.core import DBNAME
 from support import util, constants
-from exception.exceptions import ValidationError
+from exception.exceptions import ValidationError, FileSystemError
 import logging
 
 log = logging.getLogger()
 
 
+# marker used to queue the deletion of a key
+DELETED = object()
+
+
+class ReadOnlyCache():
+    """
+        A read only view of a cache created by FinancialCache, used as the
+        shared base layer of a cache.
+
+        The underlining databases are opened as immutable and memory mapped,
+        so that no locks are acquired and any number of processes
+        can read the same base concurrently.
+    """
+
+    # maximum number of bytes of each database that will be memory mapped
+    MMAP_SIZE_BYTES = 4 * 1024 ** 3
+
+    def __init__(self, path: str):
+        '''
+            Opens a cache (sharded or not) in read only mode
+
+            Parameters
+            ----------
+            path : str
+            The path of an existing cache
+        '''
+        if path is None or not os.path.isdir(path):
+            raise FileSystemError(
+                "Could not open read only cache: %s" % path, None)
+
+        # a sharded cache stores each shard in a numbered sub directory
+        shard_paths = [os.path.join(path, "%03d" % i)
+                       for i in range(0, len(os.listdir(path)))]
+        shard_paths = [shard_path for shard_path in shard_paths
+                       if os.path.isfile(os.path.join(shard_path, DBNAME))]
+        if len(shard_paths) == 0:
+            shard_paths = [path]
+
+        self.path = path
+        self.disks = []
+        self.connections = []
+
+        for shard_path in shard_paths:
+            db_path = os.path.abspath(os.path.join(shard_path, DBNAME))
+            try:
+                connection = sqlite3.connect(
+                    "file:%s?mode=ro&immutable=1" % pathname2url(db_path),
+                    uri=True, check_same_thread=False)
+                connection.execute("PRAGMA mmap_size = %d" %
+                                   self.MMAP_SIZE_BYTES)
+            except Exception as e:
+                raise FileSystemError(
+                    "Could not open read only cache: %s" % db_path, e)
+
+            self.disks.append(Disk(shard_path))
+            self.connections.append(connection)
+
+    def _shard_index(self, key: str):
+        if len(self.disks) > 1:
+            return self.disks[0].hash(key) % len(self.disks)
+        return 0
+
+    def get(self, key: str):
+        """
+            Returns the value of the supplied key, or None if the key
+            is not present
+        """
+        shard_index = self._shard_index(key)
+        disk = self.disks[shard_index]
+        (db_key, raw) = disk.put(key)
+
+        row = self.connections[shard_index].execute(
+            'SELECT mode, filename, value FROM Cache WHERE key = ? AND raw = ?',
+            (db_key, raw)).fetchone()
+
+        if row is None:
+            return None
+
+        (mode, filename, value) = row
+        return disk.fetch(mode, filename, value, False)
+
+    def contains(self, key: str):
+        """
+            Returns True if the key is present in the cache
+        """
+        shard_index = self._shard_index(key)
+        (db_key, raw) = self.disks[shard_index].put(key)
+
+        return self.connections[shard_index].execute(
+            'SELECT 1 FROM Cache WHERE key = ? AND raw = ?', (db_key, raw)).fetchone() is not None
+
+    def items(self):
+        """
+            Returns a generator of all (key, value) pairs stored in the cache
+        """
+        for (disk, connection) in zip(self.disks, self.connections):
+            # rows are streamed, since a base cache can be very large
+            rows = connection.execute(
+                'SELECT key, raw, mode, filename, value FROM Cache')
+
+            for (db_key, raw, mode, filename, value) in rows:
+                yield (disk.get(db_key, raw), disk.fetch(mode, filename, value, False))
+
+    def entries(self):
+        """
+            Returns a generator of all entries stored in the cache,
+            without loading their values (see FinancialCache.entries)
+        """
+        for (disk, connection) in zip(self.disks, self.connections):
+            rows = connection.execute(
+                'SELECT key, raw, store_time, size, length(value) FROM Cache')
+
+            for (db_key, raw, store_time, size, inline_size) in rows:
+                yield (disk.get(db_key, raw), (size or 0) + (inline_size or 0), store_time)
+
+    def close(self):
+        """
+            Closes the underlining databases
+        """
+        for connection in self.connections:
+            connection.close()
+
+
 class FinancialCache():
     """
         A Disk based database containing an offline version of financial
         data and used as a cache
     """
 
+    # name of the file, stored alongside the cache, containing the hit/miss
+    # statistics of the most recent runs
+    RUN_STATS_FILE_NAME = "run-stats.json"
+    MAX_RUN_STATS = 50
+
+    # suffix of the keys containing the index of cached date ranges
+    RANGE_INDEX_SUFFIX = "range-index"
+
     def __init__(self, path, **kwargs):
         '''
             Initializes the cache
@@ -28,6 +169,30 @@ class FinancialCache():
             max_cache_size_bytes : int (kwargs)
             (optional) the maximum size of the cache in bytes
 
+            shards : int (kwargs)
+            (optional) the number of shards. When greater than 1 the cache
+            is split into independent databases, each with its own write
+            lock, so that multiple processes can write concurrently.
+            Keys are routed to shards deterministically, so all processes
+            sharing a cache must use the same number of shards.
+            A sharded cache does not see the entries of a non sharded one.
+
+            shard_timeout : float (kwargs)
+            (optional) the number of seconds a sharded write will wait
+            for the shard lock before giving up. Writes that give up are
+            dropped, logged and counted. Defaults to 1 second
+
+            write_behind : bool (kwargs)
+            (optional) if True, writes are queued and committed in batches
+            by a background thread. Queued values are visible to reads,
+            and are committed by flush() and close()
+
+            base_path : str (kwargs)
+            (optional) the path of a cache used as a read only base layer.
+            When supplied, reads that miss this cache (the overlay) are
+            served by the base, while writes only go to the overlay.
+            Removing entries only affects the overlay
+
             Returns
             -----------
             A tuple of strings containing the start and end date of the fiscal period
@@ -39,12 +204,62 @@ class FinancialCache():
             # default max cache is 4GB
             max_cache_size_bytes = 4e9
 
+        shards = kwargs.get('shards', 1)
+        shard_timeout = kwargs.get('shard_timeout', 1.0)
+        write_behind = kwargs.get('write_behind', False)
+        base_path = kwargs.get('base_path', None)
+
         util.create_dir(path)
 
         try:
-            self.disk_cache = Cache(path, size_limit=int(max_cache_size_bytes))
+            # shards are stored like a diskcache.FanoutCache, in numbered
+            # sub directories, each with its share of the size limit
+            if int(shards) > 1:
+                self.shard_caches = [Cache(os.path.join(path, "%03d" % i), timeout=float(shard_timeout),
+                                           size_limit=int(max_cache_size_bytes) / int(shards))
+                                     for i in range(0, int(shards))]
+            else:
+                self.shard_caches = [
+                    Cache(path, size_limit=int(max_cache_size_bytes))]
         except Exception as e:
-            raise ValidationError('invalid max cache size', e)
+            raise ValidationError('invalid cache parameters', e)
+
+        self.base_cache = None
+        if base_path is not None:
+            self.base_cache = ReadOnlyCache(base_path)
+
+        self.path = path
+        self.shards = int(shards)
+        self.max_cache_size_bytes = int(max_cache_size_bytes)
+        # serializes updates of range indexes within this process
+        self.range_lock = threading.Lock()
+        # serializes updates of the statistics below, since the cache
+        # is read and written by several threads
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # time spent waiting for write locks, which is caused by
+        # contention when multiple processes share the cache, and the
+        # number of writes dropped because a lock could not be acquired
+        self.write_wait_seconds = 0.0
+        self.max_write_wait_seconds = 0.0
+        self.write_timeouts = 0
+
+        # write behind state. pending writes are queued, while flushing
+        # writes are being committed by the writer thread. Both are
+        # dictionaries of key -> value (or DELETED)
+        self.write_behind = bool(write_behind)
+        self.pending_writes = {}
+        self.flushing_writes = {}
+        self.write_condition = threading.Condition()
+        self.writer_thread = None
+        self.closing = False
+
+        if self.write_behind:
+            self.writer_thread = threading.Thread(
+                target=self._writer_loop, name="financial-cache-writer", daemon=True)
+            self.writer_thread.start()
 
         log.debug("Cache was initialized: %s" % path)
 
@@ -55,7 +270,10 @@ class FinancialCache():
         if (key == "" or key is None) or (value == "" or value is None):
             return
 
-        self.disk_cache[key] = value
+        if self.write_behind:
+            self._enqueue(key, value)
+        else:
+            self._commit({key: value})
 
     def read(self, key):
         """
@@ -66,12 +284,612 @@ class FinancialCache():
             ----------
             The object in question, or None if they key is not present
         """
+        value = self._get(key)
+
+        with self.stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if value is None:
+            log.debug("%s not found inside cache" % key)
+
+        return value
+
+    def contains(self, key: str):
+        """
+            Returns True if the key is present in the cache. Unlike read(),
+            the value is not loaded and hit/miss statistics are not affected
+        """
+        if key == "" or key is None:
+            return False
+
+        if self.write_behind:
+            with self.write_condition:
+                for queued_writes in (self.pending_writes, self.flushing_writes):
+                    if key in queued_writes:
+                        return queued_writes[key] is not DELETED
+
+        if key in self._shard_cache(key):
+            return True
+
+        return self.base_cache is not None and self.base_cache.contains(key)
+
+    def _get(self, key: str):
+        """
+            Returns the value of a key, including queued writes, or None
+        """
+        if self.write_behind:
+            with self.write_condition:
+                for queued_writes in (self.pending_writes, self.flushing_writes):
+                    if key in queued_writes:
+                        value = queued_writes[key]
+                        return None if value is DELETED else value
+
         try:
-            return self.disk_cache[key]
+            return self._shard_cache(key)[key]
         except KeyError:
-            log.debug("%s not found inside cache" % key)
+            pass
+
+        if self.base_cache is not None:
+            return self.base_cache.get(key)
+
+        return None
+
+    def _delete(self, key: str):
+        """
+            Removes a key, including any queued write
+        """
+        if self.write_behind:
+            self._enqueue(key, DELETED)
+        else:
+            self._shard_cache(key).delete(key)
+
+    '''
+        Write behind methods
+    '''
+
+    def _enqueue(self, key: str, value: object):
+        """
+            Queues a write (or a deletion) for the writer thread
+        """
+        with self.write_condition:
+            self.pending_writes[key] = value
+            self.write_condition.notify_all()
+
+    def _commit(self, writes: dict):
+        """
+            Commits a batch of writes (key -> value or DELETED) to disk.
+            The writes of each shard are committed in a single transaction,
+            and the time spent waiting for its lock is recorded. Writes to
+            a shard whose lock cannot be acquired within the timeout
+            are dropped, logged and counted.
+        """
+        shard_writes = {}
+        for (key, value) in writes.items():
+            shard_writes.setdefault(self.shard_index(key), {})[key] = value
+
+        for (shard_index, batch) in shard_writes.items():
+            shard_cache = self.shard_caches[shard_index]
+            start_time = time.perf_counter()
+            locked = False
+
+            try:
+                with shard_cache.transact():
+                    locked = True
+                    self._record_write_wait(time.perf_counter() - start_time)
+
+                    for (key, value) in batch.items():
+                        if value is DELETED:
+                            shard_cache.delete(key)
+                        else:
+                            shard_cache[key] = value
+            except Timeout:
+                if locked:
+                    raise
+                self._record_write_wait(time.perf_counter() - start_time)
+                with self.stats_lock:
+                    self.write_timeouts += len(batch)
+                log.warning("Timed out waiting for the lock of cache shard %d. %d writes were dropped" %
+                            (shard_index, len(batch)))
+
+    def _record_write_wait(self, wait_seconds: float):
+        """
+            Records the time spent waiting for a write lock
+        """
+        with self.stats_lock:
+            self.write_wait_seconds += wait_seconds
+            self.max_write_wait_seconds = max(
+                self.max_write_wait_seconds, wait_seconds)
+
+    def _writer_loop(self):
+        """
+            Body of the writer thread. Commits queued writes in batches
+            until the cache is closed
+        """
+        while True:
+            with self.write_condition:
+                while len(self.pending_writes) == 0 and not self.closing:
+                    self.write_condition.wait()
+
+                if len(self.pending_writes) == 0:
+                    return
+
+                self.flushing_writes = self.pending_writes
+                self.pending_writes = {}
+
+            try:
+                self._commit(self.flushing_writes)
+            except Exception as e:
+                log.warning("Could not commit %d cache writes, because: %s" %
+                            (len(self.flushing_writes), str(e)))
+
+            with self.write_condition:
+                self.flushing_writes = {}
+                self.write_condition.notify_all()
+
+    def flush(self):
+        """
+            Waits until all queued writes are committed to disk
+        """
+        if not self.write_behind:
+            return
+
+        with self.write_condition:
+            while len(self.pending_writes) > 0 or len(self.flushing_writes) > 0:
+                if not self.writer_thread.is_alive():
+                    log.warning("Cache writer is not running. %d writes were not committed" %
+                                len(self.pending_writes))
+                    return
+                self.write_condition.wait(1)
+
+    def close(self):
+        """
+            Commits all queued writes, stops the writer thread and
+            closes the cache
+        """
+        if self.write_behind:
+            self.flush()
+            with self.write_condition:
+                self.closing = True
+                self.write_condition.notify_all()
+            self.writer_thread.join()
+
+        for shard_cache in self.shard_caches:
+            shard_cache.close()
+        if self.base_cache is not None:
+            self.base_cache.close()
+
+    '''
+        Date range methods
+    '''
+
+    def _range_index(self, range_key: str):
+        """
+            Returns the sorted list of non overlapping [start_day, end_day]
+            ranges (as day ordinals) cached for the supplied range key
+        """
+        range_index = self._get("%s-%s" %
+                                (range_key, self.RANGE_INDEX_SUFFIX))
+        if range_index is None:
+            return []
+        return range_index
+
+    @staticmethod
+    def _range_entry_key(range_key: str, start_day: int, end_day: int):
+        """
+            Returns the key of the cache entry containing a date range
+        """
+        return "%s-%s-%s" % (range_key,
+                             date.fromordinal(start_day).strftime("%Y%m%d"),
+                             date.fromordinal(end_day).strftime("%Y%m%d"))
+
+    def read_range(self, range_key: str, start_date: date, end_date: date):
+        """
+            Reads date range data, which is a dictionary keyed by 'YYYY-MM-DD'
+            strings, from any cached range that covers the supplied dates,
+            and returns the portion within those dates.
+
+            Parameters
+            ----------
+            range_key : str
+                A key identifying the series, e.g. the ticker symbol,
+                data type and its parameters, but not the dates
+            start_date : date
+                The start date of the range (inclusive)
+            end_date : date
+                The end date of the range (inclusive)
+
+            Returns
+            ----------
+            A dictionary of 'YYYY-MM-DD' -> value, or None if no cached
+            range covers the supplied dates
+        """
+        covering_range = self._covering_range(range_key, start_date, end_date)
+        if covering_range is None:
             return None
 
+        range_dict = self.read(self._range_entry_key(
+            range_key, covering_range[0], covering_range[1]))
+        if range_dict is None:
+            # the entry was evicted, but the index was not
+            return None
+
+        start_date_str = start_date.strftime("%Y-%m-%d")
+        end_date_str = end_date.strftime("%Y-%m-%d")
+
+        return {key: value for (key, value) in range_dict.items()
+                if start_date_str <= key <= end_date_str}
+
+    def is_range_cached(self, range_key: str, start_date: date, end_date: date):
+        """
+            Returns True if a cached range covers the supplied dates. Like
+            contains(), hit/miss statistics are not affected
+        """
+        return self.covering_range_key(range_key, start_date, end_date) is not None
+
+    def covering_range_key(self, range_key: str, start_date: date, end_date: date):
+        """
+            Returns the key of the cached range that covers the supplied
+            dates, or None. Since ranges are merged when written, the key
+            changes whenever the data covering the dates is written again.
+            Hit/miss statistics are not affected
+        """
+        covering_range = self._covering_range(range_key, start_date, end_date)
+        if covering_range is None:
+            return None
+
+        entry_key = self._range_entry_key(
+            range_key, covering_range[0], covering_range[1])
+        if not self.contains(entry_key):
+            return None
+
+        return entry_key
+
+    def _covering_range(self, range_key: str, start_date: date, end_date: date):
+        """
+            Returns the [start_day, end_day] cached range that covers
+            the supplied dates, or None
+        """
+        start_day = start_date.toordinal()
+        end_day = end_date.toordinal()
+
+        for (covered_start, covered_end) in self._range_index(range_key):
+            if covered_start <= start_day and end_day <= covered_end:
+                return [covered_start, covered_end]
+
+        return None
+
+    def write_range(self, range_key: str, start_date: date, end_date: date, range_dict: dict):
+        """
+            Writes date range data (see read_range) to the cache. The new
+            range is merged with any cached range it overlaps or is adjacent to,
+            so that each series is stored as a few large ranges.
+
+            Parameters
+            ----------
+            range_key : str
+                A key identifying the series (see read_range)
+            start_date : date
+                The first date covered by the data
+            end_date : date
+                The last date covered by the data
+            range_dict : dict
+                A dictionary of 'YYYY-MM-DD' -> value
+        """
+        if start_date > end_date:
+            raise ValidationError(
+                "Start date must be before end date", None)
+
+        with self.range_lock:
+            self._write_range(range_key, start_date.toordinal(),
+                              end_date.toordinal(), range_dict)
+
+    def _write_range(self, range_key: str, start_day: int, end_day: int, range_dict: dict):
+        """
+            Helper function that merges a new range into a series
+            (see write_range)
+        """
+        merged_dict = {}
+        range_index = []
+
+        for (covered_start, covered_end) in self._range_index(range_key):
+            if covered_start <= end_day + 1 and covered_end >= start_day - 1:
+                entry_key = self._range_entry_key(
+                    range_key, covered_start, covered_end)
+                existing_dict = self._get(entry_key)
+
+                if existing_dict is not None:
+                    merged_dict.update(existing_dict)
+                    start_day = min(start_day, covered_start)
+                    end_day = max(end_day, covered_end)
+                    self._delete(entry_key)
+            else:
+                range_index.append([covered_start, covered_end])
+
+        # newer values take precedence
+        merged_dict.update(range_dict)
+
+        self.write(self._range_entry_key(
+            range_key, start_day, end_day), merged_dict)
+
+        range_index.append([start_day, end_day])
+        self.write("%s-%s" % (range_key, self.RANGE_INDEX_SUFFIX),
+                   sorted(range_index))
+
+    '''
+        Introspection and maintenance methods
+    '''
+
+    def _shard_cache(self, key: str):
+        """
+            Returns the diskcache.Cache of the shard the key is routed to
+        """
+        return self.shard_caches[self.shard_index(key)]
+
+    def shard_index(self, key: str):
+        """
+            Returns the index of the shard the supplied key is routed to,
+            using the same routing as diskcache.FanoutCache
+        """
+        if self.shards > 1:
+            return self.shard_caches[0].disk.hash(key) % self.shards
+        return 0
+
+    def entries(self):
+        """
+            Returns a generator of all entries stored in the cache,
+            without loading their values. The entries of the read only
+            base layer are listed by base_cache.entries()
+
+            Returns
+            ----------
+            A generator of (key, size_bytes, store_time) tuples, where
+            store_time is expressed as seconds since the epoch
+        """
+        self.flush()
+
+        for shard_cache in self.shard_caches:
+            db_path = os.path.abspath(os.path.join(shard_cache.directory, DBNAME))
+
+            # diskcache has no API that lists entries along with their size
+            # and age without loading their values, so the Cache table is read
+            # directly, like ReadOnlyCache does. Rows are fetched up front
+            # since the connection is read only and short lived
+            try:
+                connection = sqlite3.connect(
+                    "file:%s?mode=ro" % pathname2url(db_path), uri=True)
+                try:
+                    rows = connection.execute(
+                        'SELECT key, raw, store_time, size, length(value) FROM Cache').fetchall()
+                finally:
+                    connection.close()
+            except Exception as e:
+                raise FileSystemError(
+                    "Could not list the entries of %s" % db_path, e)
+
+            for (db_key, raw, store_time, size, inline_size) in rows:
+                yield (shard_cache.disk.get(db_key, raw), (size or 0) + (inline_size or 0), store_time)
+
+    def record_run_stats(self):
+        """
+            Appends the hit/miss counters of the current run to the
+            run statistics file. Runs that did not read the cache are
+            not recorded.
+
+            The file is shared by all the processes using the cache, so
+            it's updated while holding a lock file and replaced atomically
+        """
+        with self.stats_lock:
+            if self.hits + self.misses == 0:
+                return
+
+            run_stat = {
+                'run_date': datetime.now().isoformat(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'shards': self.shards,
+                'write_wait_seconds': round(self.write_wait_seconds, 6),
+                'max_write_wait_seconds': round(self.max_write_wait_seconds, 6),
+                'write_timeouts': self.write_timeouts
+            }
+
+        stats_path = os.path.join(self.path, self.RUN_STATS_FILE_NAME)
+        temp_file_path = "%s.%d.tmp" % (stats_path, os.getpid())
+        try:
+            with open("%s.lock" % stats_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    run_stats = self.run_stats()
+                    run_stats.append(run_stat)
+
+                    with open(temp_file_path, 'w') as stats_file:
+                        json.dump(run_stats[-self.MAX_RUN_STATS:], stats_file)
+                    os.replace(temp_file_path, stats_path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not save cache statistics to %s" % stats_path, e)
+
+    def run_stats(self):
+        """
+            Returns the hit/miss statistics of the most recent runs
+
+            Returns
+            ----------
+            A list of dictionaries, oldest first, like this:
+            [
+                {'run_date': '2020-06-19T10:00:00.000000', 'hits': 120, 'misses': 3}
+            ]
+        """
+        stats_path = os.path.join(self.path, self.RUN_STATS_FILE_NAME)
+
+        if not os.path.isfile(stats_path):
+            return []
+
+        try:
+            with open(stats_path) as stats_file:
+                return json.load(stats_file)
+        except Exception as e:
+            log.warning("Could not read cache statistics, because: %s" % str(e))
+            return []
+
+    def compact(self, key_prefix: str = None, older_than_days: int = None, dry_run: bool = False):
+        """
+            Removes entries matching the supplied key prefix and/or older
+            than the supplied number of days, and then culls the cache
+            down to its size limit.
+
+            Parameters
+            ----------
+            key_prefix : str
+                (optional) only entries whose key starts with this prefix
+                are removed
+            older_than_days : int
+                (optional) only entries stored before this many days
+                ago are removed
+            dry_run : bool
+                if True, matching entries are counted but not removed
+
+            Returns
+            ----------
+            The number of removed (or removable) entries
+        """
+        if key_prefix is None and older_than_days is None:
+            raise ValidationError(
+                "Either a key prefix or an age must be supplied", None)
+
+        cutoff_time = None
+        if older_than_days is not None:
+            cutoff_time = time.time() - older_than_days * 86400
+
+        removed = 0
+        for (key, _, store_time) in list(self.entries()):
+            if key_prefix is not None and not str(key).startswith(key_prefix):
+                continue
+            if cutoff_time is not None and store_time >= cutoff_time:
+                continue
+
+            if not dry_run:
+                self._delete(key)
+            removed += 1
+
+        if not dry_run:
+            self.flush()
+            for shard_cache in self.shard_caches:
+                shard_cache.cull()
+
+        return removed
+
+    def vacuum(self):
+        """
+            Verifies the consistency of the cache, fixing any issues, and
+            rebuilds the underlining database so that the space
+            freed by removed entries is returned to the filesystem.
+            The read only base layer is not modified.
+
+            Returns
+            ----------
+            The list of issues that were found
+        """
+        self.flush()
+
+        # check() rebuilds (VACUUMs) each database when fixing issues
+        return [issue for shard_cache in self.shard_caches
+                for issue in shard_cache.check(fix=True)]
+
+    def merge_layers(self, merged_path: str):
+        """
+            Creates a new cache containing the entries of the base layer
+            and of this cache (the overlay), which take precedence. The
+            new cache can then be used as the base of other caches.
+
+            Returns
+            ----------
+            The number of entries in the merged cache
+        """
+        layer_paths = [self.path]
+        if self.base_cache is not None:
+            layer_paths.append(self.base_cache.path)
+
+        if merged_path is None or os.path.abspath(merged_path) in \
+                [os.path.abspath(layer_path) for layer_path in layer_paths]:
+            raise ValidationError(
+                "The merged cache path must differ from the layers it merges", None)
+
+        self.flush()
+
+        merged_cache = Cache(merged_path, size_limit=self.max_cache_size_bytes)
+        try:
+            with merged_cache.transact():
+                if self.base_cache is not None:
+                    for (key, value) in self.base_cache.items():
+                        merged_cache[key] = value
+
+                for shard_cache in self.shard_caches:
+                    for key in shard_cache.iterkeys():
+                        merged_cache[key] = shard_cache[key]
+
+            return len(merged_cache)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not merge cache layers into %s" % merged_path, e)
+        finally:
+            merged_cache.close()
+
+    def export_entries(self, export_path: str, key_prefix: str = None):
+        """
+            Exports the contents of the cache to a single file that
+            can later be imported using import_entries()
+
+            Returns
+            ----------
+            The number of exported entries
+        """
+        exported = 0
+        try:
+            with open(export_path, 'wb') as export_file:
+                for (key, _, _) in self.entries():
+                    if key_prefix is not None and not str(key).startswith(key_prefix):
+                        continue
+                    value = self._get(key)
+                    if value is None:
+                        continue
+                    pickle.dump((key, value), export_file)
+                    exported += 1
+        except Exception as e:
+            raise FileSystemError(
+                "Could not export cache to %s" % export_path, e)
+
+        return exported
+
+    def import_entries(self, import_path: str):
+        """
+            Imports entries from a file created by export_entries().
+            Existing keys are overwritten.
+
+            Returns
+            ----------
+            The number of imported entries
+        """
+        imported = 0
+        try:
+            with open(import_path, 'rb') as import_file:
+                while True:
+                    try:
+                        (key, value) = pickle.load(import_file)
+                    except EOFError:
+                        break
+                    self.write(key, value)
+                    imported += 1
+        except Exception as e:
+            raise FileSystemError(
+                "Could not import cache from %s" % import_path, e)
+
+        return imported
+
 
 @atexit.register
 def shutdown_cache():
@@ -79,7 +897,16 @@ def shutdown_cache():
         Cleanly close the cache when the application exits
     '''
     log.debug("Shutting down cache")
-    cache.disk_cache.close()
+    try:
+        cache.record_run_stats()
+    except FileSystemError as fse:
+        log.warning(str(fse))
+    cache.close()
 
 # pylint: disable=invalid-name
-cache = FinancialCache(constants.FINANCIAL_DATA_DIR)
+cache = FinancialCache(constants.FINANCIAL_DATA_DIR,
+                       shards=os.environ.get(
+                           constants.FINANCIAL_CACHE_SHARDS_ENV_VAR, 1),
+                       write_behind=os.environ.get(
+                           constants.FINANCIAL_CACHE_WRITE_BEHIND_ENV_VAR, "").lower() in ("1", "true"),
+                       base_path=os.environ.get(constants.FINANCIAL_CACHE_BASE_DIR_ENV_VAR))
@@ -0,0 +1,416 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains a columnar store of daily prices, kept alongside the
+financial cache. Each ticker is stored in its own append-only file of fixed
+size records (day ordinal + OHLCV) sorted by date, which is memory mapped
+when read, so that date range lookups are binary searches and slices
+are zero-copy views of the file.
+
+Because the store only contains trading days, each ticker also keeps track
+of the date ranges that were loaded into it (its coverage), which is what
+allows the store to tell an empty range (e.g. a weekend) apart from one
+that was never loaded.
+
+The store may be shared by several processes. Writes to a ticker are
+serialized by a lock file, and files are replaced atomically, so that
+concurrent writers never lose each other's prices or coverage. The
+coverage and memory map of each ticker are cached along with the size and
+modification time of their files, and are reloaded once another process
+changes them.
+"""
+import os
+import json
+import fcntl
+import atexit
+import contextlib
+import threading
+import logging
+from datetime import date
+import numpy as np
+from support import util, constants
+from exception.exceptions import ValidationError, FileSystemError
+
+log = logging.getLogger()
+
+PRICE_RECORD_DTYPE = np.dtype([
+    ('day', np.int32),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64)
+])
+
+
+class PriceStore():
+    """
+        A disk based, memory mapped store of daily stock prices with one
+        columnar file per ticker symbol.
+    """
+
+    def __init__(self, path: str):
+        '''
+            Initializes the price store
+
+            Parameters
+            ----------
+            path : str
+            The path where the price files will be located
+        '''
+        util.create_dir(path)
+
+        self.path = path
+
+        # ticker -> (file signature, memory mapped array)
+        self.mapped_prices = {}
+        # ticker -> (file signature, list of [start_day, end_day] covered ranges)
+        self.coverage_dict = {}
+        # serializes writes within this process. Writes across processes
+        # are serialized by the lock file of each ticker
+        self.write_lock = threading.Lock()
+
+    def _price_file_path(self, ticker: str):
+        return os.path.join(self.path, "%s.prices" % ticker.upper())
+
+    def _coverage_file_path(self, ticker: str):
+        return os.path.join(self.path, "%s.coverage.json" % ticker.upper())
+
+    def _lock_file_path(self, ticker: str):
+        return os.path.join(self.path, "%s.lock" % ticker.upper())
+
+    @contextlib.contextmanager
+    def _ticker_lock(self, ticker: str):
+        '''
+            Holds the lock of a ticker across threads and processes, and
+            discards the state of the ticker read before it was acquired,
+            since other processes may have changed its files
+        '''
+        lock_file_path = self._lock_file_path(ticker)
+
+        with self.write_lock:
+            try:
+                lock_file = open(lock_file_path, 'a')
+            except Exception as e:
+                raise FileSystemError(
+                    "Could not open lock file %s" % lock_file_path, e)
+
+            with lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self.mapped_prices.pop(ticker, None)
+                    self.coverage_dict.pop(ticker, None)
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _coverage(self, ticker: str):
+        '''
+            Returns the sorted list of non overlapping [start_day, end_day]
+            ranges (as day ordinals) loaded into the store for the ticker
+        '''
+        coverage_path = self._coverage_file_path(ticker)
+        signature = _file_signature(coverage_path)
+
+        if ticker in self.coverage_dict and self.coverage_dict[ticker][0] == signature:
+            return self.coverage_dict[ticker][1]
+
+        coverage = []
+        if signature is not None:
+            try:
+                with open(coverage_path) as coverage_file:
+                    coverage = json.load(coverage_file)
+            except Exception as e:
+                log.warning("Ignoring price coverage of %s, because: %s" %
+                            (ticker, str(e)))
+                coverage = []
+
+        self.coverage_dict[ticker] = (signature, coverage)
+        return coverage
+
+    def _save_coverage(self, ticker: str, coverage: list):
+        coverage_path = self._coverage_file_path(ticker)
+        temp_file_path = "%s.%d.tmp" % (coverage_path, os.getpid())
+        try:
+            with open(temp_file_path, 'w') as coverage_file:
+                json.dump(coverage, coverage_file)
+            os.replace(temp_file_path, coverage_path)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not save price coverage to %s" % coverage_path, e)
+
+        self.coverage_dict[ticker] = (_file_signature(coverage_path), coverage)
+
+    def is_covered(self, ticker: str, start_date: date, end_date: date):
+        '''
+            Returns True if the entire date range was loaded into the store
+        '''
+        start_day = start_date.toordinal()
+        end_day = end_date.toordinal()
+
+        for (covered_start, covered_end) in self._coverage(ticker):
+            if covered_start <= start_day and end_day <= covered_end:
+                return True
+
+        return False
+
+    def stamp(self, ticker: str):
+        '''
+            Returns a string that changes whenever the prices or coverage
+            of the ticker are written, without reading them
+        '''
+        return "%s-%s" % (_file_signature(self._price_file_path(ticker)),
+                          _file_signature(self._coverage_file_path(ticker)))
+
+    def get_prices(self, ticker: str, start_date: date, end_date: date):
+        '''
+            Returns the price records for the supplied date range (inclusive)
+            as a view of the memory mapped ticker file.
+
+            Returns
+            -------
+            A NumPy structured array (PRICE_RECORD_DTYPE) sorted by day.
+            The array is empty if no prices are stored for the range
+        '''
+        prices = self._mapped_prices(ticker)
+
+        days = prices['day']
+        start_index = np.searchsorted(
+            days, start_date.toordinal(), side='left')
+        end_index = np.searchsorted(days, end_date.toordinal(), side='right')
+
+        return prices[start_index:end_index]
+
+    def get_asof_price(self, ticker: str, as_of_date: date):
+        '''
+            Returns the most recent price record on or before the supplied
+            date, or None if there isn't one
+        '''
+        prices = self._mapped_prices(ticker)
+
+        index = np.searchsorted(
+            prices['day'], as_of_date.toordinal(), side='right') - 1
+
+        if index < 0:
+            return None
+
+        return prices[index]
+
+    def read_close_prices(self, ticker: str, start_date: date, end_date: date):
+        '''
+            Returns the close prices for the supplied date range, formatted like
+            intrinio_data.get_daily_stock_close_prices(), or None if the
+            range was never loaded into the store.
+
+            {
+                '2019-10-01': 100,
+                '2019-10-02': 101
+            }
+        '''
+        if not self.is_covered(ticker, start_date, end_date):
+            return None
+
+        prices = self.get_prices(ticker, start_date, end_date)
+
+        return {date.fromordinal(int(day)).strftime("%Y-%m-%d"): float(close)
+                for (day, close) in zip(prices['day'], prices['close'])}
+
+    def read_asof_close_price(self, ticker: str, as_of_date: date, lookback_date: date):
+        '''
+            Returns the latest close price between the lookback date and the
+            as of date, formatted like intrinio_data.get_latest_close_price(),
+            or None if the range was never loaded into the store.
+
+            Returns
+            -------
+            A tuple of ('YYYY-MM-DD', float), or None
+        '''
+        if not self.is_covered(ticker, lookback_date, as_of_date):
+            return None
+
+        price = self.get_asof_price(ticker, as_of_date)
+        if price is None or price['day'] < lookback_date.toordinal():
+            return None
+
+        return (date.fromordinal(int(price['day'])).strftime("%Y-%m-%d"), float(price['close']))
+
+    def write_prices(self, ticker: str, start_date: date, end_date: date, price_records: list):
+        '''
+            Stores the prices covering the supplied date range.
+
+            Records are appended when they follow the last stored date,
+            otherwise the ticker file is merged and rewritten.
+
+            Parameters
+            ----------
+            ticker: str
+                Ticker Symbol
+            start_date: date
+                The first date covered by the records
+            end_date: date
+                The last date covered by the records
+            price_records: list
+                A list of (date, open, high, low, close, volume) tuples
+        '''
+        if start_date > end_date:
+            raise ValidationError(
+                "Start date must be before end date", None)
+
+        with self._ticker_lock(ticker):
+            self._write_prices(ticker, start_date, end_date, price_records)
+
+    def _write_prices(self, ticker: str, start_date: date, end_date: date, price_records: list):
+        '''
+            Helper function that stores the prices of a ticker (see write_prices).
+            Must be called while holding the ticker lock
+        '''
+        new_prices = np.array(
+            [(price_date.toordinal(), _float(open_price), _float(high), _float(low), _float(close), _float(volume))
+             for (price_date, open_price, high, low, close, volume) in price_records],
+            dtype=PRICE_RECORD_DTYPE)
+        new_prices = new_prices[np.argsort(new_prices['day'], kind='stable')]
+
+        price_file_path = self._price_file_path(ticker)
+        self._discard_partial_record(ticker)
+        existing_prices = self._mapped_prices(ticker)
+
+        try:
+            if len(existing_prices) == 0 or len(new_prices) == 0 or \
+                    new_prices['day'][0] > existing_prices['day'][-1]:
+                with open(price_file_path, 'ab') as price_file:
+                    price_file.write(new_prices.tobytes())
+            else:
+                # new records overwrite existing ones for the same day
+                combined_prices = np.concatenate(
+                    (new_prices, np.array(existing_prices)))
+                (_, unique_index) = np.unique(
+                    combined_prices['day'], return_index=True)
+                merged_prices = combined_prices[unique_index]
+
+                # release the memory map before replacing the file
+                self.mapped_prices.pop(ticker, None)
+                del existing_prices
+
+                temp_file_path = "%s.%d.tmp" % (price_file_path, os.getpid())
+                with open(temp_file_path, 'wb') as price_file:
+                    price_file.write(merged_prices.tobytes())
+                os.replace(temp_file_path, price_file_path)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not save prices to %s" % price_file_path, e)
+
+        self.mapped_prices.pop(ticker, None)
+
+        self._save_coverage(ticker, _merge_ranges(
+            self._coverage(ticker) + [[start_date.toordinal(), end_date.toordinal()]]))
+
+    def _discard_partial_record(self, ticker: str):
+        '''
+            Truncates the partial record left at the end of a ticker file by
+            an interrupted append. Its coverage was never saved, so no
+            other prices are lost. Must be called while holding the ticker lock
+        '''
+        price_file_path = self._price_file_path(ticker)
+        signature = _file_signature(price_file_path)
+
+        if signature is None or signature[0] % PRICE_RECORD_DTYPE.itemsize == 0:
+            return
+
+        log.warning("Discarding a partial price record of %s" % ticker)
+        try:
+            os.truncate(price_file_path, signature[0] -
+                        signature[0] % PRICE_RECORD_DTYPE.itemsize)
+        except Exception as e:
+            raise FileSystemError(
+                "Could not repair %s" % price_file_path, e)
+
+    def _mapped_prices(self, ticker: str):
+        '''
+            Returns the memory mapped price records of a ticker, or an empty
+            array if none are stored. The file is mapped again once it
+            was changed, e.g. by another process
+
+            Raises
+            -------
+            FileSystemError if the file can't be read or does not
+            contain whole records
+        '''
+        price_file_path = self._price_file_path(ticker)
+        signature = _file_signature(price_file_path)
+
+        if ticker in self.mapped_prices and self.mapped_prices[ticker][0] == signature:
+            return self.mapped_prices[ticker][1]
+
+        self.mapped_prices.pop(ticker, None)
+
+        if signature is None or signature[0] == 0:
+            return np.empty(0, dtype=PRICE_RECORD_DTYPE)
+
+        if signature[0] % PRICE_RECORD_DTYPE.itemsize != 0:
+            raise FileSystemError(
+                "%s contains a partial price record" % price_file_path, None)
+
+        try:
+            prices = np.memmap(price_file_path,
+                               dtype=PRICE_RECORD_DTYPE, mode='r')
+        except Exception as e:
+            raise FileSystemError(
+                "Could not read prices from %s" % price_file_path, e)
+
+        self.mapped_prices[ticker] = (signature, prices)
+        return prices
+
+    def close(self):
+        '''
+            Releases all memory mapped files
+        '''
+        self.mapped_prices.clear()
+
+
+def _file_signature(file_path: str):
+    '''
+        Returns the (size, modification time, inode) of a file, which
+        changes whenever it's appended to or replaced, or None if
+        the file does not exist
+    '''
+    try:
+        file_stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+
+def _float(value: object):
+    '''
+        Converts an optional numeric value into a float, using NaN for None
+    '''
+    return np.nan if value is None else float(value)
+
+
+def _merge_ranges(ranges: list):
+    '''
+        Merges overlapping and adjacent [start_day, end_day] ranges
+
+        Returns
+        -------
+        A sorted list of non overlapping ranges
+    '''
+    merged = []
+    for (start_day, end_day) in sorted(ranges):
+        if len(merged) > 0 and start_day <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end_day)
+        else:
+            merged.append([start_day, end_day])
+
+    return merged
+
+
+@atexit.register
+def shutdown_price_store():
+    '''
+        Release all memory mapped files when the application exits
+    '''
+    price_store.close()
+
+# pylint: disable=invalid-name
+price_store = PriceStore(constants.PRICE_STORE_DIR)
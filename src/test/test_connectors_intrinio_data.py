@@ -3,14 +3,18 @@
 Testing class for the connectors.intrinio_data module
 """
 
+import io
+import os
 import unittest
+import contextlib
 import requests
 from unittest.mock import patch, Mock
 from intrinio_sdk.rest import ApiException
-from exception.exceptions import ValidationError, DataError
+from exception.exceptions import ValidationError, DataError, FileSystemError
 from connectors import intrinio_data
 from connectors import intrinio_util
 from support.financial_cache import FinancialCache
+from support.price_store import price_store
 import time
 import datetime
 from intrinio_sdk.rest import ApiException
@@ -202,6 +206,69 @@ class TestConnectorsIntrinioData(unittest.TestCase):
                 intrinio_data.get_daily_stock_close_prices(
                     'NON-EXISTENT-TICKER', datetime.date(2018, 1, 1), datetime.date(2019, 1, 1))
 
+    def test_daily_stock_prices_from_price_store(self):
+        with patch.object(price_store, 'read_close_prices',
+                          return_value={'2020-06-01': 100.0}), \
+                patch.object(intrinio_data.SECURITY_API, 'get_security_stock_prices',
+                             side_effect=ApiException("Not Found")):
+            self.assertDictEqual(intrinio_data.get_daily_stock_close_prices(
+                'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)), {'2020-06-01': 100.0})
+
+    def test_daily_stock_prices_from_price_store_empty(self):
+        with patch.object(price_store, 'read_close_prices',
+                          return_value={}):
+            with self.assertRaises(DataError):
+                intrinio_data.get_daily_stock_close_prices(
+                    'AAPL', datetime.date(2020, 6, 6), datetime.date(2020, 6, 7))
+
+    def test_daily_stock_prices_price_store_error(self):
+        api_response = Mock(stock_prices=[
+            Mock(date=datetime.date(2020, 6, 1), close=100.0)])
+
+        with patch.object(price_store, 'read_close_prices',
+                          side_effect=FileSystemError("Partial price record", None)), \
+                patch.object(FinancialCache, 'read', return_value=api_response), \
+                patch.object(price_store, 'write_prices'):
+            # the prices are read from the cache instead
+            with self.assertLogs(level='WARNING'):
+                self.assertDictEqual(intrinio_data.get_daily_stock_close_prices(
+                    'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)), {'2020-06-01': 100.0})
+
+    def test_latest_stock_prices_from_price_store(self):
+        with patch.object(price_store, 'read_asof_close_price',
+                          return_value=('2020-06-05', 100.0)):
+            self.assertEqual(intrinio_data.get_latest_close_price(
+                'AAPL', datetime.date(2020, 6, 7), 5), ('2020-06-05', 100.0))
+
+    def test_store_prices_coverage(self):
+        price_list = [Mock(date=datetime.date(2020, 6, day), open=1, high=2, low=0.5, close=1.5, volume=100)
+                      for day in (1, 2)]
+
+        with patch.object(intrinio_data.util, 'get_business_date',
+                          return_value=datetime.date(2020, 6, 2)), \
+                patch.object(price_store, 'write_prices') as write_mock:
+
+            # past ranges are covered up to their end date
+            intrinio_data._store_prices(
+                'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 2), price_list)
+            self.assertEqual(write_mock.call_args[0][2], datetime.date(2020, 6, 2))
+
+            # days that may still receive prices are not covered
+            intrinio_data._store_prices(
+                'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 5), price_list)
+            self.assertEqual(write_mock.call_args[0][1:3],
+                             (datetime.date(2020, 6, 1), datetime.date(2020, 6, 2)))
+
+    def test_write_technicals_range_coverage(self):
+        with patch.object(intrinio_data.util, 'get_business_date',
+                          return_value=datetime.date(2020, 6, 3)), \
+                patch.object(FinancialCache, 'write_range') as write_mock:
+
+            intrinio_data._write_technicals_range('range-key', datetime.date(2020, 6, 1),
+                                                  datetime.date(2020, 6, 5), {'2020-06-02': 1.0})
+            self.assertEqual(write_mock.call_args[0][1:3],
+                             (datetime.date(2020, 6, 1), datetime.date(2020, 6, 2)))
+
     def test_latest_stock_prices_invalid_lookback(self):
         with self.assertRaises(ValidationError):
             intrinio_data.get_latest_close_price(
@@ -279,3 +346,168 @@ class TestConnectorsIntrinioData(unittest.TestCase):
             with self.assertRaises(ValidationError):
                 intrinio_data.get_sma_indicator(
                     'AAPL', datetime.datetime(2020, 1, 1), datetime.datetime(2020, 5, 29), -1)
+
+    '''
+        Cache inspection tests
+    '''
+
+    def test_is_cached_prices(self):
+        with patch.object(price_store, 'is_covered', return_value=False), \
+                patch.object(FinancialCache, 'contains', return_value=False):
+            self.assertFalse(intrinio_data.is_cached(
+                intrinio_data.get_daily_stock_close_prices, 'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)))
+            self.assertFalse(intrinio_data.is_cached(
+                intrinio_data.get_latest_close_price, 'AAPL', datetime.date(2020, 6, 1), 5))
+
+        with patch.object(price_store, 'is_covered', return_value=True):
+            self.assertTrue(intrinio_data.is_cached(
+                intrinio_data.get_daily_stock_close_prices, 'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)))
+
+    def test_is_cached_macd(self):
+        with patch.object(FinancialCache, 'covering_range_key', return_value=None), \
+                patch.object(FinancialCache, 'contains', return_value=True) as contains_mock:
+            self.assertTrue(intrinio_data.is_cached(
+                intrinio_data.get_macd_indicator, 'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1), 12, 26, 9))
+
+            contains_mock.assert_called_with(
+                'intrinio-AAPL-20200601-20200601-12.26.9-tech-macd')
+
+    def test_data_stamp(self):
+        with patch.object(FinancialCache, 'covering_range_key',
+                          return_value='intrinio-AAPL-12.26.9-tech-macd-20200101-20200630'):
+            self.assertEqual(intrinio_data.data_stamp(
+                intrinio_data.get_macd_indicator, 'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1), 12, 26, 9),
+                'intrinio-AAPL-12.26.9-tech-macd-20200101-20200630')
+
+        with patch.object(price_store, 'is_covered', return_value=True), \
+                patch.object(price_store, 'stamp', side_effect=['1', '2']):
+            # the stamp changes when the ticker's prices are written
+            self.assertNotEqual(
+                intrinio_data.data_stamp(intrinio_data.get_daily_stock_close_prices,
+                                         'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)),
+                intrinio_data.data_stamp(intrinio_data.get_daily_stock_close_prices,
+                                         'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1)))
+
+        with patch.object(price_store, 'is_covered', return_value=False), \
+                patch.object(FinancialCache, 'contains', return_value=False):
+            self.assertEqual(intrinio_data.data_stamp(
+                intrinio_data.get_latest_close_price, 'AAPL', datetime.date(2020, 6, 1), 5), None)
+
+    def test_is_cached_zacks(self):
+        with patch.object(FinancialCache, 'contains', return_value=True) as contains_mock:
+            self.assertTrue(intrinio_data.is_cached(
+                intrinio_data.get_zacks_target_price_mean, 'AAPL', datetime.date(2020, 5, 1), datetime.date(2020, 5, 31)))
+
+            contains_mock.assert_called_with(
+                'intrinio-company_historical_data-AAPL-2020-05-01-2020-05-31-yearly-zacks_target_price_mean')
+
+    def test_is_cached_unsupported_function(self):
+        with self.assertRaises(ValidationError):
+            intrinio_data.is_cached(
+                intrinio_data.get_historical_revenue, 'AAPL', 2018, 2019)
+
+    '''
+        Offline mode tests
+    '''
+
+    def test_set_offline_mode_invalid(self):
+        with self.assertRaises(ValidationError):
+            intrinio_data.set_offline_mode('BAD_MODE')
+
+    def test_offline_mode_raise(self):
+        intrinio_data.set_offline_mode(intrinio_data.OFFLINE_MODE_RAISE)
+
+        try:
+            with patch.object(intrinio_data.SECURITY_API, 'get_security_stock_prices') as api_mock, \
+                    patch.object(price_store, 'read_close_prices', return_value=None), \
+                    patch.object(FinancialCache, 'read', return_value=None):
+                with self.assertRaises(DataError):
+                    intrinio_data.get_daily_stock_close_prices(
+                        'AAPL', datetime.date(2020, 6, 1), datetime.date(2020, 6, 1))
+
+                api_mock.assert_not_called()
+
+            self.assertEqual(intrinio_data.get_missing_cache_keys(), [])
+        finally:
+            intrinio_data.set_offline_mode(None)
+
+    def test_offline_mode_report(self):
+        intrinio_data.set_offline_mode(intrinio_data.OFFLINE_MODE_REPORT)
+
+        try:
+            with patch.object(intrinio_data.COMPANY_API, 'get_company_historical_data') as api_mock, \
+                    patch.object(FinancialCache, 'read', return_value=None):
+                with self.assertRaises(DataError):
+                    intrinio_data.get_zacks_target_price_mean(
+                        'AAPL', datetime.date(2020, 5, 1), datetime.date(2020, 5, 31))
+
+                api_mock.assert_not_called()
+
+            with patch.object(intrinio_data.SECURITY_API, 'get_security_price_technicals_macd') as api_mock, \
+                    patch.object(FinancialCache, 'read_range', return_value=None), \
+                    patch.object(FinancialCache, 'read', return_value=None):
+                with self.assertRaises(DataError):
+                    intrinio_data.get_macd_indicator(
+                        'AAPL', datetime.date(2020, 5, 1), datetime.date(2020, 5, 31), 12, 26, 9)
+
+                api_mock.assert_not_called()
+
+            # date ranges are reported as the range that would be cached
+            self.assertEqual(intrinio_data.get_missing_cache_keys(), [
+                'intrinio-AAPL-12.26.9-tech-macd-20200501-20200531',
+                'intrinio-company_historical_data-AAPL-2020-05-01-2020-05-31-yearly-zacks_target_price_mean'
+            ])
+
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                intrinio_data.display_missing_cache_keys()
+            self.assertEqual(output.getvalue().splitlines(),
+                             intrinio_data.get_missing_cache_keys())
+        finally:
+            intrinio_data.set_offline_mode(None)
+
+    '''
+        Endpoint latency tests
+    '''
+
+    def test_endpoint_latencies(self):
+        latencies_path = "./test/endpoint-latencies-unittest.json"
+        intrinio_data.ENDPOINT_LATENCIES.clear()
+
+        try:
+            with patch.object(intrinio_data.COMPANY_API, 'get_company_historical_data',
+                              side_effect=ApiException("Not Found")), \
+                    patch.object(FinancialCache, 'read', return_value=None):
+                for _ in range(0, 2):
+                    with self.assertRaises(DataError):
+                        intrinio_data.get_zacks_target_price_mean(
+                            'AAPL', datetime.date(2020, 5, 1), datetime.date(2020, 5, 31))
+
+            # failed calls are recorded too
+            self.assertEqual(intrinio_data.ENDPOINT_LATENCIES[
+                intrinio_data.ENDPOINT_COMPANY_HISTORICAL_DATA][0], 2)
+
+            intrinio_data.record_endpoint_latencies(latencies_path)
+            self.assertEqual(intrinio_data.ENDPOINT_LATENCIES, {})
+
+            intrinio_data.ENDPOINT_LATENCIES[intrinio_data.ENDPOINT_COMPANY_HISTORICAL_DATA] = [
+                2, 10.0]
+            intrinio_data.record_endpoint_latencies(latencies_path)
+
+            latencies = intrinio_data.get_endpoint_latencies(latencies_path)
+            self.assertEqual(list(latencies.keys()), [
+                             intrinio_data.ENDPOINT_COMPANY_HISTORICAL_DATA])
+            self.assertAlmostEqual(
+                latencies[intrinio_data.ENDPOINT_COMPANY_HISTORICAL_DATA], 2.5, places=2)
+        finally:
+            intrinio_data.ENDPOINT_LATENCIES.clear()
+            if os.path.isfile(latencies_path):
+                os.remove(latencies_path)
+
+    def test_get_data_endpoint(self):
+        self.assertEqual(intrinio_data.get_data_endpoint(intrinio_data.get_latest_close_price),
+                         intrinio_data.ENDPOINT_STOCK_PRICES)
+        self.assertEqual(intrinio_data.get_data_endpoint(intrinio_data.get_zacks_target_price_std_dev),
+                         intrinio_data.ENDPOINT_COMPANY_HISTORICAL_DATA)
+
+        with self.assertRaises(ValidationError):
+            intrinio_data.get_data_endpoint(intrinio_data.get_historical_revenue)
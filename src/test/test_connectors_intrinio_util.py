@@ -2,6 +2,7 @@
     Testing class for the connectors.intrinio_util module
 """
 import unittest
+from datetime import date
 from connectors import intrinio_util
 from exception.exceptions import ValidationError
 
@@ -67,3 +68,15 @@ class TestConnectorsIntrinioUtil(unittest.TestCase):
 
         with self.assertRaises(ValidationError):
             intrinio_util.get_month_date_range(2019, -1)
+
+    '''
+        string_to_date tests
+    '''
+
+    def test_string_to_date_valid(self):
+        self.assertEqual(intrinio_util.string_to_date(
+            "2020-06-01"), date(2020, 6, 1))
+
+    def test_string_to_date_invalid(self):
+        with self.assertRaises(ValidationError):
+            intrinio_util.string_to_date("2020/06/01")
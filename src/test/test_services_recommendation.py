@@ -45,3 +45,55 @@ class TestServicesRecommendation(unittest.TestCase):
 
             recommendation_svc.notify_new_recommendation(
                 notification_list, 'sa')
+
+    '''
+        strategy execution tests
+    '''
+
+    class MockStrategy():
+        S3_RECOMMENDATION_SET_OBJECT_NAME = "mock-recommendation-set.json"
+
+        def __init__(self, strategy_name: str, error: Exception = None):
+            self.STRATEGY_NAME = strategy_name
+            self.error = error
+            self.recommendation_set = None
+
+        def generate_recommendation(self):
+            if self.error is not None:
+                raise self.error
+            self.recommendation_set = SecurityRecommendationSet.from_parameters(datetime.now(), datetime.now(
+            ), datetime.now(), datetime.now(), self.STRATEGY_NAME, 'US Equities', {'AAPL': 100})
+
+        def display_results(self):
+            pass
+
+    def test_execute_strategies_with_failure(self):
+        with patch.object(SecurityRecommendationSet, 'from_s3',
+                          side_effect=AWSError("test exception", Exception("NoSuchKey"))), \
+            patch.object(AWSError, 'resource_not_found', return_value=True), \
+            patch.object(SecurityRecommendationSet, 'save_to_s3', return_value=None):
+
+            strategies = [
+                self.MockStrategy('STRATEGY_1'),
+                self.MockStrategy('STRATEGY_2', ValidationError(
+                    "test exception", None)),
+                self.MockStrategy('STRATEGY_3')
+            ]
+
+            (notification_list, failures) = recommendation_svc.execute_strategies(
+                strategies, 'sa', datetime.now().date())
+
+            self.assertEqual([recommendation_set.model['strategy_name'] for recommendation_set in notification_list],
+                             ['STRATEGY_1', 'STRATEGY_3'])
+            self.assertEqual(list(failures.keys()), ['STRATEGY_2'])
+
+    def test_execute_strategy_current_recommendation(self):
+        current_recommendation_set = SecurityRecommendationSet.from_parameters(datetime.now(), datetime.now(
+        ), datetime.now(), datetime.now(), 'STRATEGY_1', 'US Equities', {'AAPL': 100})
+
+        with patch.object(SecurityRecommendationSet, 'from_s3',
+                          return_value=current_recommendation_set), \
+            patch.object(SecurityRecommendationSet, 'is_current', return_value=True):
+
+            self.assertEqual(recommendation_svc.execute_strategy(
+                self.MockStrategy('STRATEGY_1'), 'sa', datetime.now().date()), None)
@@ -64,3 +64,58 @@ class TestStrategiesCalculator(unittest.TestCase):
             with self.assertRaises(DataError):
                 calculator.mark_to_market(
                     data_frame, 'ticker', 'analysis_price', date.today())
+
+    def test_mark_to_market_deduplicates_tickers(self):
+        data_frame = pd.DataFrame({
+            'ticker': ['a', 'b', 'a'],
+            'analysis_price': [10, 20, 5]
+        })
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=[{'2020-10-22': 20}, {'2020-10-22': 30}]) as mock_prices:
+
+            mmt_df = calculator.mark_to_market(
+                data_frame, 'ticker', 'analysis_price', date(2020, 10, 22))
+
+            self.assertEqual(mock_prices.call_count, 2)
+            self.assertEqual(list(mmt_df['current_price']), [20, 30, 20])
+            self.assertEqual(list(mmt_df['actual_return']), [1.0, 0.5, 3.0])
+
+    def test_mark_to_market_multiple_dates(self):
+        data_frame = pd.DataFrame({
+            'ticker': ['a', 'b'],
+            'analysis_price': [10, 20]
+        })
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            if start_date == end_date:
+                # a price outside of the range response
+                return {'2020-10-23': 40}
+            return {
+                'a': {'2020-10-20': 11, '2020-10-23': 12},
+                'b': {'2020-10-20': 22}
+            }[ticker]
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=get_prices) as mock_prices:
+
+            mmt_df = calculator.mark_to_market(
+                data_frame, 'ticker', 'analysis_price', [date(2020, 10, 20), date(2020, 10, 23)])
+
+            self.assertEqual(mock_prices.call_count, 3)
+            self.assertEqual(
+                list(mmt_df['current_price_2020-10-20']), [11, 22])
+            self.assertEqual(
+                list(mmt_df['actual_return_2020-10-20']), [0.1, 0.1])
+            self.assertEqual(
+                list(mmt_df['current_price_2020-10-23']), [12, 40])
+            self.assertEqual(
+                list(mmt_df['actual_return_2020-10-23']), [0.2, 1.0])
+
+    def test_mark_to_market_no_dates(self):
+        data_frame = pd.DataFrame({
+            'ticker': ['a'],
+            'analysis_price': [10]
+        })
+        with self.assertRaises(ValidationError):
+            calculator.mark_to_market(
+                data_frame, 'ticker', 'analysis_price', [])
@@ -0,0 +1,169 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.factor_matrix module
+"""
+import unittest
+from unittest.mock import patch
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, DataError
+from strategies import factor_matrix
+from strategies.factor_matrix import FactorMatrix
+
+
+class TestStrategiesFactorMatrix(unittest.TestCase):
+
+    """
+        Testing class for the strategies.factor_matrix module
+    """
+
+    def test_business_dates(self):
+        dates = factor_matrix.business_dates(date(2020, 7, 1), date(2020, 7, 7))
+
+        # excludes the July 3rd holiday and the weekend
+        self.assertEqual(list(dates), list(pd.to_datetime(
+            ['2020-07-01', '2020-07-02', '2020-07-06', '2020-07-07'])))
+
+    def test_build_daily_factors(self):
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            self.assertTrue((end_date - start_date).days <
+                            factor_matrix.DAILY_WINDOW_DAYS)
+            if ticker == 'BAD':
+                raise DataError("No prices", None)
+            return {
+                '2020-07-01': 10.0,
+                '2020-07-07': 12.0
+            }
+
+        def get_macd(ticker: str, start_date: date, end_date: date,
+                     fast_period: int, slow_period: int, signal_period: int):
+            self.assertEqual((fast_period, slow_period,
+                              signal_period), (8, 17, 9))
+            return {
+                '2020-07-02': {
+                    'macd_histogram': 0.5,
+                    'macd_line': 1.5,
+                    'signal_line': 1.0
+                }
+            }
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=get_prices), \
+            patch.object(intrinio_data, 'get_macd_indicator',
+                         side_effect=get_macd):
+            matrix = FactorMatrix.build(['AAPL', 'BAD', 'AAPL'], date(2020, 7, 1), date(2020, 7, 7),
+                                        [factor_matrix.FACTOR_CLOSE, factor_matrix.FACTOR_MACD_LINE],
+                                        (8, 17, 9))
+
+        self.assertEqual(matrix.ticker_symbols, ['AAPL', 'BAD'])
+        self.assertEqual(matrix.get(factor_matrix.FACTOR_CLOSE).shape, (4, 2))
+
+        close_prices = matrix.to_dataframe(factor_matrix.FACTOR_CLOSE)
+        self.assertEqual(list(close_prices['AAPL']), [10.0, 10.0, 10.0, 12.0])
+        self.assertTrue(close_prices['BAD'].isna().all())
+
+        self.assertEqual(list(matrix.mask(factor_matrix.FACTOR_CLOSE)[:, 0]),
+                         [True, False, False, True])
+        self.assertEqual(list(matrix.to_dataframe(factor_matrix.FACTOR_MACD_LINE)['AAPL'].fillna(0)),
+                         [0, 1.5, 1.5, 1.5])
+
+        self.assertIn(('BAD', factor_matrix.FACTOR_CLOSE,
+                       "No data was loaded"), matrix.failures)
+
+        with self.assertRaises(ValidationError):
+            matrix.get(factor_matrix.FACTOR_SIGNAL_LINE)
+
+    def test_build_monthly_factors(self):
+        def get_target_price_mean(ticker: str, start_date: date, end_date: date):
+            return {
+                2020: {
+                    5: 90.0,
+                    6: 100.0,
+                    7: 110.0
+                }
+            }
+
+        with patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                          side_effect=get_target_price_mean), \
+            patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                         side_effect=DataError("No estimates", None)):
+            matrix = FactorMatrix.build(['AAPL'], date(2020, 6, 1), date(2020, 7, 15),
+                                        [factor_matrix.FACTOR_TARGET_PRICE_MEAN,
+                                         factor_matrix.FACTOR_TARGET_PRICE_STD_DEV])
+
+        target_price_mean = matrix.to_dataframe(
+            factor_matrix.FACTOR_TARGET_PRICE_MEAN)['AAPL']
+
+        # values are only known on the last business date of their month. May
+        # precedes the matrix and July's month end is not part of it
+        self.assertTrue(target_price_mean.loc[:'2020-06-29'].isna().all())
+        self.assertTrue((target_price_mean.loc['2020-06-30':] == 100.0).all())
+        self.assertEqual(matrix.mask(
+            factor_matrix.FACTOR_TARGET_PRICE_MEAN).sum(), 1)
+
+        self.assertTrue(np.isnan(matrix.get(
+            factor_matrix.FACTOR_TARGET_PRICE_STD_DEV)).all())
+        self.assertEqual(matrix.failures[0][:2],
+                         ('AAPL', factor_matrix.FACTOR_TARGET_PRICE_STD_DEV))
+
+    def test_build_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            FactorMatrix.build(['AAPL'], date(2020, 7, 7), date(2020, 7, 1))
+        with self.assertRaises(ValidationError):
+            FactorMatrix.build(['AAPL'], date(2020, 7, 1),
+                               date(2020, 7, 7), ['volume'])
+
+    def test_add_factor_and_as_of(self):
+        dates = factor_matrix.business_dates(date(2020, 7, 1), date(2020, 7, 7))
+        matrix = FactorMatrix(dates, ['AAPL', 'MSFT'])
+
+        matrix.add_factor('score', np.array([
+            [1.0, np.nan],
+            [np.nan, 2.0],
+            [3.0, np.nan],
+            [np.nan, np.nan]
+        ]))
+
+        self.assertEqual(list(matrix.as_of('score', date(2020, 7, 4))), [1.0, 2.0])
+        self.assertEqual(list(matrix.as_of('score', date(2020, 7, 31))), [3.0, 2.0])
+        self.assertTrue(matrix.as_of('score', date(2020, 6, 30)).isna().all())
+
+        with self.assertRaises(ValidationError):
+            matrix.add_factor('score', np.zeros((3, 2)))
+
+    def test_daily_windows(self):
+        start_date = date(2020, 1, 1)
+        end_date = date(2020, 12, 31)
+
+        windows = factor_matrix._daily_windows(start_date, end_date)
+
+        self.assertEqual(windows[0][0], start_date)
+        self.assertEqual(windows[-1][1], end_date)
+        for (previous_window, window) in zip(windows, windows[1:]):
+            self.assertEqual(previous_window[1] + timedelta(days=1), window[0])
+
+    def test_data_requests(self):
+        expected_requests = [(data_function.__name__, args) for (data_function, args) in factor_matrix.data_requests(
+            ['AAPL', 'MSFT'], date(2020, 1, 1), date(2020, 7, 1))]
+        requests = []
+
+        def record(function_name: str):
+            def load(*args):
+                requests.append((function_name, args))
+                return {}
+            return load
+
+        patches = [patch.object(intrinio_data, function_name, side_effect=record(function_name))
+                   for function_name in set([function_name for (function_name, _) in expected_requests])]
+        for data_patch in patches:
+            data_patch.start()
+        try:
+            FactorMatrix.build(['AAPL', 'MSFT'],
+                               date(2020, 1, 1), date(2020, 7, 1))
+        finally:
+            for data_patch in patches:
+                data_patch.stop()
+
+        self.assertEqual(len(patches), 4)
+        self.assertEqual(sorted(requests), sorted(expected_requests))
@@ -0,0 +1,60 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.frame_memory module
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from strategies import frame_memory
+
+
+class TestStrategiesFrameMemory(unittest.TestCase):
+
+    """
+        Testing class for the strategies.frame_memory module
+    """
+
+    def setUp(self):
+        row_count = 1000
+        self.data_frame = pd.DataFrame({
+            'analysis_period': [pd.Period('2020-05', 'M')] * row_count,
+            'ticker': ['T%d' % (i % 50) for i in range(row_count)],
+            'analysis_price': np.linspace(10, 500, row_count),
+            'analyst_expected_return': np.linspace(-1, 1, row_count),
+            'decile': np.arange(row_count) % 10
+        })
+
+    def test_compact_dataframe(self):
+        compact_frame = frame_memory.compact_dataframe(
+            self.data_frame, ['analysis_period', 'ticker', 'decile', 'missing'],
+            ['analyst_expected_return', 'missing'])
+
+        self.assertEqual(compact_frame['ticker'].dtype.name, 'category')
+        self.assertEqual(
+            compact_frame['analysis_period'].dtype.name, 'category')
+        self.assertEqual(compact_frame['decile'].dtype, np.int8)
+        self.assertEqual(
+            compact_frame['analyst_expected_return'].dtype, np.float32)
+        self.assertEqual(compact_frame['analysis_price'].dtype, np.float64)
+
+        # values are preserved and the original frame is unchanged
+        self.assertEqual(list(compact_frame['ticker']),
+                         list(self.data_frame['ticker']))
+        self.assertEqual(compact_frame['analysis_period'].iloc[0],
+                         pd.Period('2020-05', 'M'))
+        self.assertTrue(np.allclose(compact_frame['analyst_expected_return'],
+                                    self.data_frame['analyst_expected_return'], atol=1e-6))
+        self.assertNotEqual(self.data_frame['ticker'].dtype.name, 'category')
+
+        self.assertLess(frame_memory.frame_memory(compact_frame),
+                        frame_memory.frame_memory(self.data_frame) / 2)
+
+    def test_compact_dataframe_wide_integers(self):
+        data_frame = pd.DataFrame({'volume': [1, 1000, 1000]})
+
+        compact_frame = frame_memory.compact_dataframe(data_frame, ['volume'])
+
+        self.assertEqual(compact_frame['volume'].dtype, data_frame['volume'].dtype)
+
+    def test_log_frame_memory(self):
+        self.assertEqual(frame_memory.log_frame_memory("test", self.data_frame),
+                         frame_memory.frame_memory(self.data_frame))
@@ -0,0 +1,206 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.macd_backtest module
+"""
+import unittest
+from unittest.mock import patch
+from datetime import date
+import numpy as np
+import pandas as pd
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, DataError
+from strategies import macd_backtest
+from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+
+
+class TestStrategiesMACDBacktest(unittest.TestCase):
+
+    """
+        Testing class for the strategies.macd_backtest module
+    """
+
+    def setUp(self):
+        random = np.random.RandomState(7)
+        self.dates = pd.bdate_range('2020-01-01', periods=120)
+        self.ticker_symbols = ['AAPL', 'MSFT', 'V', 'XOM']
+        self.close_prices = 100 * \
+            np.exp(np.cumsum(random.normal(0, 0.02, (120, 4)), axis=0))
+        self.bullish_mask = random.rand(120, 4) > 0.5
+
+    def _simulate_loop(self, stop_loss_threshold: float):
+        '''
+            Reference implementation following the original day by day
+            loop of macd_crossover_backtest.py
+        '''
+        trade_dict = {
+            'ticker': [],
+            'buy_date': [],
+            'buy_price': [],
+            'sell_date': [],
+            'sell_price': [],
+            'trade_pnl_factor': [],
+            'false_signal': []
+        }
+        positions = {ticker: None for ticker in self.ticker_symbols}
+
+        for i in range(0, len(self.dates) - 1):
+            trade_date = self.dates[i + 1].date()
+
+            for (column, ticker) in enumerate(self.ticker_symbols):
+                if self.bullish_mask[i, column] and positions[ticker] is None:
+                    positions[ticker] = (
+                        trade_date, self.close_prices[i + 1, column])
+
+            for (column, ticker) in enumerate(self.ticker_symbols):
+                if positions[ticker] is not None and not self.bullish_mask[i, column]:
+                    (buy_date, buy_price) = positions[ticker]
+                    positions[ticker] = None
+
+                    sell_price = self.close_prices[i + 1, column]
+                    pnl = ((sell_price / buy_price) - 1)
+                    false_signal = 0
+
+                    if (pnl < stop_loss_threshold):
+                        sell_price = 'STOP_LOSS'
+                        false_signal = 1
+                        pnl = stop_loss_threshold
+
+                    if (pnl < 0):
+                        false_signal = 1
+
+                    trade_dict['ticker'].append(ticker)
+                    trade_dict['buy_date'].append(buy_date)
+                    trade_dict['buy_price'].append(buy_price)
+                    trade_dict['sell_date'].append(str(trade_date))
+                    trade_dict['sell_price'].append(sell_price)
+                    trade_dict['trade_pnl_factor'].append(pnl)
+                    trade_dict['false_signal'].append(false_signal)
+
+        return trade_dict
+
+    def test_simulate_trades_matches_loop(self):
+        trade_dict = macd_backtest.simulate_trades(
+            self.dates, self.ticker_symbols, self.close_prices, self.bullish_mask, -0.02)
+        expected_trade_dict = self._simulate_loop(-0.02)
+
+        self.assertGreater(len(expected_trade_dict['ticker']), 0)
+        self.assertIn('STOP_LOSS', expected_trade_dict['sell_price'])
+
+        self.assertEqual(list(trade_dict.keys()),
+                         list(expected_trade_dict.keys()))
+        for key in ['ticker', 'buy_date', 'sell_date', 'sell_price', 'false_signal']:
+            self.assertEqual(trade_dict[key], expected_trade_dict[key])
+        for key in ['buy_price', 'trade_pnl_factor']:
+            np.testing.assert_allclose(
+                trade_dict[key], expected_trade_dict[key])
+
+    def test_simulate_trades_open_positions(self):
+        bullish_mask = np.array([
+            [True, False],
+            [True, True],
+            [False, True],
+            [False, True]
+        ])
+        close_prices = np.array([
+            [10.0, 20.0],
+            [11.0, 21.0],
+            [12.0, 22.0],
+            [13.0, 23.0]
+        ])
+
+        trade_dict = macd_backtest.simulate_trades(
+            self.dates[:4], ['AAPL', 'MSFT'], close_prices, bullish_mask, -0.02)
+
+        # MSFT is still held at the end, so only the AAPL trade is included
+        self.assertEqual(trade_dict['ticker'], ['AAPL'])
+        self.assertEqual(trade_dict['buy_date'], [self.dates[1].date()])
+        self.assertEqual(trade_dict['sell_date'], [str(self.dates[3].date())])
+        self.assertEqual(trade_dict['sell_price'], [13.0])
+        self.assertAlmostEqual(trade_dict['trade_pnl_factor'][0], 13 / 11 - 1)
+        self.assertEqual(trade_dict['false_signal'], [0])
+
+    def test_simulate_trades_unobserved_prices(self):
+        observed_prices = np.ones(self.close_prices.shape, dtype=bool)
+        all_trades = macd_backtest.simulate_trades(
+            self.dates, self.ticker_symbols, self.close_prices, self.bullish_mask, -0.02, observed_prices)
+
+        # the first sale has no observed price
+        sell_date = pd.Timestamp(all_trades['sell_date'][0])
+        observed_prices[self.dates.get_loc(sell_date),
+                        self.ticker_symbols.index(all_trades['ticker'][0])] = False
+
+        with self.assertLogs(level='WARNING'):
+            trade_dict = macd_backtest.simulate_trades(
+                self.dates, self.ticker_symbols, self.close_prices, self.bullish_mask, -0.02, observed_prices)
+
+        self.assertEqual(len(trade_dict['ticker']),
+                         len(all_trades['ticker']) - 1)
+        self.assertEqual(trade_dict['buy_date'], all_trades['buy_date'][1:])
+
+    def test_closed_trades(self):
+        (columns, buy_rows, sell_rows) = macd_backtest.closed_trades(np.array([
+            [True, True],
+            [False, True],
+            [True, False],
+            [False, True]
+        ]))
+
+        # the second AAPL position is still open
+        self.assertEqual(list(columns), [0, 1])
+        self.assertEqual(list(buy_rows), [1, 1])
+        self.assertEqual(list(sell_rows), [2, 3])
+
+    def test_simulate_trades_no_trades(self):
+        trade_dict = macd_backtest.simulate_trades(
+            self.dates, self.ticker_symbols, self.close_prices,
+            np.zeros(self.close_prices.shape, dtype=bool), -0.02)
+
+        self.assertEqual(len(pd.DataFrame(trade_dict)), 0)
+        self.assertEqual(len(trade_dict), 7)
+
+    def test_bullish_signals_matches_strategy(self):
+        dates = pd.bdate_range('2020-07-06', periods=2)
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            if ticker == 'MSFT':
+                return {'2020-07-06': 200.0}
+            return {str(price_date.date()): 100.0 for price_date in dates}
+
+        def get_macd(ticker: str, start_date: date, end_date: date,
+                     fast_period: int, slow_period: int, signal_period: int):
+            return {
+                str(dates[0].date()): {'macd_histogram': -0.1, 'macd_line': 1.0, 'signal_line': 1.1},
+                str(dates[1].date()): {'macd_histogram': -0.5, 'macd_line': 1.0, 'signal_line': 1.5}
+            }
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=get_prices), \
+            patch.object(intrinio_data, 'get_macd_indicator',
+                         side_effect=get_macd):
+            backtest_matrix = macd_backtest.load_backtest_matrix(
+                ['AAPL', 'MSFT'], dates[0].date(), dates[-1].date(), (12, 26, 9))
+
+        bullish_mask = macd_backtest.bullish_signals(backtest_matrix, 0.0016)
+
+        (expected_mask, _) = MACDCrossoverStrategy.classify_securities(
+            [[100.0, 200.0], [100.0, 200.0]], [[1.0, 1.0], [1.0, 1.0]],
+            [[1.1, 1.1], [1.5, 1.5]], 0.0016)
+
+        # MSFT has no price on the second date, so it can't be bullish
+        self.assertEqual(bullish_mask.tolist(), [
+            [expected_mask[0, 0], expected_mask[0, 1]],
+            [expected_mask[1, 0], False]
+        ])
+
+    def test_load_backtest_matrix_no_prices(self):
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=DataError("No prices", None)), \
+            patch.object(intrinio_data, 'get_macd_indicator',
+                         return_value={}):
+            with self.assertRaises(DataError):
+                macd_backtest.load_backtest_matrix(
+                    ['AAPL'], date(2020, 7, 1), date(2020, 7, 7), (12, 26, 9))
+
+    def test_run_backtest_invalid_dates(self):
+        with self.assertRaises(ValidationError):
+            macd_backtest.run_backtest(['AAPL'], date(2020, 7, 7), date(2020, 7, 1),
+                                       0.0016, (12, 26, 9), -0.02)
@@ -3,13 +3,16 @@
 Testing class for the strategies.macd_crossover_strategy module
 """
 import unittest
+import shutil
+import threading
 import pandas as pd
 from unittest.mock import patch
-from datetime import date
+from datetime import date, timedelta
 from support import constants, util
 from model.ticker_list import TickerList
-from exception.exceptions import ValidationError
+from exception.exceptions import ValidationError, DataError
 from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+from strategies import macd_state
 from connectors import intrinio_data
 from support.configuration import Configuration
 
@@ -237,6 +240,40 @@ class TestStrategiesMACDCrossover(unittest.TestCase):
             with self.assertRaises(ValidationError):
                 macd_strategy._read_price_metrics('AAPL')
 
+    '''
+        classify_securities tests
+    '''
+
+    def test_classify_securities_matches_analyze_security(self):
+        macd_strategy = MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 10), 0.0016, 12, 26, 9)
+
+        # every combination of sign and (in)significant divergence,
+        # including zero MACD and histogram values
+        values = [-10, -0.1, -0.01, 0, 0.01, 0.1, 10]
+        current_prices = []
+        macd_lines = []
+        signal_lines = []
+        for macd_line in values:
+            for signal_line in values:
+                current_prices.append(100)
+                macd_lines.append(macd_line)
+                signal_lines.append(signal_line)
+
+        (bullish_mask, divergence) = MACDCrossoverStrategy.classify_securities(
+            current_prices, macd_lines, signal_lines, 0.0016)
+
+        for i in range(0, len(current_prices)):
+            self.assertEqual(bullish_mask[i], macd_strategy._analyze_security(
+                current_prices[i], macd_lines[i], signal_lines[i]))
+            self.assertEqual(divergence[i], macd_lines[i] - signal_lines[i])
+
+    def test_classify_securities_tickers_x_dates(self):
+        (bullish_mask, _) = MACDCrossoverStrategy.classify_securities(
+            [[100, 100], [100, 100]], [[10, -10], [10, -10]], [[9, -9], [11, -11]], 0.0016)
+
+        self.assertEqual(bullish_mask.tolist(), [[True, False], [False, True]])
+
     '''
         generate_recommendation tests
         Tests that the recommendation set is properly constructed, specifially
@@ -266,3 +303,423 @@ class TestStrategiesMACDCrossover(unittest.TestCase):
                 'valid_to'], str(date(2020, 6, 8)))
             self.assertEqual(recommendation_set.model[
                 'price_date'], str(date(2020, 6, 8)))
+
+    '''
+        incremental recompute tests
+    '''
+
+    def test_incremental_recompute(self):
+        metrics_dir = "./test/strategy-metrics-unittest/"
+        price_date = date(2020, 6, 8)
+
+        def run_strategy(ticker_list: object):
+            strategy = MACDCrossoverStrategy(
+                ticker_list, price_date, 0.0016, 12, 26, 9)
+            strategy.enable_incremental_recompute(metrics_dir)
+            with patch.object(strategy, '_read_price_metrics',
+                              wraps=strategy._read_price_metrics) as read_mock:
+                strategy.generate_recommendation()
+            return (strategy, [call[0][0] for call in read_mock.call_args_list])
+
+        # the version of the stored data
+        data_version = {'stamp': 'v1'}
+
+        def data_stamp(data_function: object, *args):
+            return data_version['stamp']
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              return_value=self.price_dict) as price_mock, \
+                patch.object(intrinio_data, 'get_macd_indicator',
+                             return_value=self.macd_dict), \
+                patch.object(intrinio_data, 'data_stamp', side_effect=data_stamp):
+
+                (_, recomputed) = run_strategy(self.ticker_list)
+                self.assertEqual(recomputed, self.ticker_list.ticker_symbols)
+
+                # same data, nothing is recomputed or read
+                price_mock.reset_mock()
+                (strategy, recomputed) = run_strategy(self.ticker_list)
+                self.assertEqual(recomputed, [])
+                self.assertEqual(price_mock.call_count, 0)
+                self.assertEqual(len(strategy.raw_dataframe), len(
+                    self.ticker_list.ticker_symbols))
+
+                # a new ticker is the only one that is recomputed
+                ticker_list = TickerList.from_dict({
+                    "list_name": "DOW30",
+                    "list_type": "US_EQUITIES",
+                    "comparison_symbol": "DIA",
+                    "ticker_symbols": self.ticker_list.ticker_symbols + ['NEW']
+                })
+                (_, recomputed) = run_strategy(ticker_list)
+                self.assertEqual(recomputed, ['NEW'])
+
+                # revised data with the same request arguments is recomputed
+                price_mock.return_value = {
+                    price_date: price + 1 for (price_date, price) in self.price_dict.items()}
+                data_version['stamp'] = 'v2'
+                (strategy, recomputed) = run_strategy(self.ticker_list)
+                self.assertEqual(recomputed, self.ticker_list.ticker_symbols)
+                self.assertEqual(list(strategy.raw_dataframe['price'].unique()), [
+                    float(list(price_mock.return_value.values())[0])])
+
+                # data that is not stored locally has no fingerprint
+                data_version['stamp'] = None
+                (_, recomputed) = run_strategy(self.ticker_list)
+                self.assertEqual(recomputed, self.ticker_list.ticker_symbols)
+        finally:
+            shutil.rmtree(metrics_dir)
+
+    def test_fingerprints_disabled(self):
+        strategy = MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          return_value=self.price_dict), \
+            patch.object(intrinio_data, 'get_macd_indicator',
+                         return_value=self.macd_dict), \
+            patch.object(intrinio_data, 'data_stamp') as stamp_mock:
+            strategy.generate_recommendation()
+
+        # inputs are only fingerprinted by incremental recompute
+        self.assertEqual(stamp_mock.call_count, 0)
+
+    def test_ticker_deadline(self):
+        price_date = date(2020, 6, 8)
+        hung_ticker = self.ticker_list.ticker_symbols[0]
+        release = threading.Event()
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            if ticker == hung_ticker:
+                release.wait(5)
+            return self.price_dict
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              side_effect=get_prices), \
+                patch.object(intrinio_data, 'get_macd_indicator',
+                             return_value=self.macd_dict):
+
+                strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                strategy.enable_time_budget(ticker_deadline_seconds=0.2)
+                strategy.generate_recommendation()
+
+                self.assertEqual(strategy.dropped_tickers, [hung_ticker])
+                self.assertEqual(list(strategy.raw_dataframe['ticker_symbol']).count(hung_ticker), 0)
+                self.assertEqual(len(strategy.raw_dataframe), len(
+                    self.ticker_list.ticker_symbols) - 1)
+        finally:
+            release.set()
+
+    def test_time_budget_exhausted(self):
+        price_date = date(2020, 6, 8)
+        release = threading.Event()
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            release.wait(5)
+            return self.price_dict
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              side_effect=get_prices), \
+                patch.object(intrinio_data, 'get_macd_indicator',
+                             return_value=self.macd_dict):
+
+                strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                strategy.enable_time_budget(time_budget_seconds=0.2)
+
+                with self.assertRaises(DataError):
+                    strategy.generate_recommendation()
+
+                self.assertEqual(len(strategy.dropped_tickers),
+                                 len(self.ticker_list.ticker_symbols))
+        finally:
+            release.set()
+
+    def test_enable_time_budget_invalid(self):
+        strategy = MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+
+        with self.assertRaises(ValidationError):
+            strategy.enable_time_budget(0, 10)
+
+    def test_macd_state(self):
+        state_dir = "./test/macd-state-unittest/"
+        ticker_list = TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        })
+        price_history = {
+            '2020-06-01': 50.0,
+            '2020-06-02': 51.0,
+            '2020-06-03': 52.0,
+            '2020-06-04': 53.0,
+            '2020-06-05': 54.0,
+            '2020-06-08': 54.74
+        }
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            return {price_date: price for (price_date, price) in price_history.items()
+                    if start_date.strftime("%Y-%m-%d") <= price_date <= end_date.strftime("%Y-%m-%d")}
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              side_effect=get_prices) as price_mock, \
+                patch.object(intrinio_data, 'get_macd_indicator') as macd_mock:
+
+                # no state, the history is read
+                strategy = MACDCrossoverStrategy(
+                    ticker_list, date(2020, 6, 5), 0.0016, 12, 26, 9)
+                strategy.enable_macd_state(state_dir)
+                strategy.generate_recommendation()
+
+                self.assertEqual(price_mock.call_count, 2)
+                self.assertNotEqual(price_mock.call_args[0][1], date(2020, 6, 5))
+
+                # next business day, one price read per ticker
+                price_mock.reset_mock()
+                strategy = MACDCrossoverStrategy(
+                    ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+                strategy.enable_macd_state(state_dir)
+                strategy.generate_recommendation()
+
+                price_mock.assert_called_with(
+                    'V', date(2020, 6, 8), date(2020, 6, 8))
+                self.assertEqual(price_mock.call_count, 2)
+                self.assertEqual(macd_mock.call_count, 0)
+
+                # same values as a full rebuild
+                expected_state = macd_state.build_state(
+                    price_history, 12, 26, 9)
+                (macd_line, signal_line) = macd_state.macd_values(
+                    expected_state)
+                self.assertAlmostEqual(
+                    strategy.raw_dataframe['macd'].iloc[0], macd_line)
+                self.assertAlmostEqual(
+                    strategy.raw_dataframe['signal'].iloc[0], signal_line)
+
+                # a parameter change rebuilds the state
+                price_mock.reset_mock()
+                strategy = MACDCrossoverStrategy(
+                    ticker_list, date(2020, 6, 8), 0.0016, 8, 26, 9)
+                strategy.enable_macd_state(state_dir)
+                strategy.generate_recommendation()
+
+                self.assertEqual(price_mock.call_args[0][1], date(
+                    2020, 6, 8) - timedelta(days=macd_state.REBUILD_DAYS))
+        finally:
+            shutil.rmtree(state_dir)
+
+    def test_macd_state_incremental_recompute(self):
+        state_dir = "./test/macd-state-unittest/"
+        ticker_list = TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        })
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            return {(start_date + timedelta(days=i)).strftime("%Y-%m-%d"): 50.0 + i
+                    for i in range(0, (end_date - start_date).days + 1)}
+
+        def run_strategy(analysis_date: date):
+            strategy = MACDCrossoverStrategy(
+                ticker_list, analysis_date, 0.0016, 12, 26, 9)
+            strategy.enable_macd_state(state_dir)
+            strategy.enable_incremental_recompute(state_dir)
+            strategy.generate_recommendation()
+            return strategy
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              side_effect=get_prices) as price_mock, \
+                patch.object(intrinio_data, 'get_macd_indicator'), \
+                patch.object(MACDCrossoverStrategy, 'ticker_fingerprints',
+                             return_value={'AAPL': 'unchanged', 'V': 'unchanged'}):
+
+                run_strategy(date(2020, 6, 5))
+
+                # the inputs look unchanged, but the state must still
+                # be advanced rather than rebuilt
+                price_mock.reset_mock()
+                run_strategy(date(2020, 6, 8))
+
+                self.assertEqual(sorted(call[0] for call in price_mock.call_args_list), [
+                    ('AAPL', date(2020, 6, 8), date(2020, 6, 8)),
+                    ('V', date(2020, 6, 8), date(2020, 6, 8))
+                ])
+                states = macd_state.load_states(
+                    "%s/macd_crossover_strategy-macd-state.pickle" % state_dir)
+                self.assertEqual([state['as_of_date'] for state in states.values()],
+                                 [date(2020, 6, 8), date(2020, 6, 8)])
+
+                # a rerun on the same day reuses the metrics
+                price_mock.reset_mock()
+                run_strategy(date(2020, 6, 8))
+                self.assertEqual(price_mock.call_count, 0)
+        finally:
+            shutil.rmtree(state_dir)
+
+    def test_result_cache(self):
+        result_dir = "./test/strategy-results-unittest/"
+        price_date = date(2020, 6, 8)
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              return_value=self.price_dict) as price_mock, \
+                patch.object(intrinio_data, 'get_macd_indicator',
+                             return_value=self.macd_dict):
+
+                strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                strategy.enable_result_cache(result_dir)
+                strategy.generate_recommendation()
+
+                # same inputs, the result is restored
+                price_mock.reset_mock()
+                cached_strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                cached_strategy.enable_result_cache(result_dir)
+                cached_strategy.generate_recommendation()
+
+                self.assertEqual(price_mock.call_count, 0)
+                self.assertEqual(cached_strategy.recommendation_set.model,
+                                 strategy.recommendation_set.model)
+                self.assertTrue(cached_strategy.raw_dataframe.equals(
+                    strategy.raw_dataframe))
+
+                # different parameters are recomputed
+                strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 10)
+                strategy.enable_result_cache(result_dir)
+                strategy.generate_recommendation()
+
+                self.assertEqual(price_mock.call_count, len(
+                    self.ticker_list.ticker_symbols))
+        finally:
+            shutil.rmtree(result_dir)
+
+    def test_result_cache_dropped_tickers(self):
+        result_dir = "./test/strategy-results-unittest/"
+        price_date = date(2020, 6, 8)
+        hung_ticker = self.ticker_list.ticker_symbols[0]
+        release = threading.Event()
+
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            if ticker == hung_ticker:
+                release.wait(5)
+            return self.price_dict
+
+        try:
+            with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                              side_effect=get_prices) as price_mock, \
+                patch.object(intrinio_data, 'get_macd_indicator',
+                             return_value=self.macd_dict):
+
+                strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                strategy.enable_result_cache(result_dir)
+                strategy.enable_time_budget(ticker_deadline_seconds=0.2)
+                strategy.generate_recommendation()
+                release.set()
+
+                self.assertEqual(strategy.dropped_tickers, [hung_ticker])
+
+                # the partial result was not cached, so a retry loads all tickers
+                price_mock.reset_mock()
+                retried_strategy = MACDCrossoverStrategy(
+                    self.ticker_list, price_date, 0.0016, 12, 26, 9)
+                retried_strategy.enable_result_cache(result_dir)
+                retried_strategy.generate_recommendation()
+
+                self.assertEqual(price_mock.call_count, len(
+                    self.ticker_list.ticker_symbols))
+                self.assertEqual(len(retried_strategy.raw_dataframe), len(
+                    self.ticker_list.ticker_symbols))
+        finally:
+            release.set()
+            shutil.rmtree(result_dir)
+
+    def test_result_fingerprint(self):
+        strategy = MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+
+        self.assertEqual(strategy.result_fingerprint(), MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9).result_fingerprint())
+        self.assertNotEqual(strategy.result_fingerprint(), MACDCrossoverStrategy(
+            self.ticker_list, date(2020, 6, 9), 0.0016, 12, 26, 9).result_fingerprint())
+
+        ticker_list = TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": self.ticker_list.ticker_symbols[1:]
+        })
+        self.assertNotEqual(strategy.result_fingerprint(), MACDCrossoverStrategy(
+            ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9).result_fingerprint())
+
+    def test_result_fingerprint_modes(self):
+        state_dir = "./test/macd-state-unittest/"
+        fingerprints = set()
+
+        try:
+            strategy = MACDCrossoverStrategy(
+                self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+            fingerprints.add(strategy.result_fingerprint())
+
+            strategy.enable_macd_state(state_dir)
+            fingerprints.add(strategy.result_fingerprint())
+
+            strategy = MACDCrossoverStrategy(
+                self.ticker_list, date(2020, 6, 8), 0.0016, 12, 26, 9)
+            strategy.enable_incremental_recompute(state_dir)
+            fingerprints.add(strategy.result_fingerprint())
+        finally:
+            shutil.rmtree(state_dir)
+
+        # the MACD state and incremental recompute change the result key
+        self.assertEqual(len(fingerprints), 3)
+
+    def test_streaming_matches_full_universe(self):
+        price_date = date(2020, 6, 8)
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          return_value=self.price_dict), \
+            patch.object(intrinio_data, 'get_macd_indicator',
+                         return_value=self.macd_dict):
+
+            strategy = MACDCrossoverStrategy(
+                self.ticker_list, price_date, 0.0016, 12, 26, 9)
+            strategy.generate_recommendation()
+
+            streaming_strategy = MACDCrossoverStrategy(
+                self.ticker_list, price_date, 0.0016, 12, 26, 9)
+            streaming_strategy.enable_streaming(7)
+            streaming_strategy.generate_recommendation()
+
+            self.assertTrue(strategy.raw_dataframe.equals(
+                streaming_strategy.raw_dataframe))
+            self.assertEqual(strategy.recommendation_set.model['securities_set'],
+                             streaming_strategy.recommendation_set.model['securities_set'])
+
+    '''
+        get_data_requests tests
+    '''
+
+    def test_get_data_requests(self):
+        price_date = date(2020, 6, 8)
+        strategy = MACDCrossoverStrategy(
+            self.ticker_list, price_date, 0.0016, 12, 26, 9)
+
+        data_requests = strategy.get_data_requests()
+
+        self.assertEqual(len(data_requests), len(
+            self.ticker_list.ticker_symbols) * 2)
+        self.assertTrue((intrinio_data.get_macd_indicator,
+                         ('AAPL', price_date, price_date, 12, 26, 9)) in data_requests)
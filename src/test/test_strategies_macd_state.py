@@ -0,0 +1,84 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.macd_state module
+"""
+import unittest
+import shutil
+from datetime import date
+import numpy as np
+import pandas as pd
+from support import util
+from exception.exceptions import ValidationError
+from strategies import macd_state, macd_sweep
+
+
+class TestStrategiesMACDState(unittest.TestCase):
+
+    """
+        Testing class for the strategies.macd_state module
+    """
+
+    state_dir = "./test/macd-state-unittest/"
+
+    price_dict = {
+        '2020-06-01': 100.0,
+        '2020-06-02': 102.0,
+        '2020-06-03': 101.0,
+        '2020-06-04': 105.0,
+        '2020-06-05': 104.0
+    }
+
+    def test_build_state_matches_dataframe_macd(self):
+        state = macd_state.build_state(self.price_dict, 3, 5, 2)
+
+        close_prices = pd.DataFrame({'AAPL': list(self.price_dict.values())})
+        (macd_line, signal_line) = macd_sweep.compute_macd(
+            close_prices, 3, 5, 2)
+
+        self.assertEqual(state['as_of_date'], date(2020, 6, 5))
+        self.assertEqual(state['close'], 104.0)
+        np.testing.assert_allclose(macd_state.macd_values(state), (
+            macd_line['AAPL'].iloc[-1], signal_line['AAPL'].iloc[-1]))
+
+    def test_update_state(self):
+        price_history = dict(list(self.price_dict.items())[:-1])
+        state = macd_state.build_state(price_history, 3, 5, 2)
+
+        updated_state = macd_state.update_state(
+            state, date(2020, 6, 5), 104.0)
+
+        np.testing.assert_allclose(
+            macd_state.macd_values(updated_state),
+            macd_state.macd_values(macd_state.build_state(self.price_dict, 3, 5, 2)))
+
+        # the previous state is not modified
+        self.assertEqual(state['as_of_date'], date(2020, 6, 4))
+
+        with self.assertRaises(ValidationError):
+            macd_state.update_state(state, date(2020, 6, 5), None)
+
+    def test_build_state_empty(self):
+        with self.assertRaises(ValidationError):
+            macd_state.build_state({}, 3, 5, 2)
+
+    def test_has_parameters(self):
+        state = macd_state.build_state(self.price_dict, 3, 5, 2)
+
+        self.assertTrue(macd_state.has_parameters(state, 3, 5, 2))
+        self.assertFalse(macd_state.has_parameters(state, 12, 26, 9))
+
+    def test_save_and_load_states(self):
+        util.create_dir(self.state_dir)
+        state_path = "%s/states.pickle" % self.state_dir
+
+        try:
+            self.assertDictEqual(macd_state.load_states(state_path), {})
+
+            states = {
+                'AAPL': macd_state.build_state(self.price_dict, 3, 5, 2),
+                'V': macd_state.build_state(self.price_dict, 12, 26, 9)
+            }
+            macd_state.save_states(state_path, states)
+
+            self.assertDictEqual(macd_state.load_states(state_path), states)
+        finally:
+            shutil.rmtree(self.state_dir)
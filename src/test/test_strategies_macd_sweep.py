@@ -0,0 +1,160 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.macd_sweep module
+"""
+import unittest
+from unittest.mock import patch
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, DataError
+from strategies import macd_sweep, macd_backtest, factor_matrix
+
+
+class TestStrategiesMACDSweep(unittest.TestCase):
+
+    """
+        Testing class for the strategies.macd_sweep module
+    """
+
+    def setUp(self):
+        random = np.random.RandomState(3)
+        dates = pd.bdate_range('2020-01-01', periods=120)
+        self.close_prices = pd.DataFrame(
+            100 * np.exp(np.cumsum(random.normal(0, 0.02, (120, 3)), axis=0)),
+            index=dates, columns=['AAPL', 'MSFT', 'V'])
+
+    def _simulate_loop(self, close_prices: object, bullish_mask: object, stop_loss_threshold: float):
+        '''
+            Reference implementation following macd_crossover_backtest.py
+        '''
+        trade_pnl = pd.DataFrame(np.nan, index=close_prices.index,
+                                 columns=close_prices.columns)
+        for (column, ticker) in enumerate(close_prices.columns):
+            position = None
+            for i in range(0, len(close_prices) - 1):
+                price = close_prices.iloc[i + 1, column]
+                if bullish_mask[i, column] and position is None:
+                    position = price
+                elif not bullish_mask[i, column] and position is not None:
+                    trade_pnl.iloc[i + 1, column] = max(
+                        price / position - 1, stop_loss_threshold)
+                    position = None
+        return trade_pnl
+
+    def test_compute_macd(self):
+        (macd_line, signal_line) = macd_sweep.compute_macd(
+            self.close_prices, 12, 26, 9)
+
+        prices = self.close_prices['AAPL'].values
+
+        def ema(values: list, period: int):
+            alpha = 2 / (period + 1)
+            result = [values[0]]
+            for value in values[1:]:
+                result.append(alpha * value + (1 - alpha) * result[-1])
+            return np.array(result)
+
+        expected_macd = ema(prices, 12) - ema(prices, 26)
+        np.testing.assert_allclose(macd_line['AAPL'].values, expected_macd)
+        np.testing.assert_allclose(
+            signal_line['AAPL'].values, ema(expected_macd, 9))
+
+    def test_simulate_trades_matches_loop(self):
+        random = np.random.RandomState(5)
+        bullish_mask = random.rand(*self.close_prices.shape) > 0.4
+
+        for stop_loss_threshold in [-0.01, -1.0]:
+            trade_pnl = macd_sweep.simulate_trades(
+                self.close_prices, bullish_mask, stop_loss_threshold)
+
+            pd.testing.assert_frame_equal(trade_pnl, self._simulate_loop(
+                self.close_prices, bullish_mask, stop_loss_threshold))
+
+    def test_simulate_trades_unobserved_prices(self):
+        random = np.random.RandomState(5)
+        bullish_mask = random.rand(*self.close_prices.shape) > 0.4
+        observed_prices = random.rand(*self.close_prices.shape) > 0.2
+
+        trade_pnl = macd_sweep.simulate_trades(
+            self.close_prices, bullish_mask, -0.02, observed_prices)
+
+        (columns, buy_rows, sell_rows) = macd_backtest.closed_trades(bullish_mask)
+        priced = observed_prices[buy_rows, columns] & observed_prices[sell_rows, columns]
+        self.assertTrue(0 < priced.sum() < len(priced))
+
+        expected_pnl = macd_sweep.simulate_trades(
+            self.close_prices, bullish_mask, -0.02)
+        self.assertTrue(trade_pnl.notna().values[sell_rows[priced], columns[priced]].all())
+        self.assertFalse(trade_pnl.notna().values[sell_rows[~priced], columns[~priced]].any())
+        self.assertEqual(trade_pnl.notna().values.sum(), priced.sum())
+        pd.testing.assert_frame_equal(trade_pnl, expected_pnl.where(trade_pnl.notna()))
+
+        backtest_trades = macd_backtest.simulate_trades(
+            self.close_prices.index, list(self.close_prices.columns), self.close_prices.values,
+            bullish_mask, -0.02, observed_prices)
+        self.assertEqual(len(backtest_trades['ticker']), trade_pnl.notna().values.sum())
+
+    def test_summarize_no_trades(self):
+        trade_summary = macd_sweep.summarize_trades(
+            macd_sweep.simulate_trades(self.close_prices, np.zeros(self.close_prices.shape, dtype=bool), -0.02))
+
+        self.assertEqual(trade_summary['trades'], 0)
+
+    def test_run_sweep(self):
+        sweep_dataframe = macd_sweep.run_sweep(
+            self.close_prices, date(2020, 3, 1), date(2020, 6, 30),
+            [8, 12, 30], [26], [9], [0.0016, 0.01], -0.02)
+
+        # fast period 30 is not shorter than the slow period
+        self.assertEqual(len(sweep_dataframe), 4)
+        self.assertEqual(set(sweep_dataframe['fast_period']), {8, 12})
+        self.assertTrue(sweep_dataframe['avg_compounded_pnl'].is_monotonic_decreasing)
+
+    def test_run_sweep_unobserved_prices(self):
+        observed_prices = pd.DataFrame(False, index=self.close_prices.index,
+                                       columns=self.close_prices.columns)
+
+        sweep_dataframe = macd_sweep.run_sweep(
+            self.close_prices, date(2020, 3, 1), date(2020, 6, 30),
+            [12], [26], [9], [0.0016], -0.02, observed_prices)
+
+        self.assertEqual(sweep_dataframe['trades'][0], 0)
+
+    def test_run_sweep_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            macd_sweep.run_sweep(self.close_prices, date(2020, 3, 1), date(2020, 6, 30),
+                                 [26], [12], [9], [0.0016], -0.02)
+        with self.assertRaises(DataError):
+            macd_sweep.run_sweep(self.close_prices, date(2021, 3, 1), date(2021, 6, 30),
+                                 [12], [26], [9], [0.0016], -0.02)
+
+    def test_load_close_prices(self):
+        def get_prices(ticker: str, start_date: date, end_date: date):
+            self.assertTrue((end_date - start_date).days < factor_matrix.DAILY_WINDOW_DAYS)
+            if ticker == 'BAD':
+                raise DataError("No prices", None)
+            return {
+                (start_date + timedelta(days=1)).strftime("%Y-%m-%d"): 10.0,
+                end_date.strftime("%Y-%m-%d"): 20.0
+            }
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=get_prices):
+            (close_prices, observed_prices) = macd_sweep.load_close_prices(
+                ['AAPL', 'BAD', 'AAPL'], date(2020, 6, 1), date(2020, 6, 30))
+
+        self.assertEqual(list(close_prices.columns), ['AAPL'])
+        self.assertEqual(close_prices.index[-1], pd.Timestamp('2020-06-30'))
+        self.assertTrue(close_prices.index.is_monotonic_increasing)
+        self.assertTrue(observed_prices.index.equals(close_prices.index))
+        self.assertEqual(list(observed_prices.columns), ['AAPL'])
+        self.assertTrue(observed_prices.loc['2020-06-30', 'AAPL'])
+        self.assertFalse(observed_prices.loc['2020-06-29', 'AAPL'])
+
+    def test_load_close_prices_no_data(self):
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=DataError("No prices", None)):
+            with self.assertRaises(DataError):
+                macd_sweep.load_close_prices(
+                    ['AAPL'], date(2020, 6, 1), date(2020, 6, 30))
@@ -2,13 +2,18 @@
 
 Testing class for the strategies.price_dispersion module
 """
+import io
 import unittest
+import contextlib
+import shutil
+import threading
+import numpy as np
 import pandas as pd
 from unittest.mock import patch
 from intrinio_sdk.rest import ApiException
-from connectors import intrinio_data
+from connectors import intrinio_data, aws_service_wrapper
 from datetime import date, datetime
-from exception.exceptions import ValidationError, DataError
+from exception.exceptions import ValidationError, DataError, AWSError
 from strategies.price_dispersion_strategy import PriceDispersionStrategy
 from model.ticker_list import TickerList
 from support import constants, util
@@ -134,6 +139,273 @@ class TestStrategiesPriceDispersion(unittest.TestCase):
             with self.assertRaises(DataError):
                 strategy._load_financial_data()
 
+    def test_load_financial_data_with_failures(self):
+        def mock_price(ticker, price_date, max_lookback):
+            if ticker == 'V':
+                raise DataError("No prices", None)
+            return ('2020-05-29', 100)
+
+        with patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                          return_value={2020: {5: 10}}), \
+            patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                         return_value={2020: {5: 125}}), \
+            patch.object(intrinio_data, 'get_latest_close_price',
+                         side_effect=mock_price):
+
+            strategy = PriceDispersionStrategy(TickerList.from_dict({
+                "list_name": "DOW30",
+                "list_type": "US_EQUITIES",
+                "comparison_symbol": "DIA",
+                "ticker_symbols": ['AAPL', 'V', 'MSFT']
+            }), '2020-05', date(2020, 6, 10), 3)
+
+            financial_data = strategy._load_financial_data()
+
+            self.assertEqual(list(financial_data['ticker']), ['AAPL', 'MSFT'])
+            self.assertEqual(list(financial_data['dispersion_stdev_pct']), [8.0, 8.0])
+            self.assertEqual(
+                list(financial_data['analyst_expected_return']), [0.25, 0.25])
+
+            self.assertEqual(list(strategy.failures_dataframe['ticker']), ['V'])
+            self.assertEqual(
+                list(strategy.failures_dataframe['field']), ['analysis_price'])
+
+    def test_load_financial_data_incremental(self):
+        metrics_dir = "./test/strategy-metrics-unittest/"
+
+        def load_financial_data():
+            strategy = PriceDispersionStrategy(TickerList.from_dict({
+                "list_name": "DOW30",
+                "list_type": "US_EQUITIES",
+                "comparison_symbol": "DIA",
+                "ticker_symbols": ['AAPL', 'V']
+            }), '2020-05', date(2020, 6, 10), 3)
+            strategy.enable_incremental_recompute(metrics_dir)
+            with patch.object(strategy, '_load_fields', wraps=strategy._load_fields) as load_mock:
+                financial_data = strategy._load_financial_data()
+            return (financial_data, list(load_mock.call_args[0][0]))
+
+        # the version of the stored data
+        data_version = {'stamp': 'v1'}
+
+        def data_stamp(data_function: object, *args):
+            return data_version['stamp']
+
+        try:
+            with patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                              return_value={2020: {5: 10}}), \
+                patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                             return_value={2020: {5: 125}}) as mean_mock, \
+                patch.object(intrinio_data, 'get_latest_close_price',
+                             return_value=('2020-05-29', 100)), \
+                patch.object(intrinio_data, 'data_stamp', side_effect=data_stamp):
+
+                (first_data, recomputed) = load_financial_data()
+                self.assertEqual(recomputed, ['AAPL', 'V'])
+
+                (second_data, recomputed) = load_financial_data()
+                self.assertEqual(recomputed, [])
+
+                self.assertEqual(list(first_data['ticker']), list(second_data['ticker']))
+                self.assertEqual(list(first_data['analyst_expected_return']), list(
+                    second_data['analyst_expected_return']))
+
+                # a revised estimate is recomputed, even though the
+                # request arguments did not change
+                mean_mock.return_value = {2020: {5: 150}}
+                data_version['stamp'] = 'v2'
+                (revised_data, recomputed) = load_financial_data()
+                self.assertEqual(recomputed, ['AAPL', 'V'])
+                self.assertNotEqual(list(first_data['analyst_expected_return']), list(
+                    revised_data['analyst_expected_return']))
+        finally:
+            shutil.rmtree(metrics_dir)
+
+    def test_load_financial_data_ticker_deadline(self):
+        release = threading.Event()
+
+        def get_mean(ticker: str, start_date: date, end_date: date):
+            if ticker == 'V':
+                release.wait(5)
+            return {2020: {5: 125}}
+
+        try:
+            with patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                              return_value={2020: {5: 10}}), \
+                patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                             side_effect=get_mean), \
+                patch.object(intrinio_data, 'get_latest_close_price',
+                             return_value=('2020-05-29', 100)):
+
+                strategy = PriceDispersionStrategy(TickerList.from_dict({
+                    "list_name": "DOW30",
+                    "list_type": "US_EQUITIES",
+                    "comparison_symbol": "DIA",
+                    "ticker_symbols": ['AAPL', 'V', 'MSFT']
+                }), '2020-05', date(2020, 6, 10), 3)
+                strategy.enable_time_budget(60, 0.2)
+
+                financial_data = strategy._load_financial_data()
+
+                self.assertEqual(list(financial_data['ticker']), ['AAPL', 'MSFT'])
+                self.assertEqual(strategy.dropped_tickers, ['V'])
+                self.assertEqual(
+                    list(strategy.failures_dataframe['ticker']), ['V'])
+        finally:
+            release.set()
+
+    def test_result_cache_s3(self):
+        result_dir = "./test/strategy-results-unittest/"
+        uploaded_results = {}
+
+        def upload(source_path: str, bucket_name: str, object_name: str):
+            with open(source_path, 'rb') as result_file:
+                uploaded_results[object_name] = result_file.read()
+
+        def download(bucket_name: str, object_name: str, dest_path: str):
+            if object_name not in uploaded_results:
+                raise AWSError("Could not download", Exception("(404) Not Found"))
+            with open(dest_path, 'wb') as result_file:
+                result_file.write(uploaded_results[object_name])
+
+        ticker_list = TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        })
+
+        # the version of the stored data
+        data_version = {'stamp': 'v1'}
+
+        def data_stamp(data_function: object, *args):
+            return data_version['stamp']
+
+        try:
+            with patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                              return_value={2020: {5: 10}}), \
+                patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                             return_value={2020: {5: 125}}) as mean_mock, \
+                patch.object(intrinio_data, 'get_latest_close_price',
+                             return_value=('2020-05-29', 100)), \
+                patch.object(aws_service_wrapper, 'cf_read_export_value',
+                             return_value='test-bucket'), \
+                patch.object(aws_service_wrapper, 's3_upload_object',
+                             side_effect=upload), \
+                patch.object(aws_service_wrapper, 's3_download_object',
+                             side_effect=download):
+
+                strategy = PriceDispersionStrategy(
+                    ticker_list, '2020-05', date(2020, 6, 10), 1)
+                strategy.enable_result_cache(result_dir, 'sa')
+                strategy.generate_recommendation()
+
+                self.assertEqual(mean_mock.call_count, 2)
+                self.assertEqual(len(uploaded_results), 1)
+
+                # a different host, without the local result
+                shutil.rmtree(result_dir)
+                mean_mock.reset_mock()
+
+                cached_strategy = PriceDispersionStrategy(
+                    ticker_list, '2020-05', date(2020, 6, 10), 1)
+                cached_strategy.enable_result_cache(result_dir, 'sa')
+                cached_strategy.generate_recommendation()
+
+                self.assertEqual(mean_mock.call_count, 0)
+                self.assertEqual(cached_strategy.recommendation_set.model,
+                                 strategy.recommendation_set.model)
+                self.assertEqual(list(cached_strategy.recommendation_dataframe['ticker']),
+                                 list(strategy.recommendation_dataframe['ticker']))
+        finally:
+            shutil.rmtree(result_dir)
+
+    def test_load_financial_data_streaming(self):
+        with patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                          return_value={2020: {5: 10}}), \
+            patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                         return_value={2020: {5: 125}}), \
+            patch.object(intrinio_data, 'get_latest_close_price',
+                         side_effect=[('2020-05-29', 100), ('2020-05-29', 50), ('2020-05-29', 125)]):
+
+            strategy = PriceDispersionStrategy(TickerList.from_dict({
+                "list_name": "DOW30",
+                "list_type": "US_EQUITIES",
+                "comparison_symbol": "DIA",
+                "ticker_symbols": ['AAPL', 'V', 'MSFT']
+            }), '2020-05', date(2020, 6, 10), 3)
+            strategy.enable_streaming(2)
+
+            financial_data = strategy._load_financial_data()
+
+            self.assertEqual(list(financial_data['ticker']), [
+                             'AAPL', 'V', 'MSFT'])
+            self.assertEqual(list(financial_data['analyst_expected_return']), [
+                             0.25, 1.5, 0.0])
+            self.assertFalse('target_price_avg' in financial_data.columns)
+
+    def test_select_recommendation_streaming(self):
+        random = np.random.RandomState(7)
+        ticker_symbols = ["T%d" % i for i in range(23)]
+        raw_dataframe = pd.DataFrame({
+            'analysis_period': '2020-05',
+            'ticker': ticker_symbols,
+            'analysis_price': random.randint(10, 100, 23).astype(float),
+            'dispersion_stdev_pct': random.rand(23),
+            'analyst_expected_return': random.randint(-3, 3, 23) / 10
+        })
+        raw_dataframe['decile'] = pd.qcut(
+            raw_dataframe['dispersion_stdev_pct'], 10, labels=False, duplicates='drop')
+
+        selected_tickers = []
+        for chunk_size in [None, 4, 50]:
+            strategy = PriceDispersionStrategy(TickerList.from_dict({
+                "list_name": "DOW30",
+                "list_type": "US_EQUITIES",
+                "comparison_symbol": "DIA",
+                "ticker_symbols": ticker_symbols
+            }), '2020-05', date(2020, 6, 10), 5)
+            if chunk_size is not None:
+                strategy.enable_streaming(chunk_size)
+            strategy.raw_dataframe = raw_dataframe
+
+            strategy._select_recommendation()
+            selected_tickers.append(
+                list(strategy.recommendation_dataframe['ticker']))
+
+        self.assertEqual(len(selected_tickers[0]), 5)
+        self.assertEqual(selected_tickers[1], selected_tickers[0])
+        self.assertEqual(selected_tickers[2], selected_tickers[0])
+
+    def test_enable_streaming_invalid_chunk_size(self):
+        strategy = PriceDispersionStrategy(TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        }), '2020-05', date(2020, 6, 10), 3)
+
+        with self.assertRaises(ValidationError):
+            strategy.enable_streaming(0)
+
+    def test_load_fields_skips_failed_tickers(self):
+        loaded_fields = []
+
+        def load_first(ticker):
+            loaded_fields.append(('first', ticker))
+            return None if ticker == 'V' else 1
+
+        def load_second(ticker):
+            loaded_fields.append(('second', ticker))
+            return 2
+
+        (data_frame, failures_dataframe) = PriceDispersionStrategy._load_fields(
+            ['AAPL', 'V'], {'first': load_first, 'second': load_second})
+
+        self.assertFalse(('second', 'V') in loaded_fields)
+        self.assertEqual(list(data_frame.dropna()['ticker']), ['AAPL'])
+        self.assertEqual(len(failures_dataframe), 1)
+
     '''
         generate_recommendation tests
         Tests that the recommendation set is properly constructed, specifially
@@ -208,3 +480,147 @@ class TestStrategiesPriceDispersion(unittest.TestCase):
                     "comparison_symbol": "DIA",
                     "ticker_symbols": ['AAPL', 'V']
                 }), '2020-06', price_date, 3)
+
+    '''
+        evaluate_periods tests
+    '''
+
+    def _mock_period_data(self):
+        '''
+            Returns mocked Zacks and price functions that are
+            consistent across both evaluation modes
+        '''
+        ticker_symbols = ['AAPL', 'MSFT', 'V', 'GE', 'BAD']
+        zacks_calls = []
+
+        def price(ticker: str, price_date: object):
+            return 100.0 + ticker_symbols.index(ticker) * 10 + price_date.day
+
+        def get_target_price_mean(ticker: str, start_date: date, end_date: date):
+            zacks_calls.append(ticker)
+            if ticker == 'BAD':
+                raise DataError("No estimates", None)
+            return {2020: {month: 150.0 - ticker_symbols.index(ticker) * month for month in range(1, 13)}}
+
+        def get_target_price_std_dev(ticker: str, start_date: date, end_date: date):
+            zacks_calls.append(ticker)
+            return {2020: {month: 5.0 + ticker_symbols.index(ticker) * month for month in range(1, 13)}}
+
+        def get_daily_stock_close_prices(ticker: str, start_date: date, end_date: date):
+            return {price_date.strftime("%Y-%m-%d"): price(ticker, price_date)
+                    for price_date in pd.bdate_range(start_date, end_date)}
+
+        def get_latest_close_price(ticker: str, price_date: date, max_lookback: int):
+            latest_date = pd.bdate_range(
+                price_date - pd.Timedelta(days=max_lookback), price_date)[-1]
+            return (latest_date.strftime("%Y-%m-%d"), price(ticker, latest_date))
+
+        ticker_list = TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ticker_symbols
+        })
+
+        patches = [
+            patch.object(intrinio_data, 'get_zacks_target_price_mean',
+                         side_effect=get_target_price_mean),
+            patch.object(intrinio_data, 'get_zacks_target_price_std_dev',
+                         side_effect=get_target_price_std_dev),
+            patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                         side_effect=get_daily_stock_close_prices),
+            patch.object(intrinio_data, 'get_latest_close_price',
+                         side_effect=get_latest_close_price)
+        ]
+
+        return (ticker_list, patches, zacks_calls)
+
+    def test_evaluate_periods(self):
+        (ticker_list, patches, zacks_calls) = self._mock_period_data()
+
+        for data_patch in patches:
+            data_patch.start()
+        try:
+            strategies = PriceDispersionStrategy.evaluate_periods(
+                ticker_list, ['2020-05', '2020-03', '2020-04'], date(2020, 6, 10), 2)
+
+            # the Zacks history of each ticker is read once
+            self.assertEqual(len(zacks_calls), 2 * 5)
+            self.assertEqual(list(strategies.keys()), list(
+                pd.period_range('2020-03', '2020-05', freq='M')))
+
+            for (period, strategy) in strategies.items():
+                single_strategy = PriceDispersionStrategy(
+                    ticker_list, period.strftime("%Y-%m"), date(2020, 6, 10), 2)
+                single_strategy.generate_recommendation()
+
+                pd.testing.assert_frame_equal(
+                    strategy.raw_dataframe, single_strategy.raw_dataframe, check_dtype=False)
+                pd.testing.assert_frame_equal(
+                    strategy.recommendation_dataframe, single_strategy.recommendation_dataframe, check_dtype=False)
+                self.assertEqual(strategy.recommendation_set.model['securities_set'],
+                                 single_strategy.recommendation_set.model['securities_set'])
+                self.assertEqual(strategy.recommendation_set.model['valid_from'],
+                                 single_strategy.recommendation_set.model['valid_from'])
+
+                self.assertEqual(
+                    strategy.raw_dataframe['ticker'].dtype.name, 'category')
+                self.assertEqual(
+                    strategy.raw_dataframe['analyst_expected_return'].dtype, 'float32')
+
+                self.assertEqual(
+                    list(strategy.failures_dataframe['ticker']), ['BAD'])
+                self.assertEqual(
+                    list(strategy.failures_dataframe['field']), ['target_price_avg'])
+        finally:
+            for data_patch in patches:
+                data_patch.stop()
+
+    def test_display_results_float_format(self):
+        (ticker_list, patches, _) = self._mock_period_data()
+        float_format = pd.get_option('display.float_format')
+
+        for data_patch in patches:
+            data_patch.start()
+        try:
+            strategy = PriceDispersionStrategy(
+                ticker_list, '2020-05', date(2020, 6, 10), 2)
+            strategy.generate_recommendation()
+
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                strategy.display_results()
+        finally:
+            for data_patch in patches:
+                data_patch.stop()
+
+        # the format is applied to the table only, since strategies
+        # are displayed concurrently
+        self.assertEqual(pd.get_option('display.float_format'), float_format)
+        self.assertRegex(output.getvalue(), r"\d\.\d{3}\b")
+
+    def test_evaluate_periods_no_periods(self):
+        (ticker_list, _, _) = self._mock_period_data()
+
+        with self.assertRaises(ValidationError):
+            PriceDispersionStrategy.evaluate_periods(
+                ticker_list, [], date(2020, 6, 10), 2)
+
+    '''
+        get_data_requests tests
+    '''
+
+    def test_get_data_requests(self):
+        strategy = PriceDispersionStrategy(TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        }), '2020-05', date(2020, 6, 10), 3)
+
+        data_requests = strategy.get_data_requests()
+
+        self.assertEqual(len(data_requests), 8)
+        self.assertTrue((intrinio_data.get_zacks_target_price_mean,
+                         ('AAPL', date(2020, 5, 1), date(2020, 5, 31))) in data_requests)
+        self.assertTrue((intrinio_data.get_daily_stock_close_prices,
+                         ('V', date(2020, 6, 10), date(2020, 6, 10))) in data_requests)
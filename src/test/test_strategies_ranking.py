@@ -0,0 +1,82 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.ranking module
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from exception.exceptions import ValidationError
+from strategies import ranking
+from strategies.ranking import TopKSelector
+
+
+class TestStrategiesRanking(unittest.TestCase):
+
+    """
+        Testing class for the strategies.ranking module
+    """
+
+    def _sorted_head(self, data_frame: object, k: int):
+        return data_frame.sort_values(
+            ['decile', 'expected_return'], ascending=(False, False)).head(k)
+
+    def test_top_k_matches_sort(self):
+        random = np.random.RandomState(7)
+
+        for size in [1, 2, 10, 97]:
+            data_frame = pd.DataFrame({
+                'ticker': ["T%d" % i for i in range(size)],
+                # few distinct values to exercise ties
+                'decile': random.randint(0, 4, size).astype(float),
+                'expected_return': random.randint(-3, 3, size) / 10
+            })
+            data_frame.loc[data_frame.index[::5], 'expected_return'] = np.nan
+
+            for k in [0, 1, 3, size - 1, size, size + 5]:
+                self.assertEqual(
+                    list(ranking.top_k(data_frame, 'decile',
+                                       'expected_return', k)['ticker']),
+                    list(self._sorted_head(data_frame, k)['ticker']))
+
+    def test_top_k_invalid_parameters(self):
+        data_frame = pd.DataFrame({
+            'decile': [1, 2],
+            'expected_return': [0.1, 0.2]
+        })
+
+        with self.assertRaises(ValidationError):
+            ranking.top_k(data_frame, 'decile', 'expected_return', -1)
+        with self.assertRaises(ValidationError):
+            ranking.top_k(data_frame, 'decile', 'xxx', 1)
+        with self.assertRaises(ValidationError):
+            ranking.top_k_indices([1, 2], [0.1], 1)
+
+    def test_selector_matches_sort(self):
+        random = np.random.RandomState(11)
+        data_frame = pd.DataFrame({
+            'ticker': ["T%d" % i for i in range(50)],
+            'decile': random.randint(0, 3, 50).astype(float),
+            'expected_return': random.randint(-2, 2, 50) / 10
+        })
+
+        for k in [0, 1, 5, 50, 60]:
+            selector = TopKSelector(k)
+            # streamed in chunks
+            for start in range(0, 50, 7):
+                chunk = data_frame.iloc[start:start + 7]
+                selector.push_all(
+                    chunk['decile'], chunk['expected_return'], chunk['ticker'])
+
+            self.assertEqual(selector.results(), list(
+                self._sorted_head(data_frame, k)['ticker']))
+
+    def test_selector_missing_values(self):
+        selector = TopKSelector(2)
+        selector.push(None, 0.5, 'a')
+        selector.push(1, float('nan'), 'b')
+        selector.push(1, 0.1, 'c')
+
+        self.assertEqual(selector.results(), ['c', 'b'])
+
+    def test_selector_invalid_k(self):
+        with self.assertRaises(ValidationError):
+            TopKSelector(-1)
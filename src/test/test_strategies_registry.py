@@ -0,0 +1,129 @@
+"""Author: Mark Hanegraaff -- 2020
+
+Testing class for the strategies.strategy_registry module
+"""
+import sys
+import unittest
+import subprocess
+import configparser
+from unittest.mock import patch
+from exception.exceptions import ValidationError
+from strategies import strategy_registry
+
+
+class TestStrategiesRegistry(unittest.TestCase):
+    """
+        Testing class for the strategies.strategy_registry module
+    """
+
+    class MockConfiguration():
+        def __init__(self, config_string: str):
+            self.config = configparser.ConfigParser(allow_no_value=True)
+            self.config.read_string(config_string)
+
+    def test_discover_strategies(self):
+        strategy_index = strategy_registry.discover_strategies()
+
+        self.assertEqual(strategy_index['macd_crossover_strategy'],
+                         ('strategies.macd_crossover_strategy', 'MACDCrossoverStrategy'))
+        self.assertEqual(strategy_index['price_dispersion_strategy'],
+                         ('strategies.price_dispersion_strategy', 'PriceDispersionStrategy'))
+
+    def test_enabled_config_sections(self):
+        configuration = self.MockConfiguration("""
+            [some_other_section]
+            value = 1
+
+            [price_dispersion_strategy]
+            enabled = false
+
+            [macd_crossover_strategy]
+            ticker_list_file_name=djia30.json
+        """)
+
+        self.assertEqual(strategy_registry.enabled_config_sections(
+            configuration), ['macd_crossover_strategy'])
+
+    def test_load_strategy_class(self):
+        strategy_class = strategy_registry.load_strategy_class(
+            'macd_crossover_strategy')
+
+        self.assertEqual(strategy_class.CONFIG_SECTION,
+                         'macd_crossover_strategy')
+
+    def test_load_unknown_strategy_class(self):
+        with self.assertRaises(ValidationError):
+            strategy_registry.load_strategy_class('unknown_strategy')
+
+    def test_load_single_strategy(self):
+        configuration = self.MockConfiguration("""
+            [price_dispersion_strategy]
+            enabled = false
+
+            [macd_crossover_strategy]
+            ticker_list_file_name=djia30.json
+        """)
+
+        strategy_class = strategy_registry.load_strategy_class(
+            'price_dispersion_strategy')
+
+        with patch.object(strategy_class, 'from_configuration', return_value="strategy") as from_configuration_mock:
+            self.assertEqual(strategy_registry.load_strategies(
+                configuration, 'sa', config_section='price_dispersion_strategy'), ["strategy"])
+            from_configuration_mock.assert_called_with(configuration, 'sa', 0)
+
+        with self.assertRaises(ValidationError):
+            strategy_registry.load_strategies(
+                configuration, 'sa', config_section='unknown_strategy')
+
+    def test_load_strategy_streaming(self):
+        configuration = self.MockConfiguration("""
+            [macd_crossover_strategy]
+            chunk_size = 100
+        """)
+
+        strategy_class = strategy_registry.load_strategy_class(
+            'macd_crossover_strategy')
+
+        with patch.object(strategy_class, 'from_configuration',
+                          return_value=strategy_class(None, None, 0.0016, 12, 26, 9)):
+            strategies = strategy_registry.load_strategies(configuration, 'sa')
+
+        self.assertEqual(strategies[0].chunk_size, 100)
+
+    def test_load_strategy_time_budget(self):
+        configuration = self.MockConfiguration("""
+            [macd_crossover_strategy]
+            time_budget_seconds = 600
+            ticker_deadline_seconds = 10
+        """)
+
+        strategy_class = strategy_registry.load_strategy_class(
+            'macd_crossover_strategy')
+
+        with patch.object(strategy_class, 'from_configuration',
+                          return_value=strategy_class(None, None, 0.0016, 12, 26, 9)):
+            strategies = strategy_registry.load_strategies(configuration, 'sa')
+
+        self.assertEqual(strategies[0].time_budget_seconds, 600)
+        self.assertEqual(strategies[0].ticker_deadline_seconds, 10)
+
+        configuration = self.MockConfiguration("""
+            [macd_crossover_strategy]
+            ticker_deadline_seconds = soon
+        """)
+
+        with patch.object(strategy_class, 'from_configuration',
+                          return_value=strategy_class(None, None, 0.0016, 12, 26, 9)):
+            with self.assertRaises(ValidationError):
+                strategy_registry.load_strategies(configuration, 'sa')
+
+    def test_base_strategy_defers_connectors(self):
+        loaded_modules = subprocess.run(
+            [sys.executable, "-c",
+             "import sys; import strategies.base_strategy; "
+             "print(' '.join(sys.modules))"],
+            capture_output=True, text=True, check=True).stdout.split()
+
+        self.assertNotIn('connectors.intrinio_data', loaded_modules)
+        self.assertNotIn('strategies.run_planner', loaded_modules)
@@ -0,0 +1,83 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the strategies.run_planner module
+"""
+import unittest
+from unittest.mock import patch
+from datetime import date
+from connectors import intrinio_data
+from exception.exceptions import ValidationError
+from strategies import run_planner
+from strategies.macd_crossover_strategy import MACDCrossoverStrategy
+from model.ticker_list import TickerList
+
+
+class TestStrategiesRunPlanner(unittest.TestCase):
+
+    """
+        Testing class for the strategies.run_planner module
+    """
+
+    def setUp(self):
+        self.data_requests = [
+            (intrinio_data.get_daily_stock_close_prices,
+             ('AAPL', date(2020, 6, 8), date(2020, 6, 8))),
+            (intrinio_data.get_daily_stock_close_prices,
+             ('AAPL', date(2020, 6, 8), date(2020, 6, 8))),
+            (intrinio_data.get_latest_close_price,
+             ('MSFT', date(2020, 6, 8), 5)),
+            (intrinio_data.get_macd_indicator,
+             ('AAPL', date(2020, 6, 8), date(2020, 6, 8), 12, 26, 9)),
+            (intrinio_data.get_zacks_target_price_mean,
+             ('AAPL', date(2020, 5, 1), date(2020, 5, 31)))
+        ]
+
+    def test_plan_data_requests(self):
+        def is_cached(data_function: object, *args):
+            return data_function is intrinio_data.get_daily_stock_close_prices
+
+        with patch.object(intrinio_data, 'is_cached', side_effect=is_cached):
+            run_plan = run_planner.plan_data_requests(self.data_requests, {
+                intrinio_data.ENDPOINT_STOCK_PRICES: 0.2,
+                intrinio_data.ENDPOINT_TECHNICALS_MACD: 1.0
+            })
+
+        self.assertEqual(run_plan['data_requests'], 4)
+        self.assertEqual(run_plan['cached_requests'], 1)
+        self.assertEqual(run_plan['api_calls'], 3)
+        self.assertEqual(run_plan['cache_hit_rate'], 25.0)
+        # the zacks endpoint was never called and uses the default latency
+        self.assertAlmostEqual(run_plan['estimated_runtime_seconds'],
+                               0.2 + 1.0 + run_planner.DEFAULT_LATENCY_SECONDS)
+        self.assertEqual(run_plan['missing_requests'], self.data_requests[2:])
+
+        endpoints = run_plan['endpoints'].set_index('endpoint')
+        self.assertEqual(endpoints.loc[intrinio_data.ENDPOINT_STOCK_PRICES, 'requests'], 2)
+        self.assertEqual(endpoints.loc[intrinio_data.ENDPOINT_STOCK_PRICES, 'api_calls'], 1)
+
+    def test_plan_data_requests_empty(self):
+        run_plan = run_planner.plan_data_requests([], {})
+
+        self.assertEqual(run_plan['api_calls'], 0)
+        self.assertEqual(run_plan['cache_hit_rate'], 100.0)
+        self.assertEqual(run_plan['estimated_runtime_seconds'], 0)
+        self.assertEqual(len(run_plan['endpoints']), 0)
+
+    def test_plan_data_requests_unsupported_function(self):
+        with self.assertRaises(ValidationError):
+            run_planner.plan_data_requests([
+                (intrinio_data.get_historical_revenue, ('AAPL', 2018, 2019))
+            ], {})
+
+    def test_strategy_plan_run(self):
+        strategy = MACDCrossoverStrategy(TickerList.from_dict({
+            "list_name": "DOW30",
+            "list_type": "US_EQUITIES",
+            "comparison_symbol": "DIA",
+            "ticker_symbols": ['AAPL', 'V']
+        }), date(2020, 6, 8), 0.0016, 12, 26, 9)
+
+        with patch.object(intrinio_data, 'is_cached', return_value=False):
+            run_plan = strategy.plan_run()
+
+        self.assertEqual(run_plan['data_requests'], 4)
+        self.assertEqual(run_plan['api_calls'], 4)
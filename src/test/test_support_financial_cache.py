@@ -3,10 +3,25 @@
 """
 import unittest
 import shutil
+import os
+import threading
+import multiprocessing
+from datetime import date
+from diskcache import Cache, FanoutCache
 from support.financial_cache import FinancialCache
 from exception.exceptions import ValidationError, FileSystemError
 
 
+def _record_run(cache_path: str):
+    '''
+        Records the statistics of a run in a separate process
+    '''
+    run_cache = FinancialCache(cache_path)
+    run_cache.read("not-found")
+    run_cache.record_run_stats()
+    run_cache.close()
+
+
 class TestFinancialCache(unittest.TestCase):
 
     """
@@ -103,3 +118,371 @@ class TestFinancialCache(unittest.TestCase):
 
         finally:
             shutil.rmtree(small_cache_path)
+
+    def test_hit_miss_counters(self):
+        counter_cache_path = "./test/cache-unittest-counters/"
+        counter_cache = FinancialCache(counter_cache_path)
+
+        try:
+            counter_cache.write("test-key", 1234)
+            counter_cache.read("test-key")
+            counter_cache.read("not-found")
+
+            self.assertEqual(counter_cache.hits, 1)
+            self.assertEqual(counter_cache.misses, 1)
+
+            counter_cache.record_run_stats()
+            run_stats = counter_cache.run_stats()
+
+            self.assertEqual(len(run_stats), 1)
+            self.assertEqual(run_stats[0]['hits'], 1)
+            self.assertEqual(run_stats[0]['misses'], 1)
+        finally:
+            counter_cache.close()
+            shutil.rmtree(counter_cache_path)
+
+    def test_concurrent_run_stats(self):
+        counter_cache_path = "./test/cache-unittest-concurrent-counters/"
+        counter_cache = FinancialCache(counter_cache_path)
+
+        def read_keys():
+            for _ in range(0, 200):
+                counter_cache.read("not-found")
+
+        try:
+            threads = [threading.Thread(target=read_keys) for _ in range(0, 4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(counter_cache.misses, 800)
+
+            # runs of other processes are not lost
+            processes = [multiprocessing.get_context('fork').Process(
+                target=_record_run, args=(counter_cache_path,)) for _ in range(0, 4)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            self.assertEqual(len(counter_cache.run_stats()), 4)
+            self.assertEqual([file_name for file_name in os.listdir(counter_cache_path)
+                              if file_name.endswith('.tmp')], [])
+        finally:
+            counter_cache.close()
+            shutil.rmtree(counter_cache_path)
+
+    def test_entries(self):
+        self.test_cache.write('test-entries', "1234")
+
+        entries = {key: size for (key, size, _)
+                   in self.test_cache.entries()}
+
+        self.assertTrue('test-entries' in entries)
+        self.assertTrue(entries['test-entries'] > 0)
+
+    def test_compact_no_criteria(self):
+        with self.assertRaises(ValidationError):
+            self.test_cache.compact()
+
+    def test_compact_by_prefix(self):
+        self.test_cache.write('compact-a', 1)
+        self.test_cache.write('compact-b', 2)
+
+        self.assertEqual(self.test_cache.compact(
+            key_prefix='compact-', dry_run=True), 2)
+        self.assertEqual(self.test_cache.read('compact-a'), 1)
+
+        self.assertEqual(self.test_cache.compact(key_prefix='compact-'), 2)
+        self.assertEqual(self.test_cache.read('compact-a'), None)
+        self.assertEqual(self.test_cache.read('compact-b'), None)
+
+    def test_export_import(self):
+        export_path = "./test/cache-unittest-export.pickle"
+        import_cache_path = "./test/cache-unittest-import/"
+
+        self.test_cache.write('export-dict', {"a": 1})
+        import_cache = FinancialCache(import_cache_path)
+
+        try:
+            exported = self.test_cache.export_entries(
+                export_path, key_prefix='export-')
+            self.assertEqual(exported, 1)
+
+            self.assertEqual(import_cache.import_entries(export_path), 1)
+            self.assertEqual(import_cache.read('export-dict')["a"], 1)
+        finally:
+            import_cache.close()
+            shutil.rmtree(import_cache_path)
+            os.remove(export_path)
+
+    def test_import_file_not_found(self):
+        with self.assertRaises(FileSystemError):
+            self.test_cache.import_entries("./test/does-not-exist.pickle")
+
+    def test_sharded_cache(self):
+        sharded_cache_path = "./test/cache-unittest-sharded/"
+        sharded_cache = FinancialCache(sharded_cache_path, shards=4)
+        other_process_cache = FinancialCache(sharded_cache_path, shards=4)
+
+        try:
+            for i in range(0, 20):
+                sharded_cache.write('sharded-key-%d' % i, i)
+
+            # keys are routed deterministically, so a second instance
+            # with the same number of shards sees the same data
+            for i in range(0, 20):
+                key = 'sharded-key-%d' % i
+                self.assertEqual(other_process_cache.read(key), i)
+                self.assertEqual(sharded_cache.shard_index(key),
+                                 other_process_cache.shard_index(key))
+
+            self.assertEqual(len(list(sharded_cache.entries())), 20)
+            self.assertTrue(sharded_cache.write_wait_seconds > 0)
+            self.assertEqual(sharded_cache.write_timeouts, 0)
+        finally:
+            sharded_cache.close()
+            other_process_cache.close()
+            shutil.rmtree(sharded_cache_path)
+
+    def test_fanout_cache_layout(self):
+        sharded_cache_path = "./test/cache-unittest-fanout/"
+        fanout_cache = FanoutCache(sharded_cache_path, shards=4)
+        for i in range(0, 10):
+            fanout_cache['fanout-key-%d' % i] = i
+        fanout_cache.close()
+
+        # sharded caches are compatible with diskcache.FanoutCache
+        sharded_cache = FinancialCache(sharded_cache_path, shards=4)
+        try:
+            for i in range(0, 10):
+                self.assertEqual(sharded_cache.read('fanout-key-%d' % i), i)
+            self.assertEqual(sorted(key for (key, _, _) in sharded_cache.entries()),
+                             sorted('fanout-key-%d' % i for i in range(0, 10)))
+        finally:
+            sharded_cache.close()
+            shutil.rmtree(sharded_cache_path)
+
+    def test_sharded_cache_lock_timeout(self):
+        sharded_cache_path = "./test/cache-unittest-timeout/"
+        sharded_cache = FinancialCache(
+            sharded_cache_path, shards=2, shard_timeout=0.05)
+        key = 'timeout-key'
+        shard_path = os.path.join(
+            sharded_cache_path, "%03d" % sharded_cache.shard_index(key))
+        other_process_cache = Cache(shard_path, timeout=0.05)
+
+        try:
+            # another process holds the shard lock
+            with other_process_cache.transact():
+                with self.assertLogs(level='WARNING'):
+                    sharded_cache.write(key, 1)
+
+            self.assertEqual(sharded_cache.write_timeouts, 1)
+            self.assertGreaterEqual(sharded_cache.max_write_wait_seconds, 0.05)
+            self.assertEqual(sharded_cache.read(key), None)
+        finally:
+            sharded_cache.close()
+            other_process_cache.close()
+            shutil.rmtree(sharded_cache_path)
+
+    def test_bad_shard_count(self):
+        with self.assertRaises(ValidationError):
+            FinancialCache("./test/cache-unittest-bad/", shards="BAD_VALUE")
+        shutil.rmtree("./test/cache-unittest-bad/")
+
+    def test_range_not_cached(self):
+        self.assertEqual(self.test_cache.read_range(
+            'range-not-cached', date(2020, 1, 1), date(2020, 1, 31)), None)
+
+    def test_range_subsumption(self):
+        self.test_cache.write_range('range-subsumption', date(2020, 1, 1), date(2020, 1, 31), {
+            '2020-01-02': 1,
+            '2020-01-15': 2,
+            '2020-01-31': 3
+        })
+
+        self.assertDictEqual(self.test_cache.read_range(
+            'range-subsumption', date(2020, 1, 3), date(2020, 1, 20)), {'2020-01-15': 2})
+        self.assertDictEqual(self.test_cache.read_range(
+            'range-subsumption', date(2020, 1, 3), date(2020, 1, 4)), {})
+        self.assertEqual(self.test_cache.read_range(
+            'range-subsumption', date(2020, 1, 3), date(2020, 2, 1)), None)
+
+    def test_covering_range_key(self):
+        self.assertEqual(self.test_cache.covering_range_key(
+            'range-covering', date(2020, 1, 2), date(2020, 1, 3)), None)
+
+        self.test_cache.write_range('range-covering', date(2020, 1, 1), date(2020, 1, 31), {
+            '2020-01-02': 1
+        })
+        covering_key = self.test_cache.covering_range_key(
+            'range-covering', date(2020, 1, 2), date(2020, 1, 3))
+        self.assertEqual(covering_key, 'range-covering-20200101-20200131')
+
+        # the key changes once the range is written again
+        self.test_cache.write_range('range-covering', date(2020, 2, 1), date(2020, 2, 29), {
+            '2020-02-03': 2
+        })
+        self.assertNotEqual(self.test_cache.covering_range_key(
+            'range-covering', date(2020, 1, 2), date(2020, 1, 3)), covering_key)
+
+    def test_range_merge(self):
+        self.test_cache.write_range('range-merge', date(2020, 1, 1), date(2020, 1, 31), {
+            '2020-01-02': 1
+        })
+        self.test_cache.write_range('range-merge', date(2020, 3, 1), date(2020, 3, 31), {
+            '2020-03-02': 3
+        })
+        # adjacent to the first range
+        self.test_cache.write_range('range-merge', date(2020, 2, 1), date(2020, 2, 29), {
+            '2020-02-03': 2
+        })
+
+        self.assertEqual(self.test_cache._range_index('range-merge'),
+                         [[date(2020, 1, 1).toordinal(), date(2020, 3, 31).toordinal()]])
+        self.assertDictEqual(self.test_cache.read_range('range-merge', date(2020, 1, 1), date(2020, 3, 31)), {
+            '2020-01-02': 1,
+            '2020-02-03': 2,
+            '2020-03-02': 3
+        })
+        self.assertEqual(self.test_cache.read(
+            'range-merge-20200101-20200131'), None)
+
+    def test_range_bad_dates(self):
+        with self.assertRaises(ValidationError):
+            self.test_cache.write_range(
+                'range-bad', date(2020, 1, 31), date(2020, 1, 1), {})
+
+    def test_write_behind(self):
+        write_behind_path = "./test/cache-unittest-write-behind/"
+        write_behind_cache = FinancialCache(
+            write_behind_path, write_behind=True)
+
+        try:
+            for i in range(0, 20):
+                write_behind_cache.write('write-behind-key-%d' % i, i)
+
+            # queued values are visible before they are committed
+            self.assertEqual(write_behind_cache.read('write-behind-key-5'), 5)
+            self.assertTrue(
+                write_behind_cache.contains('write-behind-key-19'))
+
+            write_behind_cache.flush()
+            self.assertEqual(len(write_behind_cache.pending_writes), 0)
+            self.assertEqual(len(list(write_behind_cache.entries())), 20)
+
+            self.assertEqual(write_behind_cache.compact(
+                key_prefix='write-behind-key-1'), 11)
+            self.assertFalse(write_behind_cache.contains('write-behind-key-1'))
+        finally:
+            write_behind_cache.close()
+
+        # all writes are committed when the cache is closed
+        reopened_cache = FinancialCache(write_behind_path)
+        try:
+            self.assertEqual(reopened_cache.read('write-behind-key-0'), 0)
+            self.assertEqual(reopened_cache.read('write-behind-key-1'), None)
+        finally:
+            reopened_cache.close()
+            shutil.rmtree(write_behind_path)
+
+    def test_write_behind_range(self):
+        write_behind_path = "./test/cache-unittest-write-behind-range/"
+        write_behind_cache = FinancialCache(
+            write_behind_path, write_behind=True)
+
+        try:
+            write_behind_cache.write_range('range-write-behind', date(2020, 1, 1), date(2020, 1, 31), {
+                '2020-01-02': 1
+            })
+            write_behind_cache.write_range('range-write-behind', date(2020, 2, 1), date(2020, 2, 29), {
+                '2020-02-03': 2
+            })
+
+            self.assertDictEqual(write_behind_cache.read_range('range-write-behind', date(2020, 1, 1), date(2020, 2, 29)), {
+                '2020-01-02': 1,
+                '2020-02-03': 2
+            })
+        finally:
+            write_behind_cache.close()
+            shutil.rmtree(write_behind_path)
+
+    def test_layered_cache(self):
+        base_path = "./test/cache-unittest-base/"
+        overlay_path = "./test/cache-unittest-overlay/"
+        merged_path = "./test/cache-unittest-merged/"
+
+        base_cache = FinancialCache(base_path)
+        base_cache.write('layer-base', 1)
+        base_cache.write('layer-both', 1)
+        base_cache.write_range('layer-range', date(2020, 1, 1), date(2020, 1, 31), {
+            '2020-01-02': 1
+        })
+        base_cache.close()
+
+        overlay_cache = FinancialCache(overlay_path, base_path=base_path)
+
+        try:
+            overlay_cache.write('layer-both', 2)
+            overlay_cache.write_range('layer-range', date(2020, 2, 1), date(2020, 2, 29), {
+                '2020-02-03': 2
+            })
+
+            self.assertEqual(overlay_cache.read('layer-base'), 1)
+            self.assertEqual(overlay_cache.read('layer-both'), 2)
+            self.assertTrue(overlay_cache.contains('layer-base'))
+            self.assertDictEqual(overlay_cache.read_range('layer-range', date(2020, 1, 1), date(2020, 2, 29)), {
+                '2020-01-02': 1,
+                '2020-02-03': 2
+            })
+
+            # writes only go to the overlay
+            self.assertEqual(len(list(overlay_cache.entries())), 3)
+            self.assertEqual(sorted(key for (key, _, _) in overlay_cache.base_cache.entries()),
+                             ['layer-base', 'layer-both', 'layer-range-20200101-20200131',
+                              'layer-range-range-index'])
+
+            self.assertEqual(overlay_cache.vacuum(), [])
+            self.assertEqual(overlay_cache.read('layer-both'), 2)
+
+            self.assertEqual(overlay_cache.merge_layers(merged_path), 5)
+
+            merged_cache = FinancialCache(merged_path)
+            self.assertEqual(merged_cache.read('layer-base'), 1)
+            self.assertEqual(merged_cache.read('layer-both'), 2)
+            merged_cache.close()
+
+            with self.assertRaises(ValidationError):
+                overlay_cache.merge_layers(base_path)
+        finally:
+            overlay_cache.close()
+            shutil.rmtree(base_path)
+            shutil.rmtree(overlay_path)
+            shutil.rmtree(merged_path, ignore_errors=True)
+
+    def test_sharded_base(self):
+        base_path = "./test/cache-unittest-sharded-base/"
+        overlay_path = "./test/cache-unittest-sharded-overlay/"
+
+        base_cache = FinancialCache(base_path, shards=4)
+        for i in range(0, 10):
+            base_cache.write('sharded-base-%d' % i, i)
+        base_cache.close()
+
+        overlay_cache = FinancialCache(overlay_path, base_path=base_path)
+        try:
+            for i in range(0, 10):
+                self.assertEqual(overlay_cache.read('sharded-base-%d' % i), i)
+            self.assertEqual(overlay_cache.read('sharded-base-missing'), None)
+        finally:
+            overlay_cache.close()
+            shutil.rmtree(base_path)
+            shutil.rmtree(overlay_path)
+
+    def test_missing_base(self):
+        with self.assertRaises(FileSystemError):
+            FinancialCache("./test/cache-unittest-bad-base/",
+                           base_path="./test/does-not-exist/")
+        shutil.rmtree("./test/cache-unittest-bad-base/")
@@ -0,0 +1,184 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.price_store module
+"""
+import unittest
+import os
+import shutil
+from datetime import date
+from support.price_store import PriceStore
+from exception.exceptions import ValidationError, FileSystemError
+
+
+class TestPriceStore(unittest.TestCase):
+
+    """
+        Testing class for the support.price_store module
+    """
+
+    test_path = "./test/price-store-unittest/"
+
+    def setUp(self):
+        self.price_store = PriceStore(self.test_path)
+
+    def tearDown(self):
+        self.price_store.close()
+        shutil.rmtree(self.test_path)
+
+    price_records = [
+        (date(2020, 6, 1), 10, 12, 9, 11, 1000),
+        (date(2020, 6, 2), 11, 13, 10, 12, 1000),
+        (date(2020, 6, 3), 12, 14, 11, 13, 1000),
+        (date(2020, 6, 5), 13, 15, 12, 14, 1000)
+    ]
+
+    def test_no_store_path(self):
+        with self.assertRaises(FileSystemError):
+            PriceStore(None)
+
+    def test_bad_date_range(self):
+        with self.assertRaises(ValidationError):
+            self.price_store.write_prices(
+                'AAPL', date(2020, 6, 5), date(2020, 6, 1), self.price_records)
+
+    def test_not_covered(self):
+        self.assertEqual(self.price_store.read_close_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5)), None)
+
+    def test_read_close_prices(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5), self.price_records)
+
+        self.assertDictEqual(self.price_store.read_close_prices('AAPL', date(2020, 6, 2), date(2020, 6, 4)), {
+            '2020-06-02': 12.0,
+            '2020-06-03': 13.0
+        })
+
+        # covered, but not a trading day
+        self.assertDictEqual(self.price_store.read_close_prices(
+            'AAPL', date(2020, 6, 4), date(2020, 6, 4)), {})
+
+        # partially covered
+        self.assertEqual(self.price_store.read_close_prices(
+            'AAPL', date(2020, 6, 4), date(2020, 6, 8)), None)
+
+    def test_get_prices_slice(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5), self.price_records)
+
+        prices = self.price_store.get_prices(
+            'AAPL', date(2020, 6, 2), date(2020, 6, 5))
+
+        self.assertEqual(len(prices), 3)
+        self.assertEqual(list(prices['close']), [12.0, 13.0, 14.0])
+        self.assertEqual(list(prices['volume']), [1000.0, 1000.0, 1000.0])
+
+    def test_read_asof_close_price(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5), self.price_records)
+
+        self.assertEqual(self.price_store.read_asof_close_price(
+            'AAPL', date(2020, 6, 4), date(2020, 6, 1)), ('2020-06-03', 13.0))
+
+        self.assertEqual(self.price_store.read_asof_close_price(
+            'AAPL', date(2020, 6, 10), date(2020, 6, 1)), None)
+
+    def test_append_and_merge(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 2), date(2020, 6, 3), self.price_records[1:3])
+        # appended
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 4), date(2020, 6, 5), self.price_records[3:])
+        # merged, with an overwritten price
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2), [
+                self.price_records[0],
+                (date(2020, 6, 2), 11, 13, 10, 12.5, 1000)
+            ])
+
+        self.assertDictEqual(self.price_store.read_close_prices('AAPL', date(2020, 6, 1), date(2020, 6, 5)), {
+            '2020-06-01': 11.0,
+            '2020-06-02': 12.5,
+            '2020-06-03': 13.0,
+            '2020-06-05': 14.0
+        })
+
+        # data is persisted across instances
+        other_price_store = PriceStore(self.test_path)
+        self.assertEqual(len(other_price_store.get_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5))), 4)
+        other_price_store.close()
+
+    def test_concurrent_writers(self):
+        # two processes that read the coverage before either one writes
+        other_price_store = PriceStore(self.test_path)
+        self.assertFalse(self.price_store.is_covered(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 1)))
+        self.assertFalse(other_price_store.is_covered(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 1)))
+
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 3), date(2020, 6, 5), self.price_records[2:])
+        other_price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2), self.price_records[:2])
+        other_price_store.close()
+
+        # neither write is lost
+        reader_price_store = PriceStore(self.test_path)
+        self.assertTrue(reader_price_store.is_covered(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5)))
+        self.assertEqual(len(reader_price_store.read_close_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5))), 4)
+        reader_price_store.close()
+
+        self.assertEqual([file_name for file_name in os.listdir(self.test_path)
+                          if file_name.endswith('.tmp')], [])
+
+    def test_reload_after_other_process_write(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2), self.price_records[:2])
+        self.assertEqual(len(self.price_store.read_close_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2))), 2)
+
+        # another process appends to the file mapped by this one
+        other_price_store = PriceStore(self.test_path)
+        other_price_store.write_prices(
+            'AAPL', date(2020, 6, 3), date(2020, 6, 5), self.price_records[2:])
+        other_price_store.close()
+
+        self.assertDictEqual(self.price_store.read_close_prices('AAPL', date(2020, 6, 3), date(2020, 6, 5)), {
+            '2020-06-03': 13.0,
+            '2020-06-05': 14.0
+        })
+
+    def test_partial_record(self):
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2), self.price_records[:2])
+
+        # an append that was interrupted
+        with open(os.path.join(self.test_path, "AAPL.prices"), 'ab') as price_file:
+            price_file.write(b'\x00' * 5)
+
+        with self.assertRaises(FileSystemError):
+            self.price_store.read_close_prices(
+                'AAPL', date(2020, 6, 1), date(2020, 6, 2))
+
+        # the next write discards the partial record
+        with self.assertLogs(level='WARNING'):
+            self.price_store.write_prices(
+                'AAPL', date(2020, 6, 3), date(2020, 6, 5), self.price_records[2:])
+
+        self.assertEqual(len(self.price_store.read_close_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 5))), 4)
+
+    def test_stamp(self):
+        empty_stamp = self.price_store.stamp('AAPL')
+
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 1), date(2020, 6, 2), self.price_records[:2])
+        stamp = self.price_store.stamp('AAPL')
+        self.assertNotEqual(stamp, empty_stamp)
+        self.assertEqual(self.price_store.stamp('AAPL'), stamp)
+
+        self.price_store.write_prices(
+            'AAPL', date(2020, 6, 3), date(2020, 6, 5), self.price_records[2:])
+        self.assertNotEqual(self.price_store.stamp('AAPL'), stamp)